@@ -10,9 +10,11 @@ from werkzeug.utils import secure_filename
 from PIL import Image
 import io
 import threading
+import queue
 import pytsk3
 import hashlib
 import math
+import random
 import magic
 import shutil
 import secrets
@@ -24,11 +26,18 @@ from cryptography.fernet import Fernet, InvalidToken
 import base64
 import datetime
 import gzip
+import zlib
+import tarfile
 import json
 import csv
 import xml.etree.ElementTree as ET
 import mmap
+import bisect
+import itertools
+import heapq
 from multiprocessing.dummy import Pool
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
 import sqlite3
 import tempfile
 from urllib.parse import urlparse
@@ -46,6 +55,12 @@ try:
 except ImportError:
     docx = None
 
+# Optional NumPy: vectorizes constant-block classification (pure-Python fallback otherwise)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 try:
     from Evtx.Evtx import Evtx
 except ImportError:
@@ -1068,6 +1083,7 @@ def api_create_image():
         ev_examiner = (request.form.get('examiner') or (request.json and request.json.get('examiner')) or '')
         ev_notes = (request.form.get('notes') or (request.json and request.json.get('notes')) or '')
         ev_compress = bool(request.form.get('compress') or (request.json and request.json.get('compress')))
+        ev_block_map = block_hash_map_enabled(request.form.get('block_hash_map') or (request.get_json(silent=True) or {}).get('block_hash_map'))
 
         # prepare session folder to store image
         sess_base = app.config.get('SESSION_FOLDER')
@@ -1123,16 +1139,19 @@ def api_create_image():
                 'case_number': ev_case,
                 'examiner': ev_examiner,
                 'notes': ev_notes,
-                'compress': ev_compress
+                'compress': ev_compress,
+                'block_hash_map': ev_block_map
             },
             'error': None
         }
         app.config['image_jobs'][job_id] = job_info
 
         def worker_copy_and_hash(src, dst, job):
+            block_map = None
             try:
                 job['status'] = 'running'
                 job['started_at'] = datetime.datetime.utcnow().isoformat() + 'Z'
+                unshare_artifact(dst)
                 CHUNK = 4 * 1024 * 1024
                 total = 0
                 # determine total for different source types
@@ -1149,6 +1168,16 @@ def api_create_image():
                 # if folder, we will create a zip-like archive while streaming
                 md5 = hashlib.md5()
                 sha1 = hashlib.sha1()
+                # the optional block hash map is built from the same chunks as the image hashes
+                if job.get('options', {}).get('block_hash_map'):
+                    block_map = open_block_hash_map(block_hash_map_path(dst))
+
+                def absorb(chunk):
+                    md5.update(chunk)
+                    sha1.update(chunk)
+                    if block_map is not None:
+                        update_block_hash_map(block_map, chunk)
+
                 bytes_written = 0
                 # if user requested EWF and pyewf is available, use pyewf
                 use_pyewf = job.get('options', {}).get('use_pyewf')
@@ -1182,8 +1211,7 @@ def api_create_image():
                                 if not chunk:
                                     break
                                 ewf_handle.write(chunk)
-                                md5.update(chunk)
-                                sha1.update(chunk)
+                                absorb(chunk)
                                 bytes_written += len(chunk)
                                 job['progress'] = int((bytes_written / total) * 100) if total else 0
                             ewf_handle.close()
@@ -1207,6 +1235,9 @@ def api_create_image():
 
                         job['md5'] = md5.hexdigest()
                         job['sha1'] = sha1.hexdigest()
+                        if block_map is not None:
+                            job['block_hash_map'] = close_block_hash_map(block_map)
+                            block_map = None
                         job['progress'] = 100
                         job['status'] = 'finished'
                         job['ended_at'] = datetime.datetime.utcnow().isoformat() + 'Z'
@@ -1219,6 +1250,9 @@ def api_create_image():
                         # fallback to default handling if pyewf path fails
                         app.logger.exception('pyewf imaging failed, falling back')
                         job['message'] = 'pyewf failed, falling back to raw copy'
+                        if block_map is not None:
+                            discard_block_hash_map(block_map)
+                            block_map = open_block_hash_map(block_hash_map_path(dst))
 
                 # Cloud source: stream download using requests
                 if job.get('options', {}).get('source_type') == 'cloud':
@@ -1240,8 +1274,7 @@ def api_create_image():
                                 if not chunk:
                                     continue
                                 outf.write(chunk)
-                                md5.update(chunk)
-                                sha1.update(chunk)
+                                absorb(chunk)
                                 bytes_written += len(chunk)
                                 job['progress'] = int((bytes_written / total) * 100) if total else 0
                 elif job.get('options', {}).get('source_type') == 'device':
@@ -1272,8 +1305,7 @@ def api_create_image():
                                         fh.seek(last_size)
                                         new = fh.read(cur_size - last_size)
                                         if new:
-                                            md5.update(new)
-                                            sha1.update(new)
+                                            absorb(new)
                                             bytes_written += len(new)
                                             job['progress'] = int((bytes_written / total) * 100) if total else 0
                                     last_size = cur_size
@@ -1290,8 +1322,7 @@ def api_create_image():
                             if not chunk:
                                 break
                             outf.write(chunk)
-                            md5.update(chunk)
-                            sha1.update(chunk)
+                            absorb(chunk)
                             bytes_written += len(chunk)
                             job['progress'] = int((bytes_written / total) * 100) if total else 0
                 else:
@@ -1311,8 +1342,7 @@ def api_create_image():
                             if not chunk:
                                 break
                             outf.write(chunk)
-                            md5.update(chunk)
-                            sha1.update(chunk)
+                            absorb(chunk)
                             bytes_written += len(chunk)
                             job['progress'] = int((bytes_written / total) * 100) if total else 0
                     try:
@@ -1322,6 +1352,9 @@ def api_create_image():
 
                 job['md5'] = md5.hexdigest()
                 job['sha1'] = sha1.hexdigest()
+                if block_map is not None:
+                    job['block_hash_map'] = close_block_hash_map(block_map)
+                    block_map = None
                 job['progress'] = 100
                 job['status'] = 'finished'
                 job['ended_at'] = datetime.datetime.utcnow().isoformat() + 'Z'
@@ -1336,6 +1369,9 @@ def api_create_image():
                 job['error'] = str(e)
                 job['ended_at'] = datetime.datetime.utcnow().isoformat() + 'Z'
                 app.logger.exception('image job failed')
+            finally:
+                if block_map is not None:
+                    discard_block_hash_map(block_map)
 
         # start worker thread
         t = threading.Thread(target=worker_copy_and_hash, args=(abs_source, target_path, job_info), daemon=True)
@@ -1377,6 +1413,8 @@ def api_image_status(job_id):
         return jsonify({'error': 'not_found'}), 404
     # attach a download_url if finished
     data = {k: job[k] for k in ('id','status','progress','started_at','ended_at','md5','sha1','error') if k in job}
+    if job.get('block_hash_map'):
+        data['block_hash_map'] = os.path.basename(job['block_hash_map'])
     if job.get('status') == 'finished' and job.get('target'):
         # target is absolute path under session folder
         sess_folder = app.config.get('SESSION_FOLDER')
@@ -1555,10 +1593,18 @@ def api_fs_delete():
     if not is_path_under_allowed_roots(abs_path) or not os.path.exists(abs_path):
         return jsonify({'error': 'access_denied_or_not_found'}), 403
     try:
+        try:
+            store_objects = artifact_store_objects([abs_path])
+        except Exception:
+            store_objects = set()
         if os.path.isdir(abs_path):
             shutil.rmtree(abs_path)
         else:
             os.remove(abs_path)
+        try:
+            prune_artifact_store(store_objects)
+        except Exception:
+            pass
         try:
             audit_event('delete', abs_path, {'by': 'api_fs_delete'})
         except Exception:
@@ -1614,7 +1660,32 @@ def api_fs_upload():
     filename = secure_filename(f.filename)
     dest = os.path.join(dest_dir, filename)
     try:
-        f.save(dest)
+        # hash the stream as it is written instead of reading the file back afterwards
+        hashing_status.update({"in_progress": True, "progress": 0, "complete": False, "hashes": {}, "block_hash_map": None, "error": None})
+        block_map = open_block_hash_map(block_hash_map_path(dest)) if block_hash_map_enabled() else None
+        digests = open_digest_pipeline(consumers=block_hash_map_consumers(block_map))
+        try:
+            unshare_artifact(dest)
+            with open(dest, 'wb') as out_f:
+                chunk_index = 0
+                while True:
+                    chunk = f.stream.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out_f.write(chunk)
+                    feed_digest_pipeline(digests, chunk_index, chunk, HASH_BUFFER_COUNT)
+                    chunk_index += 1
+            hashes = close_digest_pipeline(digests)
+            digests = None
+            block_map_path = None
+            if block_map is not None:
+                block_map_path = close_block_hash_map(block_map)
+                block_map = None
+        finally:
+            if digests is not None:
+                close_digest_pipeline(digests)
+            if block_map is not None:
+                discard_block_hash_map(block_map)
         # register uploaded file in in-memory mapping so UI can display it immediately
         try:
             size = os.path.getsize(dest)
@@ -1631,17 +1702,15 @@ def api_fs_upload():
                 'status_changed_at': now_ts,
                 'status': 'uploaded'
             }
-            # kick off background hashing
-            try:
-                t = threading.Thread(target=calculate_hashes_threaded, args=(dest,))
-                t.daemon = True
-                t.start()
-            except Exception:
-                pass
+            record_evidence_hashes(filename, hashes)
+            cache_evidence_hashes(dest, hashes)
+            if block_map_path:
+                record_block_hash_map(filename, block_map_path)
         except Exception:
             pass
         return jsonify({'uploaded': True, 'path': os.path.relpath(dest, root_path)})
     except Exception as e:
+        hashing_status.update({"in_progress": False, "complete": True, "error": str(e)})
         return jsonify({'error': 'upload_failed', 'message': str(e)}), 500
 
 
@@ -1911,6 +1980,220 @@ def end_analysis_session(sess_id):
         except Exception:
             pass
 
+# --- Content-Addressed Artifact Store ---
+# Every recorded artifact is stored once under its SHA-256; session folders only hold links.
+ARTIFACT_STORE_FOLDER = os.path.join(APP_ROOT, 'Artifact Store')
+app.config['ARTIFACT_STORE_FOLDER'] = ARTIFACT_STORE_FOLDER
+# Linux FICLONE ioctl: share the source's extents (btrfs, XFS, ...) instead of copying them.
+FICLONE = 0x40049409
+
+def link_artifact(src, dest):
+    """Makes `dest` a view of the file `src` without rewriting its data where possible.
+
+    Tries a hardlink, then a reflink, and copies only when both fail (e.g. across
+    filesystems). An existing `dest` is replaced. Returns 'link', 'reflink' or 'copy'.
+    Linked artifacts share storage, so they must never be modified in place.
+    """
+    if os.path.lexists(dest):
+        if os.path.exists(dest) and os.path.samefile(src, dest):
+            return 'link'
+        os.unlink(dest)
+    try:
+        os.link(src, dest)
+        return 'link'
+    except OSError:
+        pass
+    try:
+        import fcntl
+        with open(src, 'rb') as sf, open(dest, 'wb') as df:
+            fcntl.ioctl(df.fileno(), FICLONE, sf.fileno())
+        shutil.copystat(src, dest)
+        return 'reflink'
+    except (ImportError, OSError):
+        try:
+            os.unlink(dest)
+        except OSError:
+            pass
+    shutil.copy2(src, dest)
+    return 'copy'
+
+def _artifact_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CARVE_COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def unshare_artifact(path):
+    """Unlinks `path` when other links share its inode (see link_artifact); call before rewriting it.
+
+    Opening a linked artifact with 'wb' would truncate the store object and every
+    session view of it, so a rewrite must start from a new inode instead.
+    """
+    try:
+        if os.stat(path).st_nlink > 1:
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def store_artifact(path, sha256=None):
+    """Adds the file at `path` to the artifact store and returns the store object's path.
+
+    The object lives at <store>/<sha256[:2]>/<sha256>. On the same filesystem it is a
+    hardlink to `path`, so nothing is written. When identical content is already
+    stored, `path` is swapped for a link to that object, so duplicates take no extra
+    space. `sha256` may be passed when the caller already hashed the content.
+    """
+    if sha256 is None:
+        sha256 = _artifact_sha256(path)
+    root = app.config.get('ARTIFACT_STORE_FOLDER', ARTIFACT_STORE_FOLDER)
+    obj = os.path.join(root, sha256[:2], sha256)
+    os.makedirs(os.path.dirname(obj), exist_ok=True)
+    if not os.path.exists(obj):
+        link_artifact(path, obj)
+    elif not os.path.samefile(obj, path):
+        tmp = f"{path}.fac-link"
+        try:
+            os.link(obj, tmp)
+            os.replace(tmp, path)
+        except OSError:
+            # another filesystem: keep the file, the store already holds its content
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+    return obj
+
+def artifact_store_objects(paths):
+    """Returns the store objects linked to by the files at or below `paths`.
+
+    Meant to be called just before those files are deleted, so that only these
+    objects have to be pruned afterwards (see prune_artifact_store). A file with a
+    single link cannot share a store object and is skipped; the others are hashed
+    to find theirs.
+    """
+    root = app.config.get('ARTIFACT_STORE_FOLDER', ARTIFACT_STORE_FOLDER)
+    objects = set()
+    for path in paths:
+        if os.path.isdir(path) and not os.path.islink(path):
+            files = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(path) for name in names]
+        else:
+            files = [path]
+        for file_path in files:
+            try:
+                if os.path.islink(file_path) or not os.path.isfile(file_path) or os.stat(file_path).st_nlink < 2:
+                    continue
+                sha256 = _artifact_sha256(file_path)
+                obj = os.path.join(root, sha256[:2], sha256)
+                if os.path.exists(obj) and os.path.samefile(obj, file_path):
+                    objects.add(obj)
+            except OSError:
+                continue
+    return objects
+
+def prune_artifact_store(objects=None):
+    """Removes store objects no artifact folder links to anymore; returns how many were removed.
+
+    An object with a single link is referenced by nothing but the store. Objects that
+    had to be copied in from another filesystem always look like that; dropping them
+    only means a later duplicate of that content is stored again. With `objects`
+    (see artifact_store_objects) only those are checked instead of the whole store.
+    """
+    if objects is None:
+        root = app.config.get('ARTIFACT_STORE_FOLDER', ARTIFACT_STORE_FOLDER)
+        objects = (os.path.join(dirpath, name) for dirpath, _, filenames in os.walk(root) for name in filenames)
+    removed = 0
+    for obj in objects:
+        try:
+            if os.stat(obj).st_nlink == 1:
+                os.unlink(obj)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+# Per-session subfolders for the artifact types that are mirrored into the session folder
+SESSION_ARTIFACT_FOLDERS = {
+    'carved': 'Carved',
+    'deleted_recovered': 'Deleted',
+    'deleted': 'Deleted',
+    'report': 'Reports',
+    'log': 'Logs',
+    'event_log': 'Events',
+    'manual_carve': 'ManualCarving'
+}
+
+def _resolve_session_folder(conn, session_id=None):
+    """Returns (session_path, session_id) of the session artifacts are filed under.
+
+    Background threads and worker contexts may not have Flask `session` available, so
+    this falls back to the sessions table (by `session_id`, else the active or most
+    recent session) to find the runtime session_path.
+    """
+    sess_path = None
+    runtime_sid = session_id
+    # Try Flask session first (available in request contexts)
+    try:
+        sess_path = session.get('analysis_session_path')
+        if not runtime_sid:
+            runtime_sid = session.get('analysis_session_id')
+    except Exception:
+        sess_path = None
+
+    # If not available, try to look up in DB. Prefer provided session_id, else look for active session
+    try:
+        if not sess_path:
+            cur = conn.cursor()
+            if runtime_sid:
+                cur.execute('SELECT session_path, ended_at FROM sessions WHERE id=?', (runtime_sid,))
+                row = cur.fetchone()
+                candidate = None
+                if row:
+                    candidate = row[0] or row[1]
+                if candidate and os.path.isdir(candidate):
+                    sess_path = candidate
+            else:
+                # look for an active session with a session_path first
+                try:
+                    cur.execute("SELECT id, session_path FROM sessions WHERE active=1 AND session_path IS NOT NULL ORDER BY started_at DESC LIMIT 1")
+                    r = cur.fetchone()
+                    if r and r[1] and os.path.isdir(r[1]):
+                        runtime_sid = r[0]
+                        sess_path = r[1]
+                    else:
+                        # fallback: most recent session with a session_path
+                        cur.execute("SELECT id, session_path FROM sessions WHERE session_path IS NOT NULL ORDER BY started_at DESC LIMIT 1")
+                        r2 = cur.fetchone()
+                        if r2 and r2[1] and os.path.isdir(r2[1]):
+                            runtime_sid = r2[0]
+                            sess_path = r2[1]
+                except Exception:
+                    pass
+    except Exception:
+        sess_path = None
+    return sess_path, runtime_sid
+
+def _link_into_session_folder(sess_path, file_type, filename, path, extra=None):
+    """Gives the session folder a view of the artifact at `path` (see link_artifact)."""
+    # Create subfolders per artifact type for neatness inside the session folder
+    dest_dir = os.path.join(sess_path, SESSION_ARTIFACT_FOLDERS.get(file_type, 'Misc'))
+    os.makedirs(dest_dir, exist_ok=True)
+    dest = os.path.join(dest_dir, secure_filename(filename))
+    # If file is already the intended target, skip copying
+    try:
+        if os.path.abspath(path) != os.path.abspath(dest) and os.path.isfile(path):
+            # Store the content once and give the session folder a link to it
+            try:
+                known_sha = extra.get('sha256') if isinstance(extra, dict) else None
+                link_artifact(store_artifact(path, known_sha), dest)
+            except Exception:
+                try:
+                    unshare_artifact(dest)
+                    shutil.copy2(path, dest)
+                except Exception:
+                    pass
+        # if original path doesn't exist (e.g., we were given bytes), nothing to copy
+    except Exception:
+        pass
+
 def add_file_record(filename, file_type, path, size_bytes=0, session_id=None, extra=None):
     # If a target DB was provided in extra (e.g. from the Upload Storage Target card), prefer that
     try:
@@ -1962,94 +2245,19 @@ def add_file_record(filename, file_type, path, size_bytes=0, session_id=None, ex
                     (filename, file_type, path, size_bytes, now, session_id, extra_json))
         conn.commit()
         # For session-scoped artifacts, ensure they live inside the per-session folder if possible.
-        # Background threads and worker contexts may not have Flask `session` available, so
-        # fall back to the sessions table (active or by provided session_id) to find the
-        # runtime session_path.
         try:
-            eligible_types = ('carved', 'deleted_recovered', 'report', 'log', 'event_log', 'deleted', 'manual_carve')
-            if file_type in eligible_types:
-                sess_path = None
-                runtime_sid = session_id
-                # Try Flask session first (available in request contexts)
-                try:
-                    sess_path = session.get('analysis_session_path')
-                    if not runtime_sid:
-                        runtime_sid = session.get('analysis_session_id')
-                except Exception:
-                    sess_path = None
-
-                # If not available, try to look up in DB. Prefer provided session_id, else look for active session
-                try:
-                    if not sess_path:
-                        cur2 = conn.cursor()
-                        if runtime_sid:
-                            cur2.execute('SELECT session_path, ended_at FROM sessions WHERE id=?', (runtime_sid,))
-                            row = cur2.fetchone()
-                            candidate = None
-                            if row:
-                                candidate = row[0] or row[1]
-                            if candidate and os.path.isdir(candidate):
-                                sess_path = candidate
-                        else:
-                            # look for an active session with a session_path first
-                            try:
-                                cur2.execute("SELECT id, session_path FROM sessions WHERE active=1 AND session_path IS NOT NULL ORDER BY started_at DESC LIMIT 1")
-                                r = cur2.fetchone()
-                                if r and r[1] and os.path.isdir(r[1]):
-                                    runtime_sid = r[0]
-                                    sess_path = r[1]
-                                else:
-                                    # fallback: most recent session with a session_path
-                                    cur2.execute("SELECT id, session_path FROM sessions WHERE session_path IS NOT NULL ORDER BY started_at DESC LIMIT 1")
-                                    r2 = cur2.fetchone()
-                                    if r2 and r2[1] and os.path.isdir(r2[1]):
-                                        runtime_sid = r2[0]
-                                        sess_path = r2[1]
-                            except Exception:
-                                pass
-                except Exception:
-                    sess_path = None
-
+            if file_type in SESSION_ARTIFACT_FOLDERS:
+                sess_path, runtime_sid = _resolve_session_folder(conn, session_id)
                 if sess_path:
-                    # Create subfolders per artifact type for neatness inside the session folder
-                    mapping = {
-                        'carved': 'Carved',
-                        'deleted_recovered': 'Deleted',
-                        'deleted': 'Deleted',
-                        'report': 'Reports',
-                        'log': 'Logs',
-                        'event_log': 'Events',
-                        'manual_carve': 'ManualCarving'
-                    }
-                    sub = mapping.get(file_type, 'Misc')
-                    dest_dir = os.path.join(sess_path, sub)
-                    os.makedirs(dest_dir, exist_ok=True)
-                    dest = os.path.join(dest_dir, secure_filename(filename))
-                    # If file is already the intended target, skip copying
-                    try:
-                        if os.path.abspath(path) != os.path.abspath(dest):
-                            if os.path.exists(path) and os.path.isfile(path):
-                                try:
-                                    shutil.copy2(path, dest)
-                                except Exception:
-                                    try:
-                                        with open(path, 'rb') as rf, open(dest, 'wb') as wf:
-                                            wf.write(rf.read())
-                                    except Exception:
-                                        pass
-                            else:
-                                # if original path doesn't exist (e.g., we were given bytes), nothing to copy
-                                pass
-                        # If we derived a runtime_sid from DB, attempt to update the DB record we just inserted
-                        if runtime_sid and not session_id:
-                            try:
-                                cur_update = conn.cursor()
-                                cur_update.execute('UPDATE files SET session_id=? WHERE id=?', (runtime_sid, cur.lastrowid))
-                                conn.commit()
-                            except Exception:
-                                pass
-                    except Exception:
-                        pass
+                    _link_into_session_folder(sess_path, file_type, filename, path, extra)
+                    # If we derived a runtime_sid from DB, attempt to update the DB record we just inserted
+                    if runtime_sid and not session_id:
+                        try:
+                            cur_update = conn.cursor()
+                            cur_update.execute('UPDATE files SET session_id=? WHERE id=?', (runtime_sid, cur.lastrowid))
+                            conn.commit()
+                        except Exception:
+                            pass
         except Exception:
             pass
     except Exception as e:
@@ -2061,6 +2269,79 @@ def add_file_record(filename, file_type, path, size_bytes=0, session_id=None, ex
             pass
 
 
+# --- Batched Record Writer ---
+# Carving and recovery jobs file thousands of artifacts; their rows are buffered and
+# inserted with one executemany per transaction instead of one commit per file.
+RECORD_WRITER_FLUSH_ROWS = 500
+RECORD_WRITER_FLUSH_MS = 250
+
+def open_record_writer(file_type, session_id=None):
+    """Starts a buffered writer for the `file_type` artifacts of one job; returns its state dict.
+
+    The storage target and the session folder are resolved once here instead of
+    for every record.
+    """
+    target_db = None
+    try:
+        target_db = session.get('selected_target_db')
+        if not session_id:
+            session_id = session.get('analysis_session_id')
+    except Exception:
+        pass
+    sess_path, runtime_sid = None, session_id
+    if file_type in SESSION_ARTIFACT_FOLDERS:
+        conn = _get_db_conn()
+        try:
+            sess_path, runtime_sid = _resolve_session_folder(conn, session_id)
+        finally:
+            conn.close()
+    return {
+        'file_type': file_type, 'target_db': target_db if target_db != 'local' else None,
+        'session_id': session_id or (runtime_sid if sess_path else None), 'session_path': sess_path,
+        'rows': [], 'last_flush': time.monotonic(), 'lock': threading.Lock(),
+        'flush_rows': app.config.get('RECORD_WRITER_FLUSH_ROWS', RECORD_WRITER_FLUSH_ROWS),
+        'flush_ms': app.config.get('RECORD_WRITER_FLUSH_MS', RECORD_WRITER_FLUSH_MS),
+    }
+
+def queue_file_record(writer, filename, path, size_bytes=0, extra=None):
+    """Buffers a files row like add_file_record; flushes every flush_rows rows or flush_ms."""
+    if writer['target_db']:
+        # remote targets get a save job per file
+        return add_file_record(filename, writer['file_type'], path, size_bytes, session_id=writer['session_id'],
+                               extra=dict(extra or {}, target_db=writer['target_db']))
+    if writer['session_path']:
+        _link_into_session_folder(writer['session_path'], writer['file_type'], filename, path, extra)
+    row = (filename, writer['file_type'], path, size_bytes, datetime.datetime.now().isoformat(), writer['session_id'],
+           json.dumps(extra) if extra is not None else None)
+    with writer['lock']:
+        writer['rows'].append(row)
+        if len(writer['rows']) >= writer['flush_rows'] or (time.monotonic() - writer['last_flush']) * 1000 >= writer['flush_ms']:
+            _flush_record_writer(writer)
+    return True
+
+def _flush_record_writer(writer):
+    rows, writer['rows'] = writer['rows'], []
+    writer['last_flush'] = time.monotonic()
+    if not rows:
+        return
+    try:
+        conn = _get_db_conn()
+        try:
+            with conn:
+                conn.executemany('INSERT INTO files(filename, file_type, path, size_bytes, created_at, session_id, extra) VALUES(?,?,?,?,?,?,?)', rows)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Record writer flush error ({len(rows)} rows): {e}")
+
+def close_record_writer(writer):
+    """Writes out the rows still buffered."""
+    if writer is None:
+        return
+    with writer['lock']:
+        _flush_record_writer(writer)
+
+
 def _save_bytes_to_session_file(data_bytes, filename, file_type='report'):
     """Save bytes or BytesIO to a file in SESSION_FOLDER and record in DB.
 
@@ -2098,6 +2379,7 @@ def _save_bytes_to_session_file(data_bytes, filename, file_type='report'):
         except Exception:
             raw = data_bytes
 
+        unshare_artifact(dest_path)
         with open(dest_path, 'wb') as wf:
             if isinstance(raw, str):
                 wf.write(raw.encode('utf-8'))
@@ -2539,10 +2821,31 @@ except Exception:
 # Update your status dictionaries at the top of the file
 carving_status = {
     "progress": 0, "current_offset": "0x00000000", "files_found": 0,
-    "complete": False, "found_files_list": [], "time_remaining_str": "N/A",
+    "complete": False, "time_remaining_str": "N/A",
     "start_time": None, "estimated_total_time": None, "elapsed_time": "0s"
 }
 
+# Recent carving hits: a fixed-size ring polled by cursor (see /carving_status?since=).
+# `seq` only grows, so a cursor from an earlier run never hides the hits of a new one.
+CARVING_RECENT_HITS = 200
+carving_hits = {"seq": 0, "recent": deque(maxlen=CARVING_RECENT_HITS)}
+
+def record_carving_hit(name, found_pos):
+    """Adds a hit to the ring; only the carving thread records hits."""
+    seq = carving_hits["seq"] + 1
+    carving_hits["recent"].append({"seq": seq, "name": name, "offset": f"0x{found_pos:08X}"})
+    carving_hits["seq"] = seq
+
+def carving_hits_since(since):
+    """Returns (hits after cursor `since` in order, whether older unseen hits fell out of the ring)."""
+    hits = []
+    for hit in reversed(list(carving_hits["recent"])):
+        if hit["seq"] <= since:
+            break
+        hits.append(hit)
+    hits.reverse()
+    return hits, bool(hits) and hits[0]["seq"] > since + 1
+
 deleted_scan_status = {
     "in_progress": False, 
     "files_found": 0, 
@@ -2826,6 +3129,7 @@ def custom_encrypt_file(file_path: str, original_filename: str, password: str, o
         output_filename = f"{original_filename}.enc"
         output_path = os.path.join(output_dir, output_filename)
         
+        unshare_artifact(output_path)
         with open(output_path, 'wb') as f:
             f.write(CUSTOM_ENC_HEADER)
             f.write(salt)
@@ -2973,45 +3277,108 @@ def format_hex_view(data_bytes, start_offset=0):
         lines.append(f"{offset_str}  {hex_str:<47} {ascii_str}")
     return '\n'.join(lines)
 
-def is_valid_mp3_stream(data, start_offset=0, frames_to_check=5):
-    """Checks for a sequence of valid, contiguous MP3 frames."""
-    BITRATE_MAP = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0]
-    SAMPLERATE_MAP = [44100, 48000, 32000, 0]
-
-    current_offset = start_offset
-    frames_found = 0
-
-    while frames_found < frames_to_check:
-        if current_offset + 4 > len(data):
-            break
-
-        header_bytes = data[current_offset : current_offset + 4]
-
-        is_mpeg1_layer3 = (header_bytes[0] == 0xFF and (header_bytes[1] & 0xE0) == 0xE0 and
-                         ((header_bytes[1] >> 3) & 3) == 1 and ((header_bytes[1] >> 1) & 3) == 1)
-
-        if not is_mpeg1_layer3:
-            break
-
-        bitrate_bits = (header_bytes[2] >> 4) & 15
-        samplerate_bits = (header_bytes[2] >> 2) & 3
-        padding_bit = (header_bytes[2] >> 1) & 1
+# --- MP3 Frame Sync ---
+# MPEG-1 Layer III tables; a frame is 144 * bitrate / sample_rate (+1 padding) bytes.
+MP3_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0)
+MP3_SAMPLE_RATES = (44100, 48000, 32000, 0)
+# Non-frame bytes tolerated in a row before a frame stream is considered finished.
+MP3_MAX_INVALID_FRAMES = 10
+# Frames chained one header at a time before the walk switches to bulk sync tables;
+# most header hits are false positives that fail within a few bytes.
+MP3_SYNC_BULK_AFTER = 16
+# Sync tables cover this many offsets at once, doubling from the minimum.
+MP3_SYNC_MIN_CHUNK = 64 * 1024
+MP3_SYNC_MAX_CHUNK = 4 * 1024 * 1024
+
+if np is not None:
+    _MP3_FRAME_BASE = np.array([[144000 * b // r if b and r else 0 for r in MP3_SAMPLE_RATES] for b in MP3_BITRATES], dtype=np.int32)
+
+def mp3_frame_size(b0, b1, b2, strict=False):
+    """Returns the frame size of the header starting with bytes b0 b1 b2.
+
+    0 means no frame sync, -1 a sync word whose bitrate/sample rate fields are
+    invalid. With `strict` the header must also declare MPEG-1 Layer III.
+    """
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return 0
+    if strict and (((b1 >> 3) & 3) != 3 or ((b1 >> 1) & 3) != 1):
+        return 0
+    bitrate, sample_rate = MP3_BITRATES[b2 >> 4], MP3_SAMPLE_RATES[(b2 >> 2) & 3]
+    if bitrate == 0 or sample_rate == 0:
+        return -1
+    return 144000 * bitrate // sample_rate + ((b2 >> 1) & 1)
 
-        bitrate = BITRATE_MAP[bitrate_bits] * 1000
-        sample_rate = SAMPLERATE_MAP[samplerate_bits]
+def find_mp3_sync_words(data, start, end, strict=False):
+    """Vectorized frame-sync search over the offsets [start, end); reads data[start:end+3].
 
-        if bitrate == 0 or sample_rate == 0:
+    Returns (offsets, sizes): every offset holding a 0xFFE sync word and its
+    mp3_frame_size, computed from the lookup tables for all of them at once.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8, count=end + 3 - start, offset=start)
+    offsets = np.flatnonzero(buf[:-3] == 0xFF)
+    b1 = buf[offsets + 1]
+    sync = (b1 & 0xE0) == 0xE0
+    if strict:
+        sync &= (((b1 >> 3) & 3) == 3) & (((b1 >> 1) & 3) == 1)
+    offsets = offsets[sync]
+    b2 = buf[offsets + 2].astype(np.int32)
+    base = _MP3_FRAME_BASE[b2 >> 4, (b2 >> 2) & 3]
+    sizes = np.where(base > 0, base + ((b2 >> 1) & 1), -1)
+    return (offsets + start).tolist(), sizes.tolist()
+
+def walk_mp3_frames(data, start, limit, max_invalid=MP3_MAX_INVALID_FRAMES, max_frames=None, strict=False):
+    """Chains MP3 frames from `start`; returns (total frame bytes, frame count).
+
+    Bytes that do not start a frame are skipped until `max_invalid` of them occur in a
+    row (a sync word with invalid fields restarts that count). Once a stream is
+    established the sync words of a whole chunk are located in bulk (see
+    find_mp3_sync_words), so each frame and each non-sync gap costs a single lookup;
+    before that, or without NumPy, headers are decoded one at a time and the next
+    candidate is located with find(). Frames must fit below `limit`.
+    """
+    last = limit - 3  # a header needs 4 bytes
+    table_start = table_end = 0
+    sync_offsets, sync_sizes = [], {}
+    chunk = MP3_SYNC_MIN_CHUNK
+    total = frames = invalid = 0
+    pos = start
+    while pos < last and (max_frames is None or frames < max_frames):
+        bulk = np is not None and frames >= MP3_SYNC_BULK_AFTER
+        if bulk and not table_start <= pos < table_end:
+            table_start, table_end = pos, min(pos + chunk, last)
+            sync_offsets, sizes = find_mp3_sync_words(data, table_start, table_end, strict)
+            sync_sizes = dict(zip(sync_offsets, sizes))
+            chunk = min(chunk * 2, MP3_SYNC_MAX_CHUNK)
+        if bulk:
+            size = sync_sizes.get(pos, 0)
+        else:
+            size = mp3_frame_size(data[pos], data[pos + 1], data[pos + 2], strict)
+        if size > 0:
+            total += size
+            frames += 1
+            invalid = 0
+            pos += size
+            continue
+        invalid = 1 if size < 0 else invalid + 1
+        if invalid >= max_invalid:
             break
-
-        frame_size = int((144 * bitrate / sample_rate) + padding_bit)
-
-        if frame_size <= 1:
+        # every byte up to the next sync candidate is another invalid one
+        if bulk:
+            i = bisect.bisect_left(sync_offsets, pos + 1)
+            nxt = sync_offsets[i] if i < len(sync_offsets) else table_end
+        else:
+            nxt = data.find(b'\xff', pos + 1, last)
+            nxt = last if nxt == -1 else nxt
+        invalid += nxt - (pos + 1)
+        if invalid >= max_invalid:
             break
+        pos = nxt
+    return total, frames
 
-        current_offset += frame_size
-        frames_found += 1
-
-    return frames_found >= frames_to_check
+def is_valid_mp3_stream(data, start_offset=0, frames_to_check=5):
+    """Checks for a sequence of valid, contiguous MP3 frames."""
+    _, frames = walk_mp3_frames(data, start_offset, len(data), max_invalid=1, max_frames=frames_to_check, strict=True)
+    return frames >= frames_to_check
 
 # --- Log Parsing Helpers ---
 def parse_text_log(filepath, max_lines=10000):
@@ -3150,7 +3517,7 @@ def perform_forensic_analysis(file_path):
                 results.append(f"✓ Partition Table Type: {vstype_map.get(volume.info.vstype, 'Unknown')}")
                 for part in volume:
                     if part.flags != pytsk3.TSK_VS_PART_FLAG_UNALLOC:
-                        partition_info.append({"addr": part.addr, "desc": part.desc.decode('utf-8', 'ignore'), "start": part.start, "len": part.len})
+                        partition_info.append({"addr": part.addr, "desc": part.desc.decode('utf-8', 'ignore'), "start": part.start, "len": part.len, "sector_size": volume.info.block_size})
         except IOError: 
             results.append("ℹ️ No partition table found or image is a single volume.")
         except Exception as e: 
@@ -3162,31 +3529,454 @@ def perform_forensic_analysis(file_path):
         results.append(f"❌ Analysis error: {str(e)}")
     return results, partition_info
 
-def calculate_hashes_threaded(file_path):
-    """Calculates MD5, SHA1, and SHA256 hashes in a background thread."""
-    hashing_status.update({"in_progress": True, "progress": 0, "complete": False, "hashes": {}})
-    md5, sha1, sha256 = hashlib.md5(), hashlib.sha1(), hashlib.sha256()
-    CHUNK_SIZE = 4 * 1024 * 1024
+# --- Evidence Metadata Cache ---
+# The hashes and header analysis of an evidence file are kept in the evidence_cache
+# table, so reopening a known image skips hashing, pytsk3 and the header scans. A row
+# belongs to a file identity (device, inode, size, mtime_ns) and is only trusted
+# while the first and last EVIDENCE_FINGERPRINT_SIZE bytes still match.
+EVIDENCE_FINGERPRINT_SIZE = 1024 * 1024
+EVIDENCE_CACHE_FIELDS = ('hashes', 'encryption', 'forensic_results', 'partition_info')
+
+def _open_evidence_cache():
+    conn = _get_db_conn()
+    conn.execute('''CREATE TABLE IF NOT EXISTS evidence_cache (
+        dev INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER, fingerprint TEXT, sha256 TEXT,
+        hashes TEXT, encryption TEXT, forensic_results TEXT, partition_info TEXT, entropy REAL, updated_at TEXT,
+        PRIMARY KEY (dev, inode, size, mtime_ns))''')
+    conn.execute('CREATE INDEX IF NOT EXISTS evidence_cache_by_content ON evidence_cache(size, sha256)')
+    return conn
+
+def evidence_identity(filepath):
+    """Returns the identity dict of `filepath`: stat key, head/tail fingerprint and header entropy."""
+    st = os.stat(filepath)
+    fingerprint = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        head = f.read(EVIDENCE_FINGERPRINT_SIZE)
+        fingerprint.update(head)
+        if st.st_size > EVIDENCE_FINGERPRINT_SIZE:
+            f.seek(max(len(head), st.st_size - EVIDENCE_FINGERPRINT_SIZE))
+            fingerprint.update(f.read(EVIDENCE_FINGERPRINT_SIZE))
+    return {'dev': st.st_dev, 'inode': st.st_ino, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+            'fingerprint': fingerprint.hexdigest(), 'entropy': calculate_entropy(head[:4096])}
+
+def _evidence_cache_row(row):
+    cached = {field: json.loads(value) if value else None for field, value in zip(EVIDENCE_CACHE_FIELDS, row[:4])}
+    cached['entropy'] = row[4]
+    return cached
+
+def load_evidence_cache(identity, sha256=None):
+    """Returns the cached metadata of the file with `identity`, or None.
+
+    A row whose fingerprint no longer matches is dropped. With the file's `sha256`
+    (known right after an upload) a row of the same content under another identity
+    is used too.
+    """
+    conn = _open_evidence_cache()
     try:
-        file_size = os.path.getsize(file_path)
-        with open(file_path, 'rb') as f:
-            bytes_read = 0
+        key = (identity['dev'], identity['inode'], identity['size'], identity['mtime_ns'])
+        row = conn.execute('SELECT hashes, encryption, forensic_results, partition_info, entropy, fingerprint FROM evidence_cache '
+                           'WHERE dev=? AND inode=? AND size=? AND mtime_ns=?', key).fetchone()
+        if row and row[5] != identity['fingerprint']:
+            with conn:
+                conn.execute('DELETE FROM evidence_cache WHERE dev=? AND inode=? AND size=? AND mtime_ns=?', key)
+            row = None
+        if row is None and sha256:
+            row = conn.execute('SELECT hashes, encryption, forensic_results, partition_info, entropy, fingerprint FROM evidence_cache '
+                               'WHERE size=? AND sha256=? AND fingerprint=? AND forensic_results IS NOT NULL LIMIT 1',
+                               (identity['size'], sha256, identity['fingerprint'])).fetchone()
+        return _evidence_cache_row(row) if row else None
+    finally:
+        conn.close()
+
+def store_evidence_cache(identity, **fields):
+    """Records `fields` (see EVIDENCE_CACHE_FIELDS) for `identity`, keeping the ones already cached.
+
+    Rows of earlier versions of the same file (same device and inode) are replaced.
+    """
+    conn = _open_evidence_cache()
+    try:
+        key = (identity['dev'], identity['inode'], identity['size'], identity['mtime_ns'])
+        row = conn.execute('SELECT hashes, encryption, forensic_results, partition_info, entropy FROM evidence_cache '
+                           'WHERE dev=? AND inode=? AND size=? AND mtime_ns=? AND fingerprint=?', key + (identity['fingerprint'],)).fetchone()
+        merged = _evidence_cache_row(row) if row else {}
+        merged.update({field: value for field, value in fields.items() if value is not None})
+        hashes = merged.get('hashes') or {}
+        with conn:
+            conn.execute('DELETE FROM evidence_cache WHERE dev=? AND inode=?', key[:2])
+            conn.execute('INSERT INTO evidence_cache VALUES (?,?,?,?,?,?,?,?,?,?,?,?)',
+                         key + (identity['fingerprint'], hashes.get('SHA-256'))
+                         + tuple(json.dumps(merged[field]) if merged.get(field) is not None else None for field in EVIDENCE_CACHE_FIELDS)
+                         + (identity['entropy'], datetime.datetime.now().isoformat()))
+    finally:
+        conn.close()
+
+def analyze_evidence(filepath, hashes=None):
+    """Returns (encryption_info, forensic_results, partition_info, hashes) of an evidence file.
+
+    Known files are answered from the evidence cache; otherwise detect_encryption and
+    perform_forensic_analysis run and their results are cached. `hashes` are
+    the digests already computed for the file (e.g. while uploading); the returned
+    hashes are None when they still have to be calculated.
+    """
+    identity = None
+    try:
+        identity = evidence_identity(filepath)
+        cached = load_evidence_cache(identity, (hashes or {}).get('SHA-256'))
+    except Exception as e:
+        print(f"Evidence cache unavailable: {e}")
+        cached = None
+    if cached and cached.get('forensic_results') is not None and cached.get('encryption') is not None:
+        hashes = hashes or cached.get('hashes')
+        if identity is not None:
+            try:
+                store_evidence_cache(identity, hashes=hashes, encryption=cached['encryption'],
+                                     forensic_results=cached['forensic_results'], partition_info=cached['partition_info'])
+            except Exception as e:
+                print(f"Evidence cache update failed: {e}")
+        return cached['encryption'], cached['forensic_results'], cached['partition_info'] or [], hashes
+    encryption_info = detect_encryption(filepath)
+    forensic_results, partition_info = perform_forensic_analysis(filepath)
+    if identity is not None:
+        try:
+            store_evidence_cache(identity, hashes=hashes, encryption=encryption_info,
+                                 forensic_results=forensic_results, partition_info=partition_info)
+        except Exception as e:
+            print(f"Evidence cache update failed: {e}")
+    return encryption_info, forensic_results, partition_info, hashes
+
+def cache_evidence_hashes(filepath, hashes):
+    """Adds freshly calculated `hashes` to the evidence cache entry of `filepath`."""
+    try:
+        store_evidence_cache(evidence_identity(filepath), hashes=hashes)
+    except Exception as e:
+        print(f"Evidence cache update failed: {e}")
+
+# --- Parallel Digest Pipeline ---
+# hashlib releases the GIL while digesting large buffers, so each algorithm gets its
+# own thread and hashing takes as long as the slowest digest rather than their sum.
+HASH_ALGORITHMS = (('MD5', 'md5'), ('SHA-1', 'sha1'), ('SHA-256', 'sha256'))
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+HASH_BUFFER_COUNT = 2  # double buffering: the reader fills one buffer while the digests consume the other
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # uploads are written and hashed in chunks of this size
+
+def _digest_worker(update, chunks, released, errors):
+    """Digest thread: calls `update` on each (token, data) from `chunks` until None, releasing the tokens.
+
+    Once `update` raised, its exception is added to `errors` and the remaining
+    chunks are only released, so the feeder never waits for this thread forever.
+    """
+    failed = False
+    while True:
+        item = chunks.get()
+        if item is None:
+            return
+        token, data = item
+        try:
+            if not failed:
+                update(data)
+        except Exception as e:
+            failed = True
+            errors.append(e)
+        finally:
+            released.put(token)
+
+def open_digest_pipeline(algorithms=None, consumers=()):
+    """Starts one digest thread per (label, hashlib name) in `algorithms`; returns the pipeline state dict.
+
+    Each callable in `consumers` gets its own thread too and is called with every chunk.
+    """
+    hashers = [(label, hashlib.new(name)) for label, name in (algorithms or HASH_ALGORITHMS)]
+    updates = [hasher.update for _, hasher in hashers] + list(consumers)
+    released = queue.Queue()
+    errors = []
+    feeds = [queue.Queue() for _ in updates]
+    threads = [threading.Thread(target=_digest_worker, args=(update, feed, released, errors), daemon=True)
+               for update, feed in zip(updates, feeds)]
+    for thread in threads:
+        thread.start()
+    return {'hashers': hashers, 'feeds': feeds, 'released': released, 'threads': threads, 'holders': {},
+            'errors': errors, 'closed': False}
+
+def wait_digest_release(pipeline):
+    """Blocks until every digest is done with one fed chunk; returns that chunk's token."""
+    holders = pipeline['holders']
+    while True:
+        token = pipeline['released'].get()
+        holders[token] -= 1
+        if holders[token] == 0:
+            del holders[token]
+            return token
+
+def _raise_digest_error(pipeline):
+    # an error is raised once: the cleanup that closes a failed pipeline must not raise it again
+    if pipeline['errors']:
+        error = pipeline['errors'][0]
+        pipeline['errors'].clear()
+        raise error
+
+def feed_digest_pipeline(pipeline, token, data, max_in_flight=None):
+    """Hands `data` to every digest thread; it must stay unchanged until `token` is released.
+
+    With `max_in_flight`, first waits until fewer chunks than that are in flight.
+    Raises the error of a failed digest or consumer instead of feeding it more.
+    """
+    while max_in_flight and len(pipeline['holders']) >= max_in_flight:
+        wait_digest_release(pipeline)
+    _raise_digest_error(pipeline)
+    pipeline['holders'][token] = len(pipeline['feeds'])
+    for feed in pipeline['feeds']:
+        feed.put((token, data))
+
+def close_digest_pipeline(pipeline):
+    """Waits for the digests to finish; returns {label: hexdigest}.
+
+    Raises the first error of a digest or consumer that was not raised yet.
+    """
+    if not pipeline['closed']:
+        pipeline['closed'] = True
+        for feed in pipeline['feeds']:
+            feed.put(None)
+    for thread in pipeline['threads']:
+        thread.join()
+    _raise_digest_error(pipeline)
+    return {label: hasher.hexdigest() for label, hasher in pipeline['hashers']}
+
+def hash_file_parallel(file_path, algorithms=None, chunk_size=None, buffers=None, progress=None, block_map=None):
+    """Returns {label: hexdigest} of `file_path` for each (label, hashlib name) in `algorithms`.
+
+    The file is read into a ring of `buffers` preallocated buffers, and every
+    buffer is handed to one digest thread per algorithm as a memoryview, so no
+    chunk is copied. A buffer is refilled once all digests released it.
+    `progress(bytes_read)` is called after every read. An open `block_map`
+    (see open_block_hash_map) is fed from the same buffers by its own thread.
+    """
+    chunk_size = chunk_size or app.config.get('HASH_CHUNK_SIZE', HASH_CHUNK_SIZE)
+    buffers = max(2, buffers or app.config.get('HASH_BUFFER_COUNT', HASH_BUFFER_COUNT))
+    views = [memoryview(bytearray(chunk_size)) for _ in range(buffers)]
+    free = deque(range(buffers))
+    bytes_read = 0
+    pipeline = open_digest_pipeline(algorithms, block_hash_map_consumers(block_map))
+    try:
+        with open(file_path, 'rb', buffering=0) as f:
             while True:
-                chunk = f.read(CHUNK_SIZE)
-                if not chunk: 
+                if not free:
+                    free.append(wait_digest_release(pipeline))
+                index = free.popleft()
+                length = f.readinto(views[index])
+                if not length:
                     break
-                bytes_read += len(chunk)
-                md5.update(chunk); sha1.update(chunk); sha256.update(chunk)
-                hashing_status["progress"] = int((bytes_read / file_size) * 100) if file_size > 0 else 100
-        final_hashes = {'MD5': md5.hexdigest(), 'SHA-1': sha1.hexdigest(), 'SHA-256': sha256.hexdigest()}
-        hashing_status.update({"in_progress": False, "complete": True, "hashes": final_hashes})
-        filename = os.path.basename(file_path)
-        if filename in uploaded_files_db:
-            uploaded_files_db[filename]['hash_info'] = final_hashes
-            uploaded_files_db[filename]['hashing_complete'] = True
+                bytes_read += length
+                feed_digest_pipeline(pipeline, index, views[index][:length])
+                if progress is not None:
+                    progress(bytes_read)
+    finally:
+        hashes = close_digest_pipeline(pipeline)
+    return hashes
+
+def record_evidence_hashes(filename, hashes):
+    """Publishes finished evidence hashes in hashing_status and the uploaded file's entry."""
+    hashing_status.update({"in_progress": False, "complete": True, "progress": 100, "hashes": hashes})
+    if filename in uploaded_files_db:
+        uploaded_files_db[filename]['hash_info'] = hashes
+        uploaded_files_db[filename]['hashing_complete'] = True
+
+# --- Block Hash Map ---
+# Optional piecewise hashing: besides the whole-file digests, every coarse block gets
+# a SHA-256 and every fine block an MD5, so a changed or unreadable region of an image
+# can be located and re-verified without hashing the whole image again.
+# Sidecar layout (little endian): magic, image size (8 bytes), coarse and fine block
+# size (4 bytes each), then one record per coarse block: its SHA-256 followed by the
+# MD5 of each fine block inside it. Every record but the last has the same length, so
+# the record of any offset is found with one seek.
+BLOCK_HASH_MAP = False  # write a block hash map while hashing evidence and creating images
+BLOCK_HASH_COARSE_SIZE = 1024 * 1024
+BLOCK_HASH_FINE_SIZE = 4 * 1024
+BLOCK_HASH_SUFFIX = '.blockhash'
+BLOCK_HASH_MAGIC = b'FACBHM01'
+BLOCK_HASH_HEADER_SIZE = 24
+
+def block_hash_map_path(file_path):
+    """Returns the sidecar path of the block hash map of `file_path`."""
+    return file_path + BLOCK_HASH_SUFFIX
+
+def block_hash_map_enabled(requested=None):
+    """True when a block hash map should be written; `requested` overrides the BLOCK_HASH_MAP setting."""
+    if requested is None:
+        requested = app.config.get('BLOCK_HASH_MAP', BLOCK_HASH_MAP)
+    return str(requested).lower() in ('1', 'true', 'on', 'yes')
+
+def block_hash_map_consumers(block_map):
+    """Digest pipeline consumers (see open_digest_pipeline) that feed an open `block_map`, if any."""
+    return [lambda data: update_block_hash_map(block_map, data)] if block_map is not None else []
+
+def _block_hash_header(size, coarse, fine):
+    return BLOCK_HASH_MAGIC + size.to_bytes(8, 'little') + coarse.to_bytes(4, 'little') + fine.to_bytes(4, 'little')
+
+def open_block_hash_map(path, coarse_size=None, fine_size=None):
+    """Starts writing a block hash map to `path`; returns the writer state dict.
+
+    The map is written to a temporary file and only appears at `path` once
+    close_block_hash_map finished it.
+    """
+    coarse = coarse_size or app.config.get('BLOCK_HASH_COARSE_SIZE', BLOCK_HASH_COARSE_SIZE)
+    fine = fine_size or app.config.get('BLOCK_HASH_FINE_SIZE', BLOCK_HASH_FINE_SIZE)
+    if fine <= 0 or coarse % fine:
+        raise ValueError('block hash coarse size must be a multiple of the fine size')
+    handle = open(path + '.tmp', 'wb')
+    handle.write(_block_hash_header(0, coarse, fine))
+    return {'path': path, 'file': handle, 'coarse': coarse, 'fine': fine, 'size': 0,
+            'coarse_hasher': hashlib.sha256(), 'coarse_filled': 0,
+            'fine_hasher': None, 'fine_filled': 0, 'fine_digests': bytearray()}
+
+def _emit_block_hash_record(block_map):
+    block_map['file'].write(block_map['coarse_hasher'].digest() + block_map['fine_digests'])
+    block_map['coarse_hasher'] = hashlib.sha256()
+    block_map['coarse_filled'] = 0
+    block_map['fine_digests'] = bytearray()
+
+def update_block_hash_map(block_map, data):
+    """Adds the next `data` of the image to the block hash map; chunks may be of any length."""
+    view = memoryview(data)
+    coarse, fine = block_map['coarse'], block_map['fine']
+    pos, end = 0, len(view)
+    block_map['size'] += end
+    while pos < end:
+        if block_map['fine_hasher'] is not None:
+            # finish a fine block that straddles two chunks
+            take = min(fine - block_map['fine_filled'], end - pos)
+            piece = view[pos:pos + take]
+            block_map['fine_hasher'].update(piece)
+            block_map['coarse_hasher'].update(piece)
+            block_map['fine_filled'] += take
+            block_map['coarse_filled'] += take
+            pos += take
+            if block_map['fine_filled'] == fine:
+                block_map['fine_digests'] += block_map['fine_hasher'].digest()
+                block_map['fine_hasher'] = None
+                block_map['fine_filled'] = 0
+        else:
+            whole = min(end - pos, coarse - block_map['coarse_filled']) // fine * fine
+            if not whole:
+                block_map['fine_hasher'] = hashlib.md5()
+                continue
+            piece = view[pos:pos + whole]
+            block_map['coarse_hasher'].update(piece)
+            digests = block_map['fine_digests']
+            for offset in range(0, whole, fine):
+                digests += hashlib.md5(piece[offset:offset + fine]).digest()
+            block_map['coarse_filled'] += whole
+            pos += whole
+        if block_map['coarse_filled'] == coarse:
+            _emit_block_hash_record(block_map)
+
+def close_block_hash_map(block_map):
+    """Writes the trailing partial blocks and the final header; returns the sidecar path."""
+    if block_map['fine_hasher'] is not None:
+        block_map['fine_digests'] += block_map['fine_hasher'].digest()
+        block_map['fine_hasher'] = None
+    if block_map['coarse_filled']:
+        _emit_block_hash_record(block_map)
+    handle = block_map['file']
+    handle.seek(0)
+    handle.write(_block_hash_header(block_map['size'], block_map['coarse'], block_map['fine']))
+    handle.close()
+    os.replace(block_map['path'] + '.tmp', block_map['path'])
+    return block_map['path']
+
+def discard_block_hash_map(block_map):
+    """Drops an unfinished block hash map, e.g. when hashing or imaging failed."""
+    try:
+        block_map['file'].close()
+        os.remove(block_map['path'] + '.tmp')
+    except Exception:
+        pass
+
+def read_block_hash_map(path):
+    """Returns the header of the block hash map at `path` as a dict (size, coarse, fine, blocks)."""
+    with open(path, 'rb') as f:
+        header = f.read(BLOCK_HASH_HEADER_SIZE)
+    if len(header) < BLOCK_HASH_HEADER_SIZE or header[:8] != BLOCK_HASH_MAGIC:
+        raise ValueError(f'{path} is not a block hash map')
+    size = int.from_bytes(header[8:16], 'little')
+    coarse = int.from_bytes(header[16:20], 'little')
+    fine = int.from_bytes(header[20:24], 'little')
+    return {'path': path, 'size': size, 'coarse': coarse, 'fine': fine,
+            'blocks': (size + coarse - 1) // coarse, 'record_size': 32 + (coarse // fine) * 16}
+
+def block_hash_record(header, index, handle=None):
+    """Returns (sha256 digest, [md5 digests]) of coarse block `index` of a block hash map."""
+    if not 0 <= index < header['blocks']:
+        raise IndexError(index)
+    length = min(header['coarse'], header['size'] - index * header['coarse'])
+    fine_count = (length + header['fine'] - 1) // header['fine']
+    if handle is None:
+        with open(header['path'], 'rb') as f:
+            return block_hash_record(header, index, f)
+    handle.seek(BLOCK_HASH_HEADER_SIZE + index * header['record_size'])
+    record = handle.read(32 + fine_count * 16)
+    return record[:32], [record[32 + i * 16:48 + i * 16] for i in range(fine_count)]
+
+def verify_block_hash_range(file_path, start=0, length=None, map_path=None):
+    """Re-verifies `length` bytes of `file_path` from `start` against its block hash map.
+
+    Only the coarse blocks overlapping the range are read. Returns the list of
+    (offset, length) fine blocks whose content no longer matches the map; an
+    empty list means the range is intact.
+    """
+    header = read_block_hash_map(map_path or block_hash_map_path(file_path))
+    coarse, fine = header['coarse'], header['fine']
+    end = header['size'] if length is None else min(header['size'], start + length)
+    mismatches = []
+    if end <= start:
+        return mismatches
+    with open(file_path, 'rb') as image, open(header['path'], 'rb') as sidecar:
+        for index in range(start // coarse, (end - 1) // coarse + 1):
+            image.seek(index * coarse)
+            data = image.read(min(coarse, header['size'] - index * coarse))
+            coarse_digest, fine_digests = block_hash_record(header, index, sidecar)
+            if hashlib.sha256(data).digest() == coarse_digest:
+                continue
+            for i, expected in enumerate(fine_digests):
+                piece = data[i * fine:(i + 1) * fine]
+                offset = index * coarse + i * fine
+                if offset + fine > start and offset < end and hashlib.md5(piece).digest() != expected:
+                    mismatches.append((offset, len(piece)))
+    return mismatches
+
+def calculate_hashes_threaded(file_path, block_map=None):
+    """Calculates MD5, SHA1, and SHA256 hashes in a background thread (see hash_file_parallel).
+
+    With `block_map` (default: the BLOCK_HASH_MAP setting) a block hash map sidecar is
+    written next to the file during the same read.
+    """
+    hashing_status.update({"in_progress": True, "progress": 0, "complete": False, "hashes": {}, "block_hash_map": None, "error": None})
+    writer = None
+    try:
+        file_size = os.path.getsize(file_path)
+
+        def progress(bytes_read):
+            hashing_status["progress"] = int((bytes_read / file_size) * 100) if file_size > 0 else 100
+
+        if block_hash_map_enabled(block_map):
+            writer = open_block_hash_map(block_hash_map_path(file_path))
+        final_hashes = hash_file_parallel(file_path, progress=progress, block_map=writer)
+        if writer is not None:
+            record_block_hash_map(os.path.basename(file_path), close_block_hash_map(writer))
+            writer = None
+        record_evidence_hashes(os.path.basename(file_path), final_hashes)
+        cache_evidence_hashes(file_path, final_hashes)
     except Exception as e:
         print(f"Error during hashing: {e}")
         hashing_status.update({"in_progress": False, "complete": True, "error": str(e)})
+    finally:
+        if writer is not None:
+            discard_block_hash_map(writer)
+
+def record_block_hash_map(filename, map_path):
+    """Publishes the block hash map of an evidence file in hashing_status and its uploaded entry."""
+    hashing_status['block_hash_map'] = map_path
+    if filename in uploaded_files_db:
+        uploaded_files_db[filename]['block_hash_map'] = map_path
 
 def extract_strings_threaded(filepath):
     """Extracts all printable strings from a file in a background thread."""
@@ -3197,15 +3987,18 @@ def extract_strings_threaded(filepath):
             file_size = len(mm)
             printable_chars = re.compile(b"([%s]{%d,})" % (b" -~", min_len))
             last_update_pos = 0
-            for match in printable_chars.finditer(mm):
-                pos = match.start()
-                if pos > last_update_pos + (file_size // 100):
-                    strings_status['progress'] = int((pos / file_size) * 100)
-                    last_update_pos = pos
-
-                strings_status['strings_found'] += 1
-                if len(strings_status['preview']) < 100:
-                    strings_status['preview'].append(match.group(0).decode('ascii', 'ignore'))
+            # Constant runs of a non-printable byte cannot hold strings and end any string next to them
+            skip_values = set(range(256)) - set(range(0x20, 0x7f))
+            for span_start, span_end in iter_scan_spans(get_constant_block_map(filepath, mm), 0, file_size, 0, skip_values):
+                for match in printable_chars.finditer(mm, span_start, span_end):
+                    pos = match.start()
+                    if pos > last_update_pos + (file_size // 100):
+                        strings_status['progress'] = int((pos / file_size) * 100)
+                        last_update_pos = pos
+
+                    strings_status['strings_found'] += 1
+                    if len(strings_status['preview']) < 100:
+                        strings_status['preview'].append(match.group(0).decode('ascii', 'ignore'))
 
     except Exception as e:
         print(f"Error during strings extraction: {e}")
@@ -3298,6 +4091,7 @@ def crack_zip_with_passwords(filepath, output_path, passwords_to_try, is_user_pw
                         if extracted_items:
                             source_path = os.path.join(temp_dir, extracted_items[0])
                             if os.path.isfile(source_path):
+                                unshare_artifact(output_path)
                                 shutil.copy(source_path, output_path)
                             return True
                         return True
@@ -3406,6 +4200,7 @@ def crack_fernet_with_passwords(filepath, output_path, passwords_to_try, is_user
                 fernet = Fernet(key)
                 decrypted_data = fernet.decrypt(encrypted_data)
 
+                unshare_artifact(output_path)
                 with open(output_path, 'wb') as f_out:
                     f_out.write(decrypted_data)
                 return True
@@ -3451,173 +4246,2203 @@ def validate_and_deduplicate_file(content, seen_hashes, min_size=128):
     
     return True, content_hash
 
-# --- Carving & Recovery Engines ---
-def _validate_and_extract_file(mm, file_start_pos, sig_options, seen_hashes, file_size_limit):
-    """Validates a data chunk with strict deduplication and empty file checking."""
-    sig = sig_options[0]
-    name = sig['name']
-    MIN_FILE_SIZE = 128
+# --- Multi-pattern Signature Matching ---
+# Size of the window scanned between two progress updates of the carver.
+SCAN_WINDOW_SIZE = 64 * 1024 * 1024
 
-    # --- Strategy 1: RIFF Containers (WAV, AVI) ---
-    if name in ['WAV', 'AVI']:
-        try:
-            if file_start_pos + 12 < file_size_limit and mm[file_start_pos+8:file_start_pos+12] in [b'WAVE', b'AVI ']:
-                file_size_from_header = int.from_bytes(mm[file_start_pos+4:file_start_pos+8], 'little')
-                total_size = file_size_from_header + 8
+def build_signature_matcher(selected_types, signatures=None):
+    """Compiles the headers of the selected file types into a single matcher.
 
-                if total_size > 32:
-                    end_pos = file_start_pos + total_size
-                    content = mm[file_start_pos:end_pos]
-                    
-                    # Add validation
-                    if content and len(content) >= MIN_FILE_SIZE:
-                        content_hash = hashlib.md5(content[:4096]).hexdigest()
-                        if content_hash not in seen_hashes:
-                            seen_hashes.add(content_hash)
-                            return content, sig, content_hash
-        except Exception:
-            pass
+    All headers are joined into one alternation (longest first) so the regex engine
+    finds every header in a single left-to-right pass over the evidence, no matter
+    how many types are selected. `by_header` maps each header to every signature that
+    matches at that position, including signatures whose header is a prefix of it.
+    Returns None when none of the selected types define a header.
+    """
+    if signatures is None:
+        signatures = FILE_SIGNATURES
+    sigs_by_header = {}
+    for category, types in signatures.items():
+        for name, sig in types.items():
+            if name not in selected_types:
+                continue
+            headers = list(sig.get('headers', []))
+            if sig.get('header') and sig['header'] not in headers:
+                headers.append(sig['header'])
+            for header in headers:
+                if header:
+                    sigs_by_header.setdefault(header, []).append({'name': name, **sig})
+    if not sigs_by_header:
+        return None
 
-    # --- Strategy 2: Parse MP4/MOV Container Structure ---
-    elif name == 'MP4 / MOV':
-        try:
-            current_offset = file_start_pos
-            total_size = 0
-            box_count = 0
-            while current_offset + 8 < file_size_limit and box_count < 500:
-                box_size = int.from_bytes(mm[current_offset:current_offset+4], 'big')
-                box_type = mm[current_offset+4:current_offset+8]
-                if box_size < 8 or not box_type.isalnum(): 
-                    break
-                total_size += box_size
-                current_offset += box_size
-                box_count += 1
-            if total_size > 16384:
-                end_pos = min(file_start_pos + total_size, file_size_limit)
-                content = mm[file_start_pos:end_pos]
-                if b'moov' in content or b'mdat' in content:
-                    # Add validation
-                    if content and len(content) >= MIN_FILE_SIZE:
-                        content_hash = hashlib.md5(content[:4096]).hexdigest()
-                        if content_hash not in seen_hashes:
-                            seen_hashes.add(content_hash)
-                            return content, sig, content_hash
-        except Exception:
-            pass
+    ordered_headers = sorted(sigs_by_header, key=len, reverse=True)
+    by_header = {}
+    for header in ordered_headers:
+        candidates = list(sigs_by_header[header])
+        # The alternation only reports the longest header at a position, so shorter
+        # headers that are a prefix of it must be resolved from the same hit.
+        for other in ordered_headers:
+            if other != header and header.startswith(other):
+                candidates.extend(sigs_by_header[other])
+        by_header[header] = candidates
+
+    pattern = re.compile(b'|'.join(re.escape(h) for h in ordered_headers), re.DOTALL)
+    return {
+        'pattern': pattern,
+        'by_header': by_header,
+        'signatures': {sig['name']: sig for sigs in sigs_by_header.values() for sig in sigs},
+        'max_header_len': len(ordered_headers[0]),
+    }
+
+def iter_signature_hits(matcher, mm, start=0, end=None):
+    """Yields (offset, header) for every header starting in mm[start:end], in offset order.
+
+    Overlapping hits are reported; a header starting just before `end` is still
+    matched in full so adjacent windows never miss a hit on their boundary.
+    """
+    if end is None:
+        end = len(mm)
+    pattern = matcher['pattern']
+    search_end = min(end + matcher['max_header_len'] - 1, len(mm))
+    pos = start
+    while pos < end:
+        match = pattern.search(mm, pos, search_end)
+        if match is None or match.start() >= end:
+            break
+        yield match.start(), match.group(0)
+        pos = match.start() + 1
+
+# --- Persistent Signature Hit Index ---
+# Sidecar SQLite files recording the header and footer offsets of an evidence file,
+# keyed by its SHA-256, so reruns and block lookups do not rescan the image. Only the
+# patterns of the carves run so far are indexed; a carve that needs more adds them.
+SIGNATURE_INDEX_FOLDER = os.path.join(APP_ROOT, 'Signature Index')
+app.config['SIGNATURE_INDEX_FOLDER'] = SIGNATURE_INDEX_FOLDER
+# Shorter patterns (RTF's '}' footer) match too often to be worth indexing.
+SIGNATURE_INDEX_MIN_PATTERN = 2
+
+def _signature_index_patterns(matcher):
+    """Returns the headers and footers of `matcher`'s signatures that are worth indexing."""
+    patterns = set(matcher['by_header'])
+    patterns.update(sig['footer'] for sig in matcher['signatures'].values() if sig.get('footer'))
+    return sorted(p for p in patterns if len(p) >= SIGNATURE_INDEX_MIN_PATTERN)
+
+def _evidence_sha256(filepath):
+    """Returns the SHA-256 of `filepath` once hashing has finished, else None.
+
+    Only hashes known to belong to this very file count: its own uploaded entry or
+    its evidence cache row (see load_evidence_cache), never the last hashing job's.
+    """
+    entry = uploaded_files_db.get(os.path.basename(filepath)) or {}
+    hash_info = entry.get('hash_info') or {}
+    if hash_info.get('SHA-256') and os.path.abspath(entry.get('path') or filepath) == os.path.abspath(filepath):
+        return hash_info['SHA-256']
+    try:
+        cached = load_evidence_cache(evidence_identity(filepath))
+    except Exception as e:
+        print(f"Evidence cache lookup failed: {e}")
+        cached = None
+    return ((cached or {}).get('hashes') or {}).get('SHA-256')
+
+def _load_signature_index(conn, path, file_size, indexed_to, recording=None, final_path=None):
+    ordered = sorted((bytes(p), pid) for pid, p in conn.execute('SELECT id, pattern FROM patterns'))
+    return {
+        'conn': conn,
+        'path': path,
+        'final_path': final_path or path,
+        'file_size': file_size,
+        'indexed_to': indexed_to,
+        'pattern_ids': dict(ordered),
+        # patterns whose hits are still being recorded, {pattern: id}
+        'recording': recording or {},
+    }
+
+def open_signature_index(filepath, matcher=None, create=False):
+    """Opens the hit index of `filepath`; returns None when there is no usable one.
+
+    The index is a dict holding the connection, the id of every indexed pattern and
+    `indexed_to`, the offset below which every occurrence has been recorded. Only a
+    finished index is opened. With `create` and a `matcher` whose patterns the
+    finished index lacks (or without any), a new one is started instead: it takes
+    over the hits already recorded, and only the missing patterns are recorded by
+    the carve (see record_signature_index_window). It replaces the finished index
+    once complete; an unfinished one left by an interrupted carve is discarded.
+    """
+    sha256 = _evidence_sha256(filepath)
+    if not sha256:
+        return None
+    file_size = os.path.getsize(filepath)
+    folder = app.config.get('SIGNATURE_INDEX_FOLDER', SIGNATURE_INDEX_FOLDER)
+    path = os.path.join(folder, f"{sha256}.sqlite")
+    building = path + '.building'
+    wanted = _signature_index_patterns(matcher) if matcher else []
+    try:
+        finished = None
+        if os.path.exists(path):
+            conn = sqlite3.connect(path)
+            meta = dict(conn.execute('SELECT key, value FROM meta'))
+            if meta.get('complete') == '1' and meta.get('file_size') == str(file_size):
+                finished = _load_signature_index(conn, path, file_size, file_size)
+                if not create or all(p in finished['pattern_ids'] for p in wanted):
+                    return finished
+            else:
+                conn.close()
+        if not create:
+            return None
+        indexed = finished['pattern_ids'] if finished else {}
+        if finished:
+            finished['conn'].close()
+        elif os.path.exists(path):
+            os.unlink(path)
+        if os.path.exists(building):
+            os.unlink(building)
+        os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(building)
+        conn.executescript('''
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE patterns (id INTEGER PRIMARY KEY, pattern BLOB UNIQUE);
+            CREATE TABLE hits (pattern_id INTEGER, offset INTEGER, PRIMARY KEY (pattern_id, offset)) WITHOUT ROWID;
+        ''')
+        conn.executemany('INSERT INTO patterns (pattern) VALUES (?)', [(p,) for p in sorted(set(indexed) | set(wanted))])
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', [('file_size', str(file_size)), ('complete', '0'), ('sha256', sha256)])
+        if indexed:
+            # hits of the patterns indexed before are copied, not searched again
+            conn.commit()
+            conn.execute('ATTACH DATABASE ? AS finished', (path,))
+            conn.execute('''INSERT INTO hits SELECT p.id, h.offset FROM finished.hits h
+                            JOIN finished.patterns f ON f.id = h.pattern_id JOIN patterns p ON p.pattern = f.pattern''')
+            conn.commit()
+            conn.execute('DETACH DATABASE finished')
+        conn.commit()
+        index = _load_signature_index(conn, building, file_size, 0, final_path=path)
+        index['recording'] = {p: pid for p, pid in index['pattern_ids'].items() if p not in indexed}
+        return index
+    except (sqlite3.Error, OSError) as e:
+        print(f"Signature index unavailable for {filepath}: {e}")
+        return None
+
+def close_signature_index(index):
+    """Closes an index, deleting it if the carve that was building it did not finish."""
+    if index is None:
+        return
+    index['conn'].close()
+    try:
+        if index['indexed_to'] < index['file_size']:
+            os.unlink(index['path'])
+        elif index['path'] != index['final_path']:
+            os.replace(index['path'], index['final_path'])
+    except OSError:
+        pass
+
+def record_signature_index_window(index, mm, start, end, spans=None):
+    """Records the patterns the index is still missing in mm[start:end]; windows must be fed in order.
+
+    `spans` restricts the scan to those parts of the window (see iter_scan_spans),
+    the skipped rest must not be able to hold any indexed pattern.
+    """
+    matcher = index.get('matcher')
+    if matcher is None and index['recording']:
+        recording = index['recording']
+        ordered = sorted(recording, key=len, reverse=True)
+        matcher = index['matcher'] = {
+            'pattern': re.compile(b'|'.join(re.escape(p) for p in ordered), re.DOTALL),
+            # The alternation reports the longest pattern at a position only
+            'prefixes': {p: [recording[o] for o in ordered if p.startswith(o)] for p in ordered},
+            'max_header_len': len(ordered[0]),
+        }
+    rows = []
+    for span_start, span_end in (spans if spans is not None else [(start, end)]) if matcher else []:
+        for pos, found in iter_signature_hits(matcher, mm, span_start, span_end):
+            rows.extend((pattern_id, pos) for pattern_id in matcher['prefixes'][found])
+    conn = index['conn']
+    conn.executemany('INSERT OR IGNORE INTO hits VALUES (?, ?)', rows)
+    index['indexed_to'] = end
+    if end >= index['file_size']:
+        conn.execute("UPDATE meta SET value = '1' WHERE key = 'complete'")
+    conn.commit()
+
+def signature_index_covers(index, matcher):
+    """True when every header of `matcher` is recorded in `index`."""
+    return all(header in index['pattern_ids'] for header in matcher['by_header'])
+
+def iter_indexed_signature_hits(index, matcher, start=0, end=None):
+    """Same contract as iter_signature_hits, answered from an index that covers mm[start:end]."""
+    if end is None:
+        end = index['file_size']
+    headers = {index['pattern_ids'][h]: h for h in matcher['by_header']}
+    placeholders = ','.join('?' * len(headers))
+    rows = index['conn'].execute(
+        f'SELECT offset, pattern_id FROM hits WHERE pattern_id IN ({placeholders}) '
+        'AND offset >= ? AND offset < ? ORDER BY offset', (*headers, start, end)).fetchall()
+    last_pos, longest = None, None
+    for pos, pattern_id in rows:
+        header = headers[pattern_id]
+        if pos != last_pos:
+            if longest is not None:
+                yield last_pos, longest
+            last_pos, longest = pos, header
+        elif len(header) > len(longest):
+            longest = header
+    if longest is not None:
+        yield last_pos, longest
+
+def find_indexed_pattern(index, mm, pattern, start, end):
+    """mm.find(pattern, start, end), answered from `index` when it covers the range."""
+    pattern_id = index['pattern_ids'].get(pattern) if index is not None else None
+    if pattern_id is None or end > index['indexed_to']:
+        return mm.find(pattern, start, end)
+    row = index['conn'].execute(
+        'SELECT MIN(offset) FROM hits WHERE pattern_id = ? AND offset >= ? AND offset <= ?',
+        (pattern_id, start, end - len(pattern))).fetchone()
+    return row[0] if row[0] is not None else -1
+
+# --- Constant Block Skipping ---
+# Wiped or freshly formatted media is mostly zero/constant sectors. Those blocks are
+# classified once per evidence and the scanners skip them.
+CONSTANT_BLOCK_SIZE = 4096
+# Bytes classified per step, bounds the temporary arrays of the NumPy classifier.
+CONSTANT_BLOCK_CHUNK = 16 * 1024 * 1024
+_constant_block_maps = {}
+_constant_block_maps_lock = threading.Lock()
+
+def _iter_constant_blocks(mm, start, end, block_size):
+    """Yields (offset, byte value) for every constant block of mm[start:end] (whole blocks only)."""
+    if np is not None and block_size % 8 == 0:
+        count = (end - start) // block_size
+        blocks = np.frombuffer(mm, dtype=np.uint8, count=count * block_size, offset=start).reshape(count, block_size)
+        words = blocks.view(np.uint64)
+        # A block is constant when all its words equal the first one and that word repeats one byte
+        constant = (words == words[:, :1]).all(axis=1) & (blocks[:, :8] == blocks[:, :1]).all(axis=1)
+        indices = np.flatnonzero(constant)
+        values = blocks[indices, 0].tolist()
+        offsets = (start + indices * block_size).tolist()
+        del blocks, words, constant, indices  # release the exported buffer of the mapping
+        yield from zip(offsets, values)
+        return
+    for offset in range(start, end - block_size + 1, block_size):
+        block = mm[offset:offset + block_size]
+        if block.count(block[:1]) == block_size:
+            yield offset, block[0]
+
+def build_constant_block_map(mm, start=0, end=None, block_size=CONSTANT_BLOCK_SIZE):
+    """Returns the run-length map of constant blocks in mm[start:end].
+
+    The map is a sorted list of (run_start, run_end, byte value) runs of adjacent
+    block-aligned blocks holding a single repeated byte value. Only whole blocks are
+    classified; partial ones at either edge count as content.
+    """
+    if end is None:
+        end = len(mm)
+    first_block = -(-start // block_size) * block_size
+    runs = []
+    for chunk_start in range(first_block, end, CONSTANT_BLOCK_CHUNK):
+        chunk_end = min(chunk_start + CONSTANT_BLOCK_CHUNK, end)
+        for offset, value in _iter_constant_blocks(mm, chunk_start, chunk_end, block_size):
+            if runs and runs[-1][1] == offset and runs[-1][2] == value:
+                runs[-1][1] = offset + block_size
+            else:
+                runs.append([offset, offset + block_size, value])
+    return [tuple(run) for run in runs]
+
+def get_constant_block_map(filepath, mm):
+    """Returns the constant block map of the evidence at `filepath`, classifying it only once."""
+    st = os.stat(filepath)
+    key = (os.path.realpath(filepath), st.st_size, st.st_mtime_ns)
+    with _constant_block_maps_lock:
+        block_map = _constant_block_maps.get(key)
+    if block_map is None:
+        block_map = build_constant_block_map(mm)
+        with _constant_block_maps_lock:
+            _constant_block_maps.clear()  # only the active evidence is worth keeping
+            _constant_block_maps[key] = block_map
+    return block_map
+
+def constant_skip_values(patterns):
+    """Byte values whose constant runs cannot contain any of `patterns`."""
+    return set(range(256)) - {p[0] for p in patterns if p and p.count(p[:1]) == len(p)}
+
+def iter_scan_spans(block_map, start, end, overlap=0, skip_values=None):
+    """Yields the (span_start, span_end) parts of [start, end) not covered by skippable runs.
+
+    Runs whose value is not in `skip_values` (default: all) are scanned like content.
+    Each span starts `overlap` bytes early so a pattern of up to overlap + 1 bytes
+    straddling the end of a skipped run is still found.
+    """
+    content_from = start
+    first = max(0, bisect.bisect_right(block_map, (start, float('inf'))) - 1)
+    for run_start, run_end, value in block_map[first:]:
+        if run_start >= end:
+            break
+        if run_end <= content_from or (skip_values is not None and value not in skip_values):
+            continue
+        if run_start > content_from:
+            yield max(start, content_from - overlap), run_start
+        content_from = run_end
+    if content_from < end:
+        yield max(start, content_from - overlap), end
+
+def find_skipping_constant_runs(mm, pattern, start, block_map, end=None):
+    """mm.find(pattern, start, end) that does not search the constant runs of `block_map`."""
+    if end is None:
+        end = len(mm)
+    if not pattern or pattern.count(pattern[:1]) == len(pattern):
+        return mm.find(pattern, start, end)
+    for span_start, span_end in iter_scan_spans(block_map, start, end, len(pattern) - 1):
+        pos = mm.find(pattern, span_start, min(span_end + len(pattern) - 1, end))
+        if pos != -1:
+            return pos
+    return -1
+
+# --- Sector-Aligned Carving ---
+# Boundaries the aligned carving mode may examine: sector and cluster/page size.
+CARVING_ALIGNMENTS = (512, 4096)
+# Types usually found inside another file or stream rather than at a cluster start;
+# the aligned mode keeps scanning them at every byte offset.
+EMBEDDED_SIGNATURE_TYPES = {'ICO', 'GZIP'}
+
+def _aligned_header_positions(mm, start, end, alignment, header, offset=0):
+    """Returns the offsets in [start, end) of the form k * alignment + offset holding `header`."""
+    first = -(-(start - offset) // alignment) * alignment + offset
+    last = min(end - 1, len(mm) - len(header))
+    if first > last:
+        return []
+    count = (last - first) // alignment + 1
+    if np is not None:
+        # Strided compare of the first header byte at every boundary, then narrow the
+        # surviving boundaries down one header byte at a time
+        flat = np.frombuffer(mm, dtype=np.uint8, count=(count - 1) * alignment + len(header), offset=first)
+        starts = np.flatnonzero(flat[::alignment] == header[0]) * alignment
+        for i in range(1, len(header)):
+            starts = starts[flat[starts + i] == header[i]]
+        positions = (first + starts).tolist()
+        del flat, starts  # release the exported buffer of the mapping
+        return positions
+    # Strided slice of the first header byte at every boundary, verified where it matches
+    column = mm[first:last + 1:alignment]
+    positions = []
+    lead = header[:1]
+    i = column.find(lead)
+    while i != -1:
+        pos = first + i * alignment
+        if mm[pos:pos + len(header)] == header:
+            positions.append(pos)
+        i = column.find(lead, i + 1)
+    return positions
+
+def _split_aligned_matcher(matcher):
+    """Splits a matcher into aligned headers (with their signature offsets) and a sub-matcher of embedded types."""
+    split = matcher.get('aligned_split')
+    if split is None:
+        aligned_headers = {}
+        for header, sigs in matcher['by_header'].items():
+            offsets = sorted({sig.get('offset', 0) for sig in sigs if sig['name'] not in EMBEDDED_SIGNATURE_TYPES})
+            if offsets:
+                aligned_headers[header] = offsets
+        embedded = {name: sig for name, sig in matcher['signatures'].items() if name in EMBEDDED_SIGNATURE_TYPES}
+        split = matcher['aligned_split'] = (aligned_headers, build_signature_matcher(embedded, {'Embedded': embedded}))
+    return split
+
+def iter_aligned_signature_hits(matcher, mm, alignment, start=0, end=None):
+    """Like iter_signature_hits, but only examines `alignment` boundaries.
+
+    A header is checked at every boundary plus its signature's header offset (MP4's
+    'ftyp' sits 4 bytes in). Types in EMBEDDED_SIGNATURE_TYPES are still scanned at
+    every byte offset.
+    """
+    if end is None:
+        end = len(mm)
+    aligned_headers, embedded_matcher = _split_aligned_matcher(matcher)
+    hits = {}
+    for header, offsets in aligned_headers.items():
+        for offset in offsets:
+            for pos in _aligned_header_positions(mm, start, end, alignment, header, offset):
+                if len(header) > len(hits.get(pos, b'')):
+                    hits[pos] = header
+    if embedded_matcher is not None:
+        for pos, header in iter_signature_hits(embedded_matcher, mm, start, end):
+            if len(header) > len(hits.get(pos, b'')):
+                hits[pos] = header
+    for pos in sorted(hits):
+        yield pos, hits[pos]
+
+# --- Unallocated-Space Carving Scope ---
+# Allocated files are already recovered intact through pytsk3, so the carver can be
+# limited to the byte extents no allocated file occupies.
+_unallocated_extents_cache = {}
+
+def _collect_allocated_extents(directory, fs_offset, block_size, extents, visited):
+    """Adds the image byte extents of every allocated file and directory below `directory`."""
+    for entry in directory:
+        meta = getattr(entry.info, 'meta', None)
+        name = getattr(getattr(entry.info, 'name', None), 'name', None)
+        if meta is None or name in (b'.', b'..') or not (meta.flags & pytsk3.TSK_FS_META_FLAG_ALLOC):
+            continue
+        if meta.addr in visited:
+            continue
+        visited.add(meta.addr)
+        try:
+            for attr in entry:
+                if not (attr.info.flags & pytsk3.TSK_FS_ATTR_NONRES):
+                    continue  # resident data lives inside the metadata record
+                for run in attr:
+                    if run.len and not (run.flags & (pytsk3.TSK_FS_ATTR_RUN_FLAG_FILLER | pytsk3.TSK_FS_ATTR_RUN_FLAG_SPARSE)):
+                        start = fs_offset + run.addr * block_size
+                        extents.append((start, start + run.len * block_size))
+            if meta.type == pytsk3.TSK_FS_META_TYPE_DIR:
+                _collect_allocated_extents(entry.as_directory(), fs_offset, block_size, extents, visited)
+        except (IOError, AttributeError):
+            continue
+
+def compute_unallocated_extents(filepath):
+    """Returns the sorted (start, end) byte extents of `filepath` not used by any allocated file.
+
+    Every partition listed by perform_forensic_analysis (or the whole image when it has
+    no partition table) is opened with pytsk3.FS_Info and the data runs of its
+    allocated files are subtracted from the image. Blocks that are allocated but not
+    owned by a visible file (e.g. ext inode tables) stay in scope, so nothing is lost.
+    Returns None when no filesystem could be opened.
+    """
+    _, partitions = perform_forensic_analysis(filepath)
+    fs_offsets = [p['start'] * p.get('sector_size', 512) for p in partitions] or [0]
+    img_handle = pytsk3.Img_Info(filepath)
+    allocated = []
+    opened = 0
+    for fs_offset in fs_offsets:
+        try:
+            fs = pytsk3.FS_Info(img_handle, offset=fs_offset)
+            _collect_allocated_extents(fs.open_dir(path="/"), fs_offset, fs.info.block_size, allocated, set())
+            opened += 1
+        except IOError as e:
+            print(f"Unallocated scope: no filesystem at offset {fs_offset}: {e}")
+    if not opened:
+        return None
+
+    extents = []
+    pos = 0
+    for start, end in sorted(allocated):
+        if start > pos:
+            extents.append((pos, start))
+        pos = max(pos, end)
+    file_size = os.path.getsize(filepath)
+    if pos < file_size:
+        extents.append((pos, file_size))
+    return extents
+
+def get_unallocated_extents(filepath):
+    """compute_unallocated_extents, walking the filesystems only once per evidence."""
+    st = os.stat(filepath)
+    key = (os.path.realpath(filepath), st.st_size, st.st_mtime_ns)
+    if key not in _unallocated_extents_cache:
+        extents = compute_unallocated_extents(filepath)
+        _unallocated_extents_cache.clear()
+        _unallocated_extents_cache[key] = extents
+    return _unallocated_extents_cache[key]
+
+def clip_spans_to_extents(spans, extents):
+    """Returns the parts of the sorted `spans` that lie inside the sorted `extents`."""
+    clipped = []
+    for span_start, span_end in spans:
+        i = max(0, bisect.bisect_right(extents, (span_start, float('inf'))) - 1)
+        while i < len(extents) and extents[i][0] < span_end:
+            start, end = max(span_start, extents[i][0]), min(span_end, extents[i][1])
+            if start < end:
+                clipped.append((start, end))
+            i += 1
+    return clipped
+
+# --- Shared-Header Classification ---
+# How far past a ZIP header local file entries are inspected to tell OOXML apart.
+ZIP_CLASSIFY_WINDOW = 256 * 1024
+
+def _classify_zip_container(mm, pos, file_size):
+    """Returns the concrete type names a ZIP local header may be, most specific first."""
+    window_end = min(pos + ZIP_CLASSIFY_WINDOW, file_size)
+    # the archive's own central directory ends its local entries; anything past
+    # it belongs to the next file in the image
+    for marker in (b'PK\x01\x02', b'PK\x05\x06'):
+        directory_pos = mm.find(marker, pos + 4, window_end)
+        if directory_pos != -1:
+            window_end = directory_pos
+    names = []
+    entry_pos = pos
+    while entry_pos != -1 and entry_pos + 30 <= window_end and len(names) < 64:
+        name_len = int.from_bytes(mm[entry_pos+26:entry_pos+28], 'little')
+        names.append(bytes(mm[entry_pos+30:entry_pos+30+name_len]))
+        # Walk by searching for the next local header; entries using data
+        # descriptors carry no compressed size, so the header chain cannot be trusted.
+        entry_pos = mm.find(b'PK\x03\x04', entry_pos + 30 + name_len, window_end)
+
+    # An OOXML document is still a valid ZIP, so ZIP is the fallback when the
+    # concrete document type was not selected.
+    is_ooxml = b'[Content_Types].xml' in names
+    for prefix, main_part, name in ((b'word/', b'word/document.xml', 'DOCX'),
+                                    (b'xl/', b'xl/workbook.xml', 'XLSX'),
+                                    (b'ppt/', b'ppt/presentation.xml', 'PPTX')):
+        if main_part in names or (is_ooxml and any(n.startswith(prefix) for n in names)):
+            return [name, 'ZIP']
+    return ['ZIP']
+
+def _classify_riff_container(mm, pos, file_size):
+    """Returns the concrete type name of a RIFF container from its form type."""
+    form_type = mm[pos+8:pos+12] if pos + 12 <= file_size else b''
+    return {b'WAVE': ['WAV'], b'AVI ': ['AVI']}.get(form_type, [])
+
+SHARED_HEADER_CLASSIFIERS = {
+    b'\x50\x4b\x03\x04': _classify_zip_container,
+    b'\x52\x49\x46\x46': _classify_riff_container,
+}
+
+def classify_signature_hit(mm, pos, candidates, file_size):
+    """Narrows the signatures sharing a header hit down to the ones worth carving.
+
+    Signatures with an identical header describe the same bytes, so the container is
+    inspected once to decide which concrete type it is (OOXML part names for ZIP, the
+    form type for RIFF). Identical formats without a classifier (JPEG / JPG) resolve
+    to the first selected one. Returns a list with at most one signature per header.
+    When a more generic selected type follows the concrete one (ZIP after DOCX), the
+    returned signature carries it as 'fallback' (see validate_classified_extent).
+    """
+    if len(candidates) <= 1:
+        return candidates
+    groups = {}
+    for sig in candidates:
+        header = sig.get('header') or sig.get('headers', [b''])[0]
+        groups.setdefault(header, []).append(sig)
+
+    selected = []
+    for header, group in groups.items():
+        if len(group) == 1:
+            selected.append(group[0])
+            continue
+        classifier = SHARED_HEADER_CLASSIFIERS.get(header)
+        if classifier is None:
+            selected.append(group[0])
+            continue
+        by_name = {sig['name']: sig for sig in group}
+        try:
+            concrete_names = classifier(mm, pos, file_size)
+        except Exception:
+            concrete_names = []
+        concrete = [by_name[name] for name in concrete_names if name in by_name]
+        if len(concrete) > 1:
+            selected.append(dict(concrete[0], fallback=concrete[1]))
+        elif concrete:
+            selected.append(concrete[0])
+    return selected
+
+# --- Structure-Aware Length Resolvers ---
+# Upper bound for a resolved file when the signature has no max_size of its own.
+CARVE_RESOLVER_MAX_SIZE = 4 * 1024 * 1024 * 1024
+# How far past one %%EOF an incremental PDF update is looked for.
+PDF_UPDATE_SEARCH_WINDOW = 50 * 1024 * 1024
+# A JPEG marker inside entropy-coded data: 0xFF not followed by stuffing or a restart marker.
+JPEG_SCAN_MARKER = re.compile(b'\xff[^\x00\xd0-\xd7\xff]', re.DOTALL)
+# Compressed bytes fed to the inflater per step while a gzip stream is walked; its
+# output is capped to the same size and thrown away.
+GZIP_RESOLVE_CHUNK_SIZE = 1024 * 1024
+
+def _resolve_png_length(mm, start, limit):
+    """Walks PNG chunks up to and including IEND."""
+    pos = start + 8
+    while pos + 12 <= limit:
+        chunk_len = int.from_bytes(mm[pos:pos+4], 'big')
+        chunk_type = mm[pos+4:pos+8]
+        if not chunk_type.isalpha():
+            return None
+        pos += 12 + chunk_len
+        if chunk_type == b'IEND':
+            return pos - start if pos <= limit else None
+    return None
+
+def _resolve_jpeg_length(mm, start, limit):
+    """Walks JPEG marker segments, skipping entropy-coded scans, up to EOI."""
+    pos = start + 2
+    while pos + 2 <= limit:
+        if mm[pos] != 0xFF:
+            return None
+        marker = mm[pos+1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0xD9:
+            return pos + 2 - start
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if pos + 4 > limit:
+            return None
+        seg_len = int.from_bytes(mm[pos+2:pos+4], 'big')
+        if seg_len < 2:
+            return None
+        pos += 2 + seg_len
+        if marker == 0xDA:
+            match = JPEG_SCAN_MARKER.search(mm, pos, limit)
+            if match is None:
+                return None
+            pos = match.start()
+    return None
+
+def _resolve_gif_length(mm, start, limit):
+    """Walks GIF image descriptors and extension blocks up to the trailer."""
+    if start + 13 > limit:
+        return None
+    packed = mm[start+10]
+    pos = start + 13
+    if packed & 0x80:
+        pos += 3 * (2 << (packed & 0x07))
+    while pos < limit:
+        block = mm[pos]
+        if block == 0x3B:
+            return pos + 1 - start
+        if block == 0x2C:
+            if pos + 10 > limit:
+                return None
+            local_packed = mm[pos+9]
+            pos += 10
+            if local_packed & 0x80:
+                pos += 3 * (2 << (local_packed & 0x07))
+            pos += 1  # LZW minimum code size
+        elif block == 0x21:
+            pos += 2
+        else:
+            return None
+        # data sub-blocks, terminated by a zero-length block
+        while pos < limit:
+            sub_len = mm[pos]
+            pos += 1 + sub_len
+            if sub_len == 0:
+                break
+    return None
+
+def _resolve_zip_length(mm, start, limit):
+    """Finds the end-of-central-directory record that belongs to this archive."""
+    eocd = mm.find(b'PK\x05\x06', start, limit)
+    while eocd != -1 and eocd + 22 <= limit:
+        cd_size = int.from_bytes(mm[eocd+12:eocd+16], 'little')
+        cd_offset = int.from_bytes(mm[eocd+16:eocd+20], 'little')
+        comment_len = int.from_bytes(mm[eocd+20:eocd+22], 'little')
+        # The central directory sits right before the EOCD, relative to the archive start
+        if cd_offset + cd_size == eocd - start:
+            end = eocd + 22 + comment_len
+            return end - start if end <= limit else None
+        eocd = mm.find(b'PK\x05\x06', eocd + 4, limit)
+    return None
+
+def _resolve_pdf_length(mm, start, limit):
+    """Returns the length up to the last %%EOF, following incremental updates."""
+    eof = mm.find(b'%%EOF', start, min(limit, start + PDF_UPDATE_SEARCH_WINDOW))
+    if eof == -1:
+        return None
+    end = eof + 5
+    while True:
+        next_eof = mm.find(b'%%EOF', end, min(limit, end + PDF_UPDATE_SEARCH_WINDOW))
+        if next_eof == -1:
+            break
+        # An update's startxref points past the previous %%EOF; a new '%PDF' means another file
+        if mm.find(b'%PDF-', end, next_eof) != -1:
+            break
+        xref_pos = mm.rfind(b'startxref', end, next_eof)
+        if xref_pos == -1:
+            break
+        try:
+            xref_offset = int(bytes(mm[xref_pos+9:next_eof]).split()[0])
+        except (ValueError, IndexError):
+            break
+        if not end - start <= xref_offset < next_eof - start:
+            break
+        end = next_eof + 5
+    # keep the end-of-line that normally follows the marker
+    while end < limit and mm[end] in (0x0D, 0x0A):
+        end += 1
+    return end - start
+
+def _resolve_bmp_length(mm, start, limit):
+    """Reads the file size from the BMP file header."""
+    if start + 26 > limit:
+        return None
+    size = int.from_bytes(mm[start+2:start+6], 'little')
+    data_offset = int.from_bytes(mm[start+10:start+14], 'little')
+    dib_size = int.from_bytes(mm[start+14:start+18], 'little')
+    if dib_size not in (12, 40, 52, 56, 64, 108, 124) or not 14 + dib_size <= data_offset < size:
+        return None
+    return size
+
+def _resolve_pe_length(mm, start, limit):
+    """Computes a PE image size from its section table and certificate table."""
+    if start + 0x40 > limit:
+        return None
+    pe_pos = start + int.from_bytes(mm[start+0x3C:start+0x40], 'little')
+    if pe_pos + 24 > limit or mm[pe_pos:pe_pos+4] != b'PE\x00\x00':
+        return None
+    num_sections = int.from_bytes(mm[pe_pos+6:pe_pos+8], 'little')
+    opt_size = int.from_bytes(mm[pe_pos+20:pe_pos+22], 'little')
+    opt_pos = pe_pos + 24
+    section_pos = opt_pos + opt_size
+    if num_sections == 0 or section_pos + 40 * num_sections > limit:
+        return None
+    end = section_pos + 40 * num_sections - start
+    for i in range(num_sections):
+        entry = section_pos + 40 * i
+        raw_size = int.from_bytes(mm[entry+16:entry+20], 'little')
+        raw_ptr = int.from_bytes(mm[entry+20:entry+24], 'little')
+        if raw_size:
+            end = max(end, raw_ptr + raw_size)
+    # Authenticode signatures are appended after the last section
+    magic_word = int.from_bytes(mm[opt_pos:opt_pos+2], 'little')
+    dirs_pos = opt_pos + {0x10B: 96, 0x20B: 112}.get(magic_word, opt_size)
+    if dirs_pos + 40 <= section_pos:
+        cert_offset = int.from_bytes(mm[dirs_pos+32:dirs_pos+36], 'little')
+        cert_size = int.from_bytes(mm[dirs_pos+36:dirs_pos+40], 'little')
+        if cert_offset and cert_size:
+            end = max(end, cert_offset + cert_size)
+    return end
+
+def _resolve_elf_length(mm, start, limit):
+    """Computes an ELF file size from its section and program header tables."""
+    if start + 0x40 > limit:
+        return None
+    elf_class, data = mm[start+4], mm[start+5]
+    if elf_class not in (1, 2) or data not in (1, 2):
+        return None
+    order = 'little' if data == 1 else 'big'
+
+    def field(offset, size):
+        return int.from_bytes(mm[start+offset:start+offset+size], order)
+
+    if elf_class == 1:
+        ph_off, sh_off = field(0x1C, 4), field(0x20, 4)
+        ph_size, ph_num, sh_size, sh_num = field(0x2A, 2), field(0x2C, 2), field(0x2E, 2), field(0x30, 2)
+        ph_fields, sh_fields = ((4, 4), (16, 4)), ((16, 4), (20, 4))
+    else:
+        ph_off, sh_off = field(0x20, 8), field(0x28, 8)
+        ph_size, ph_num, sh_size, sh_num = field(0x36, 2), field(0x38, 2), field(0x3A, 2), field(0x3C, 2)
+        ph_fields, sh_fields = ((8, 8), (32, 8)), ((24, 8), (32, 8))
+
+    end = 0x34 if elf_class == 1 else 0x40
+    for table_off, entry_size, count, (off_field, size_field), nobits_type in (
+            (ph_off, ph_size, ph_num, ph_fields, None), (sh_off, sh_size, sh_num, sh_fields, 8)):
+        if not count:
+            continue
+        end = max(end, table_off + entry_size * count)
+        if start + end > limit:
+            return None
+        for i in range(count):
+            entry = table_off + entry_size * i
+            # SHT_NOBITS sections (.bss) occupy no space in the file
+            if nobits_type is not None and field(entry + 4, 4) == nobits_type:
+                continue
+            end = max(end, field(entry + off_field[0], off_field[1]) + field(entry + size_field[0], size_field[1]))
+    return end
+
+def _resolve_sqlite_length(mm, start, limit):
+    """Computes a SQLite database size as page_size * page_count."""
+    if start + 100 > limit:
+        return None
+    page_size = int.from_bytes(mm[start+16:start+18], 'big')
+    if page_size == 1:
+        page_size = 65536
+    if page_size < 512 or page_size & (page_size - 1):
+        return None
+    page_count = int.from_bytes(mm[start+28:start+32], 'big')
+    # The in-header page count is only valid when its version matches the change counter
+    if page_count == 0 or mm[start+24:start+28] != mm[start+92:start+96]:
+        return None
+    return page_size * page_count
+
+def _resolve_evtx_length(mm, start, limit):
+    """Computes an EVTX log size from the header block size and chunk count."""
+    if start + 128 > limit:
+        return None
+    header_block_size = int.from_bytes(mm[start+0x28:start+0x2A], 'little')
+    chunk_count = int.from_bytes(mm[start+0x2A:start+0x2C], 'little')
+    if header_block_size != 4096 or chunk_count == 0:
+        return None
+    first_chunk = start + header_block_size
+    if mm[first_chunk:first_chunk+8] != b'ElfChnk\x00':
+        return None
+    return header_block_size + chunk_count * 65536
+
+def _resolve_regf_length(mm, start, limit):
+    """Computes a registry hive size from the base block's hive bins data size."""
+    if start + 4096 + 4 > limit:
+        return None
+    hbins_size = int.from_bytes(mm[start+0x28:start+0x2C], 'little')
+    if hbins_size == 0 or hbins_size % 4096 or mm[start+4096:start+4100] != b'hbin':
+        return None
+    return 4096 + hbins_size
+
+def _resolve_riff_length(mm, start, limit):
+    """Reads the RIFF chunk size of a WAV or AVI container."""
+    if start + 12 > limit or mm[start+8:start+12] not in (b'WAVE', b'AVI '):
+        return None
+    total_size = int.from_bytes(mm[start+4:start+8], 'little') + 8
+    return total_size if total_size > 32 else None
+
+def _resolve_mp4_length(mm, start, limit):
+    """Walks top-level ISO BMFF boxes starting at the ftyp box."""
+    pos = start
+    box_types = set()
+    box_count = 0
+    while pos + 8 <= limit and box_count < 500:
+        box_size = int.from_bytes(mm[pos:pos+4], 'big')
+        box_type = bytes(mm[pos+4:pos+8])
+        if box_size == 1 and pos + 16 <= limit:
+            box_size = int.from_bytes(mm[pos+8:pos+16], 'big')
+        if box_size < 8 or not box_type.isalnum():
+            break
+        box_types.add(box_type)
+        pos += box_size
+        box_count += 1
+    if not box_types & {b'moov', b'mdat'}:
+        return None
+    pos = min(pos, limit)
+    return pos - start if pos - start > 16384 else None
+
+def _resolve_gzip_length(mm, start, limit):
+    """Inflates the gzip members that follow each other from `start`; ends after the last trailer.
+
+    The inflater checks each member's CRC32 and ISIZE trailer, so a stream that
+    does not decompress cleanly resolves to None instead of a blind slice.
+    """
+    pos, end = start, None
+    while pos + 18 <= limit and mm[pos:pos+3] == b'\x1f\x8b\x08':
+        decompressor = zlib.decompressobj(wbits=31)
+        read = pos
+        try:
+            while not decompressor.eof and read < limit:
+                chunk_end = min(read + GZIP_RESOLVE_CHUNK_SIZE, limit)
+                with memoryview(mm)[read:chunk_end] as chunk:
+                    decompressor.decompress(chunk, GZIP_RESOLVE_CHUNK_SIZE)
+                while decompressor.unconsumed_tail and not decompressor.eof:
+                    decompressor.decompress(decompressor.unconsumed_tail, GZIP_RESOLVE_CHUNK_SIZE)
+                read = chunk_end
+        except zlib.error:
+            break
+        if not decompressor.eof:
+            break
+        # what was fed past the trailer is where the next member may start
+        pos = end = read - len(decompressor.unused_data) - len(decompressor.unconsumed_tail)
+    return end - start if end is not None else None
+
+# Signature name -> resolver(mm, start, limit) returning the real file length or None.
+# Register a resolver here to teach the carver the layout of another format.
+LENGTH_RESOLVERS = {
+    'PNG': _resolve_png_length,
+    'JPEG': _resolve_jpeg_length,
+    'JPG': _resolve_jpeg_length,
+    'GIF': _resolve_gif_length,
+    'ZIP': _resolve_zip_length,
+    'DOCX': _resolve_zip_length,
+    'XLSX': _resolve_zip_length,
+    'PPTX': _resolve_zip_length,
+    'PDF': _resolve_pdf_length,
+    'BMP': _resolve_bmp_length,
+    'EXE': _resolve_pe_length,
+    'ELF': _resolve_elf_length,
+    'SQLite': _resolve_sqlite_length,
+    'Windows Event Log (EVTX)': _resolve_evtx_length,
+    'Windows Registry Hive (REGF)': _resolve_regf_length,
+    'WAV': _resolve_riff_length,
+    'AVI': _resolve_riff_length,
+    'MP4 / MOV': _resolve_mp4_length,
+    'GZIP': _resolve_gzip_length,
+}
+
+def resolve_carve_length(mm, start, sig, file_size, index=None):
+    """Returns how many bytes starting at `start` belong to the file described by `sig`.
+
+    A registered structure resolver is preferred. Signatures with a footer fall back
+    to a bounded footer search when the structure cannot be walked; signatures without
+    one fall back to the fixed max_size slice only when no resolver exists; the footer
+    search is served from the signature hit `index` when one is given. Returns None
+    when no plausible length can be determined.
+    """
+    return resolve_carve_extent(mm, start, sig, file_size, index)[0]
+
+def resolve_carve_extent(mm, start, sig, file_size, index=None):
+    """Like resolve_carve_length, but returns (length, method).
+
+    `method` tells how the length was found: 'structure' (a resolver walked the
+    format), 'footer' (bounded footer search) or 'fixed' (max_size slice). It feeds
+    the candidate's confidence score (see validate_carved_extent).
+    """
+    resolver = LENGTH_RESOLVERS.get(sig.get('name'))
+    if resolver is not None:
+        limit = min(start + sig.get('max_size', CARVE_RESOLVER_MAX_SIZE), file_size)
+        try:
+            length = resolver(mm, start, limit)
+        except (IndexError, ValueError):
+            length = None
+        if length and start + length <= limit:
+            return length, 'structure'
+        if not sig.get('footer'):
+            return None, None
+
+    footer = sig.get('footer')
+    if footer:
+        search_limit = min(start + sig.get('max_size', 50 * 1024 * 1024), file_size)
+        header_len = len(sig.get('header', sig.get('headers', [b''])[0]))
+        end_pos = find_indexed_pattern(index, mm, footer, start + header_len, search_limit)
+        if end_pos == -1:
+            return None, None
+        return end_pos + len(footer) - start, 'footer'
+    return min(sig.get('max_size', 10 * 1024 * 1024), file_size - start), 'fixed'
+
+# --- Zero-Copy Carve Output ---
+# Buffer size of the read/write fallback used when the kernel cannot copy for us.
+CARVE_COPY_CHUNK_SIZE = 4 * 1024 * 1024
+
+def hash_mapped_range(mm, start, end, algorithm='md5'):
+    """Hashes mm[start:end] through a memoryview so the range is never copied."""
+    with memoryview(mm)[start:end] as view:
+        return hashlib.new(algorithm, view).hexdigest()
+
+def copy_evidence_range(src_fd, dst_fd, offset, length):
+    """Copies `length` bytes at `offset` of src_fd to the current position of dst_fd.
+
+    The copy stays in the kernel via os.copy_file_range, then os.sendfile; where
+    neither is available (or the filesystems refuse), a fixed-size buffer is reused
+    with os.preadv so memory use does not grow with the carved size. Returns the
+    number of bytes copied.
+    """
+    copied = 0
+    for kernel_copy in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+        if kernel_copy is None:
+            continue
+        try:
+            while copied < length:
+                if kernel_copy is os.sendfile:
+                    n = os.sendfile(dst_fd, src_fd, offset + copied, length - copied)
+                else:
+                    n = os.copy_file_range(src_fd, dst_fd, length - copied, offset + copied)
+                if n == 0:
+                    return copied
+                copied += n
+            return copied
+        except OSError:
+            # e.g. EXDEV/ENOSYS/EINVAL: continue with the next strategy from where we stopped
+            continue
+
+    buf = bytearray(min(CARVE_COPY_CHUNK_SIZE, max(length, 1)))
+    with memoryview(buf) as view:
+        while copied < length:
+            want = min(len(buf), length - copied)
+            if hasattr(os, 'preadv'):
+                n = os.preadv(src_fd, [view[:want]], offset + copied)
+            else:
+                os.lseek(src_fd, offset + copied, os.SEEK_SET)
+                chunk = os.read(src_fd, want)
+                n = len(chunk)
+                view[:n] = chunk
+            if n <= 0:
+                break
+            written = 0
+            while written < n:
+                written += os.write(dst_fd, view[written:n])
+            copied += n
+    return copied
+
+# --- Bounded-Memory Streaming Extraction ---
+# Default memory budget of one carving job; override with app.config['CARVE_MEMORY_CEILING'].
+CARVE_MEMORY_CEILING = 256 * 1024 * 1024
+
+def carve_memory_budget(memory_ceiling=None):
+    """Derives the carving buffer sizes from a per-job memory ceiling.
+
+    Candidates up to `full_validation` bytes are decoded in full; larger ones are
+    streamed to disk in `stream_chunk` pieces while being hashed and are only
+    validated on a `window`-sized prefix and suffix.
+    """
+    ceiling = memory_ceiling or app.config.get('CARVE_MEMORY_CEILING', CARVE_MEMORY_CEILING)
+    return {
+        'full_validation': ceiling // 4,
+        'stream_chunk': max(64 * 1024, min(CARVE_COPY_CHUNK_SIZE, ceiling // 16)),
+        'window': max(64 * 1024, min(1024 * 1024, ceiling // 16)),
+    }
+
+def _release_mapped_pages(mm, start, end):
+    """Drops already processed pages of a read-only mapping from the resident set."""
+    if not hasattr(mm, 'madvise') or not hasattr(mmap, 'MADV_DONTNEED'):
+        return
+    aligned = start - start % mmap.PAGESIZE
+    try:
+        mm.madvise(mmap.MADV_DONTNEED, aligned, end - aligned)
+    except (OSError, ValueError):
+        pass
+
+def stream_evidence_range(mm, dst_fd, offset, length, hasher=None, chunk_size=CARVE_COPY_CHUNK_SIZE):
+    """Writes mm[offset:offset+length] to dst_fd in fixed-size chunks, feeding `hasher` on the way.
+
+    `hasher` is a hashlib object or a list of them. Each chunk is written straight from a memoryview of the mapping and its pages are
+    released afterwards, so memory stays bounded by `chunk_size` whatever the
+    artifact size. Returns the number of bytes written.
+    """
+    hashers = hasher if isinstance(hasher, list) else [hasher] if hasher is not None else []
+    pos, end = offset, offset + length
+    while pos < end:
+        chunk_end = min(pos + chunk_size, end)
+        with memoryview(mm)[pos:chunk_end] as chunk:
+            for each in hashers:
+                each.update(chunk)
+            written = 0
+            while written < len(chunk):
+                written += os.write(dst_fd, chunk[written:])
+        _release_mapped_pages(mm, pos, chunk_end)
+        pos = chunk_end
+    return pos - offset
+
+def _validate_carved_window(mm, start, end, sig, window):
+    """Cheap validation of an oversized candidate from a bounded prefix and suffix."""
+    extension = sig['extension']
+    if extension in ['.jpeg', '.jpg', '.png', '.gif']:
+        # Parsing the header needs only the prefix; a full decode would need it all
+        with Image.open(io.BytesIO(mm[start:start + window])) as img:
+            return img.size[0] > 0 and img.size[1] > 0
+    if extension in ['.docx', '.xlsx', '.pptx', '.zip']:
+        return mm.rfind(b'PK\x05\x06', max(start, end - window), end) != -1
+    if extension == '.pdf':
+        return bytes(mm[max(start, end - 1024):end]).strip().endswith(b'%%EOF')
+    return True
+
+# --- Persistent Content-Hash Dedupe ---
+# Digests of everything already extracted, kept across runs, evidence files and cases.
+# Every engine keys the store by the MD5 of the content (the carver's content hash),
+# so carved and recovered copies of the same file dedupe against each other.
+DEDUPE_STORE_FILE = os.path.join(APP_ROOT, 'content_hashes.db')
+app.config['DEDUPE_STORE_FILE'] = DEDUPE_STORE_FILE
+# The in-memory Bloom filter is sized once for this many digests at this false-positive
+# rate (~19 MiB), so memory stays flat whatever the number of stored hashes.
+DEDUPE_BLOOM_CAPACITY = 16 * 1000 * 1000
+DEDUPE_BLOOM_FP_RATE = 0.01
+# New digests are written in batches of this many rows.
+DEDUPE_FLUSH_ROWS = 1000
+
+def _bloom_positions(digest, bits, hashes):
+    """Bit positions of `digest` in a Bloom filter (double hashing over the digest itself)."""
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:16], 'little') | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+def _bloom_add(store, digest):
+    bloom = store['bloom']
+    for pos in _bloom_positions(digest, store['bits'], store['hashes']):
+        bloom[pos >> 3] |= 1 << (pos & 7)
+
+def _bloom_may_contain(store, digest):
+    bloom = store['bloom']
+    return all(bloom[pos >> 3] & (1 << (pos & 7)) for pos in _bloom_positions(digest, store['bits'], store['hashes']))
+
+def open_dedupe_store(path=None, capacity=None):
+    """Opens the persistent dedupe store; returns a store dict, or None when it is unavailable.
+
+    Digests live in a SQLite table keyed by the raw digest bytes. A Bloom filter in
+    front of it answers most lookups for new content without touching the database;
+    it is saved with the table on close_dedupe_store and rebuilt from the table when
+    it is missing, sized differently or out of date.
+    """
+    path = path or app.config.get('DEDUPE_STORE_FILE', DEDUPE_STORE_FILE)
+    capacity = capacity or app.config.get('DEDUPE_BLOOM_CAPACITY', DEDUPE_BLOOM_CAPACITY)
+    bits = max(64, int(-capacity * math.log(DEDUPE_BLOOM_FP_RATE) / math.log(2) ** 2))
+    bits += -bits % 8
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    try:
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS content_hashes (digest BLOB PRIMARY KEY, path TEXT, first_seen TEXT) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB);
+        ''')
+        meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('bloom', 'bloom_bits', 'bloom_count')"))
+        count = conn.execute('SELECT COUNT(*) FROM content_hashes').fetchone()[0]
+    except Exception as e:
+        print(f"Dedupe store unavailable: {e}")
+        return None
+    store = {'conn': conn, 'path': path, 'bits': bits, 'hashes': hashes, 'count': count, 'added': 0, 'pending': {}}
+    if meta.get('bloom_bits') == bits and meta.get('bloom_count') == count and meta.get('bloom'):
+        store['bloom'] = bytearray(meta['bloom'])
+    else:
+        store['bloom'] = bytearray(bits // 8)
+        cur = conn.execute('SELECT digest FROM content_hashes')
+        while True:
+            rows = cur.fetchmany(10000)
+            if not rows:
+                break
+            for (digest,) in rows:
+                _bloom_add(store, digest)
+    return store
+
+def dedupe_store_seen(store, content_hash):
+    """True when content with MD5 hex digest `content_hash` was extracted before and is still on disk.
+
+    Entries whose extracted file has since been removed (e.g. a cleared output
+    folder) do not count, so re-running a job still produces its files.
+    """
+    if store is None:
+        return False
+    digest = bytes.fromhex(content_hash)
+    if not _bloom_may_contain(store, digest):
+        return False
+    if digest in store['pending']:
+        path = store['pending'][digest]
+    else:
+        row = store['conn'].execute('SELECT path FROM content_hashes WHERE digest=?', (digest,)).fetchone()
+        if row is None:
+            return False
+        path = row[0]
+    return not path or os.path.exists(path)
+
+def dedupe_store_record(store, content_hash, path):
+    """Records that content with MD5 hex digest `content_hash` was extracted to `path`."""
+    if store is None:
+        return
+    digest = bytes.fromhex(content_hash)
+    if digest not in store['pending'] and (not _bloom_may_contain(store, digest) or store['conn'].execute(
+            'SELECT 1 FROM content_hashes WHERE digest=?', (digest,)).fetchone() is None):
+        store['added'] += 1
+    _bloom_add(store, digest)
+    store['pending'][digest] = path
+    if len(store['pending']) >= DEDUPE_FLUSH_ROWS:
+        flush_dedupe_store(store)
+
+def flush_dedupe_store(store):
+    """Writes the pending digests in one transaction."""
+    if store is None or not store['pending']:
+        return
+    now = datetime.datetime.now().isoformat()
+    try:
+        with store['conn']:
+            store['conn'].executemany(
+                'INSERT INTO content_hashes(digest, path, first_seen) VALUES(?,?,?) '
+                'ON CONFLICT(digest) DO UPDATE SET path=excluded.path',
+                [(digest, path, now) for digest, path in store['pending'].items()])
+        store['pending'].clear()
+    except Exception as e:
+        print(f"Dedupe store write failed: {e}")
+
+def close_dedupe_store(store):
+    """Flushes pending digests, saves the Bloom filter next to them and closes the store.
+
+    When another job added digests meanwhile, this filter lacks them; it is dropped
+    instead so the next open rebuilds it from the table.
+    """
+    if store is None:
+        return
+    flush_dedupe_store(store)
+    try:
+        conn = store['conn']
+        count = conn.execute('SELECT COUNT(*) FROM content_hashes').fetchone()[0]
+        with conn:
+            if count == store['count'] + store['added']:
+                conn.executemany('INSERT OR REPLACE INTO meta(key, value) VALUES(?,?)',
+                                 [('bloom', bytes(store['bloom'])), ('bloom_bits', store['bits']), ('bloom_count', count)])
+            else:
+                conn.execute("DELETE FROM meta WHERE key LIKE 'bloom%'")
+        conn.close()
+    except Exception as e:
+        print(f"Dedupe store close failed: {e}")
+
+# --- Known-File Hash Set ---
+# Digests of known-good OS and application files (e.g. an NSRL RDS), whose content
+# carving and deleted-file recovery skip instead of writing it out. Each algorithm's
+# digests are one sorted array of raw digests, memory-mapped and binary searched, with
+# a Bloom filter file in front that answers most lookups for unknown content; neither
+# is read into memory, so the set may hold hundreds of millions of entries.
+KNOWN_FILES_FOLDER = os.path.join(APP_ROOT, 'known_files')
+app.config['KNOWN_FILES_FOLDER'] = KNOWN_FILES_FOLDER
+KNOWN_FILES_FILTER = True  # skip known files whenever a hash set has been imported
+KNOWN_FILES_BLOOM_FP_RATE = 0.01
+# Digests sorted in memory per run while importing; runs are merged from disk.
+KNOWN_FILES_SORT_ROWS = 2 * 1000 * 1000
+KNOWN_FILE_ALGORITHMS = {32: 'md5', 40: 'sha1', 64: 'sha256'}  # hex length -> algorithm
+KNOWN_FILE_COLUMNS = {'md5': 'md5', 'sha-1': 'sha1', 'sha1': 'sha1', 'sha-256': 'sha256', 'sha256': 'sha256'}
+
+known_files_status = {"in_progress": False, "complete": False, "error": None, "rows": 0, "counts": {}}
+
+def _known_file_paths(folder, algorithm):
+    """(digest array, Bloom filter) paths of one algorithm's part of the known-file set."""
+    base = os.path.join(folder, algorithm)
+    return base + '.digests', base + '.bloom'
+
+def _known_file_bloom_size(count):
+    """(bits, hashes) of the Bloom filter for `count` digests."""
+    count = max(1, count)
+    bits = max(64, int(-count * math.log(KNOWN_FILES_BLOOM_FP_RATE) / math.log(2) ** 2))
+    bits += -bits % 8
+    return bits, max(1, round(bits / count * math.log(2)))
+
+def _iter_known_file_digests(source_path, status=None):
+    """Yields (algorithm, raw digest) from an NSRL RDS text/CSV file or a plain hash list.
+
+    A header row naming MD5 / SHA-1 / SHA-256 columns selects those columns; without
+    one, every field of the digest length of a supported algorithm is taken.
+    """
+    with open(source_path, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+        columns = None
+        for row in csv.reader(f):
+            if status is not None:
+                status['rows'] += 1
+            if columns is None:
+                names = [KNOWN_FILE_COLUMNS.get(field.strip().lower()) for field in row]
+                columns = [(i, name) for i, name in enumerate(names) if name]
+                if columns:
+                    continue
+            if columns:
+                fields = [(row[i], name) for i, name in columns if i < len(row)]
+            else:
+                fields = [(token, None) for field in row for token in field.split()]
+            for value, expected in fields:
+                value = value.strip()
+                algorithm = KNOWN_FILE_ALGORITHMS.get(len(value))
+                if algorithm is None or expected not in (None, algorithm):
+                    continue
+                try:
+                    yield algorithm, bytes.fromhex(value)
+                except ValueError:
+                    continue
+
+def _write_known_file_run(digests, folder):
+    """Sorts `digests` and spills them to a temporary run file; returns its path."""
+    digests.sort()
+    with tempfile.NamedTemporaryFile(dir=folder, suffix='.run', delete=False) as run:
+        run.write(b''.join(digests))
+    return run.name
+
+def _iter_known_file_array(path, width):
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(width * 65536)
+            if not block:
+                return
+            for pos in range(0, len(block) - width + 1, width):
+                yield block[pos:pos + width]
+
+def import_known_file_set(source_path, folder=None, sort_rows=None, status=None):
+    """Adds the digests of an NSRL RDS text/CSV file or a plain hash list to the known-file set.
+
+    Digests are sorted in runs of `sort_rows` that are spilled to temporary files,
+    then merged with the set already on disk into new sorted, duplicate-free arrays,
+    so memory stays bounded whatever the size of the hash set. Each array's Bloom
+    filter is rebuilt afterwards. Returns {algorithm: digest count}.
+    """
+    folder = folder or app.config.get('KNOWN_FILES_FOLDER', KNOWN_FILES_FOLDER)
+    sort_rows = sort_rows or app.config.get('KNOWN_FILES_SORT_ROWS', KNOWN_FILES_SORT_ROWS)
+    os.makedirs(folder, exist_ok=True)
+    pending, runs, counts = {}, {}, {}
+    try:
+        for algorithm, digest in _iter_known_file_digests(source_path, status):
+            batch = pending.setdefault(algorithm, [])
+            batch.append(digest)
+            if len(batch) >= sort_rows:
+                runs.setdefault(algorithm, []).append(_write_known_file_run(batch, folder))
+                pending[algorithm] = []
+        for algorithm, batch in pending.items():
+            if batch:
+                runs.setdefault(algorithm, []).append(_write_known_file_run(batch, folder))
+        for algorithm, paths in runs.items():
+            width = hashlib.new(algorithm).digest_size
+            array_path, bloom_path = _known_file_paths(folder, algorithm)
+            sources = [_iter_known_file_array(path, width) for path in paths]
+            if os.path.exists(array_path):
+                sources.append(_iter_known_file_array(array_path, width))
+            count, last, buffer = 0, None, bytearray()
+            with open(array_path + '.tmp', 'wb') as out:
+                for digest in heapq.merge(*sources):
+                    if digest == last:
+                        continue
+                    buffer += digest
+                    count += 1
+                    last = digest
+                    if len(buffer) >= 1024 * 1024:
+                        out.write(buffer)
+                        buffer.clear()
+                out.write(buffer)
+            os.replace(array_path + '.tmp', array_path)
+            bits, hashes = _known_file_bloom_size(count)
+            bloom = {'bloom': bytearray(bits // 8), 'bits': bits, 'hashes': hashes}
+            for digest in _iter_known_file_array(array_path, width):
+                _bloom_add(bloom, digest)
+            with open(bloom_path + '.tmp', 'wb') as out:
+                out.write(bloom['bloom'])
+            os.replace(bloom_path + '.tmp', bloom_path)
+            counts[algorithm] = count
+    finally:
+        for paths in runs.values():
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    return counts
+
+def known_file_set_counts(folder=None):
+    """{algorithm: digest count} of the imported known-file set."""
+    folder = folder or app.config.get('KNOWN_FILES_FOLDER', KNOWN_FILES_FOLDER)
+    counts = {}
+    for algorithm in KNOWN_FILE_ALGORITHMS.values():
+        try:
+            counts[algorithm] = os.path.getsize(_known_file_paths(folder, algorithm)[0]) // hashlib.new(algorithm).digest_size
+        except OSError:
+            continue
+    return counts
+
+def known_files_enabled(requested=None):
+    """True when carving and recovery should skip known files; `requested` overrides KNOWN_FILES_FILTER."""
+    if requested is None:
+        requested = app.config.get('KNOWN_FILES_FILTER', KNOWN_FILES_FILTER)
+    return bool(requested) and any(known_file_set_counts().values())
+
+def open_known_file_set(folder=None):
+    """Maps the known-file set; returns {algorithm: array dict}, or None when no set was imported.
+
+    An array whose Bloom filter is missing or does not match it is still searched,
+    only without the prefilter.
+    """
+    folder = folder or app.config.get('KNOWN_FILES_FOLDER', KNOWN_FILES_FOLDER)
+    known = {}
+    for algorithm in KNOWN_FILE_ALGORITHMS.values():
+        array_path, bloom_path = _known_file_paths(folder, algorithm)
+        width = hashlib.new(algorithm).digest_size
+        handles = []
+        try:
+            if not os.path.exists(array_path) or os.path.getsize(array_path) < width:
+                continue
+            handles.append(open(array_path, 'rb'))
+            entry = {'mm': mmap.mmap(handles[0].fileno(), 0, access=mmap.ACCESS_READ), 'width': width,
+                     'count': os.path.getsize(array_path) // width, 'bloom': None, 'handles': handles}
+            bits, hashes = _known_file_bloom_size(entry['count'])
+            if os.path.exists(bloom_path) and os.path.getsize(bloom_path) == bits // 8:
+                handles.append(open(bloom_path, 'rb'))
+                entry.update(bloom=mmap.mmap(handles[1].fileno(), 0, access=mmap.ACCESS_READ), bits=bits, hashes=hashes)
+            known[algorithm] = entry
+        except Exception as e:
+            print(f"Known-file set {algorithm} unavailable: {e}")
+            for handle in handles:
+                handle.close()
+    return known or None
+
+def known_file_set_digests(known, content, md5=None):
+    """Returns {algorithm: hex digest} of the buffer `content` for every algorithm the known-file set holds.
+
+    A mapping is hashed through a memoryview, so it is not copied; an MD5 the
+    caller already has is passed as `md5` and not computed again.
+    """
+    hashes = {}
+    for algorithm in (known or ()):
+        if algorithm == 'md5' and md5:
+            hashes[algorithm] = md5
+            continue
+        with memoryview(content) as view:
+            hashes[algorithm] = hashlib.new(algorithm, view).hexdigest()
+    return hashes
+
+def known_file_set_contains(known, hashes):
+    """True when any of `hashes` ({algorithm: hex digest}) is in the known-file set."""
+    if not known:
+        return False
+    for algorithm, content_hash in hashes.items():
+        entry = known.get(algorithm)
+        if entry is None or not content_hash:
+            continue
+        digest = bytes.fromhex(content_hash)
+        if entry['bloom'] is not None and not _bloom_may_contain(entry, digest):
+            continue
+        mm, width = entry['mm'], entry['width']
+        low, high = 0, entry['count']
+        while low < high:
+            mid = (low + high) // 2
+            probe = mm[mid * width:(mid + 1) * width]
+            if probe == digest:
+                return True
+            if probe < digest:
+                low = mid + 1
+            else:
+                high = mid
+    return False
+
+def close_known_file_set(known):
+    if not known:
+        return
+    for entry in known.values():
+        try:
+            entry['mm'].close()
+            if entry['bloom'] is not None:
+                entry['bloom'].close()
+            for handle in entry['handles']:
+                handle.close()
+        except Exception as e:
+            print(f"Known-file set close failed: {e}")
+
+def import_known_files_threaded(source_path, remove_source=False):
+    """Imports a known-file hash set in a background thread, reporting in known_files_status."""
+    known_files_status.update({"in_progress": True, "complete": False, "error": None, "rows": 0, "source": os.path.basename(source_path)})
+    try:
+        import_known_file_set(source_path, status=known_files_status)
+    except Exception as e:
+        print(f"Known-file set import failed: {e}")
+        known_files_status["error"] = str(e)
+    if remove_source:
+        try:
+            os.remove(source_path)
+        except OSError:
+            pass
+    known_files_status.update({"in_progress": False, "complete": True, "counts": known_file_set_counts()})
+
+# --- Validation Cascade ---
+# Confidence scores recorded in carved_files_db: the deepest tier a candidate passed.
+CONFIDENCE_HEADER = 40      # header fields are sane, the length is a fixed slice
+CONFIDENCE_FOOTER = 60      # header fields are sane and a footer closes the file
+CONFIDENCE_STRUCTURE = 80   # the format's structure was walked end to end
+CONFIDENCE_DECODED = 100    # the content was fully decoded
+# Decode every survivor during the carve; otherwise decoding only runs on demand.
+CARVE_FULL_DECODE = False
+
+ZIP_COMPRESSION_METHODS = {0, 1, 6, 8, 9, 12, 14, 93, 95, 98, 99}
+PNG_BIT_DEPTHS = {0: (1, 2, 4, 8, 16), 2: (8, 16), 3: (1, 2, 4, 8), 4: (8, 16), 6: (8, 16)}
+OOXML_MAIN_PARTS = {'DOCX': b'word/document.xml', 'XLSX': b'xl/workbook.xml', 'PPTX': b'ppt/presentation.xml'}
+
+def _check_png_header(mm, start, end):
+    """The IHDR chunk must come first and hold a legal size and pixel format."""
+    if start + 29 > end or mm[start+8:start+16] != b'\x00\x00\x00\rIHDR':
+        return False
+    width = int.from_bytes(mm[start+16:start+20], 'big')
+    height = int.from_bytes(mm[start+20:start+24], 'big')
+    depth, color_type = mm[start+24], mm[start+25]
+    return (0 < width < 1 << 31 and 0 < height < 1 << 31 and depth in PNG_BIT_DEPTHS.get(color_type, ())
+            and mm[start+26] == 0 and mm[start+27] == 0 and mm[start+28] in (0, 1))
+
+def _check_jpeg_header(mm, start, end):
+    """SOI must be followed by a marker segment; APP0/APP1 must carry a known identifier."""
+    if start + 12 > end or mm[start+2] != 0xFF:
+        return False
+    marker = mm[start+3]
+    if not 0xC0 <= marker <= 0xFE or marker in (0xD8, 0xD9) or 0xD0 <= marker <= 0xD7:
+        return False
+    if int.from_bytes(mm[start+4:start+6], 'big') < 2:
+        return False
+    ident = bytes(mm[start+6:start+11])
+    if marker == 0xE0:
+        return ident in (b'JFIF\x00', b'JFXX\x00')
+    if marker == 0xE1:
+        return ident == b'Exif\x00' or ident.startswith(b'http')
+    return True
+
+def _check_gif_header(mm, start, end):
+    """Version must be 87a/89a and the logical screen must have a size."""
+    if start + 13 > end or mm[start:start+6] not in (b'GIF87a', b'GIF89a'):
+        return False
+    return int.from_bytes(mm[start+6:start+8], 'little') > 0 and int.from_bytes(mm[start+8:start+10], 'little') > 0
+
+def _check_bmp_header(mm, start, end):
+    """The reserved words are zero and the DIB header has a known size."""
+    if start + 18 > end:
+        return False
+    return (mm[start+6:start+10] == b'\x00\x00\x00\x00'
+            and int.from_bytes(mm[start+14:start+18], 'little') in (12, 40, 52, 56, 64, 108, 124))
+
+def _check_zip_header(mm, start, end):
+    """The first local header must use a known version, compression method and name length."""
+    if start + 30 > end:
+        return False
+    version = mm[start+4]
+    method = int.from_bytes(mm[start+8:start+10], 'little')
+    name_len = int.from_bytes(mm[start+26:start+28], 'little')
+    return version <= 63 and method in ZIP_COMPRESSION_METHODS and 0 < name_len <= 4096 and start + 30 + name_len <= end
+
+def _check_pdf_header(mm, start, end):
+    """The header must carry a 'digit.digit' version."""
+    version = bytes(mm[start+5:start+8]) if start + 8 <= end else b''
+    return len(version) == 3 and version[0:1].isdigit() and version[1:2] == b'.' and version[2:3].isdigit()
+
+def _check_elf_header(mm, start, end):
+    """Class, byte order and identification version must be defined values."""
+    return start + 7 <= end and mm[start+4] in (1, 2) and mm[start+5] in (1, 2) and mm[start+6] == 1
+
+def _check_pe_header(mm, start, end):
+    """e_lfanew must point inside the file at a PE signature."""
+    if start + 0x40 > end:
+        return False
+    pe_pos = start + int.from_bytes(mm[start+0x3C:start+0x40], 'little')
+    return pe_pos + 4 <= end and mm[pe_pos:pe_pos+4] == b'PE\x00\x00'
+
+def _check_sqlite_header(mm, start, end):
+    """The page size is a power of two and the payload fractions have their fixed values."""
+    if start + 100 > end:
+        return False
+    page_size = int.from_bytes(mm[start+16:start+18], 'big')
+    power_of_two = page_size == 1 or (512 <= page_size <= 32768 and not page_size & (page_size - 1))
+    return power_of_two and mm[start+21:start+24] == b'\x40\x20\x20'
+
+def _check_gzip_header(mm, start, end):
+    """The compression method is deflate and the reserved flag bits are clear."""
+    return start + 10 <= end and mm[start+2] == 8 and not mm[start+3] & 0xE0
+
+# Signature name -> check(mm, start, end) of fixed header fields; tier 1 of the cascade.
+HEADER_CHECKS = {
+    'PNG': _check_png_header,
+    'JPEG': _check_jpeg_header,
+    'JPG': _check_jpeg_header,
+    'GIF': _check_gif_header,
+    'BMP': _check_bmp_header,
+    'ZIP': _check_zip_header,
+    'DOCX': _check_zip_header,
+    'XLSX': _check_zip_header,
+    'PPTX': _check_zip_header,
+    'PDF': _check_pdf_header,
+    'ELF': _check_elf_header,
+    'EXE': _check_pe_header,
+    'SQLite': _check_sqlite_header,
+    'GZIP': _check_gzip_header,
+}
+
+def _check_png_structure(mm, start, end, name=None):
+    """Every chunk's CRC must match and IEND must close the file."""
+    pos = start + 8
+    while pos + 12 <= end:
+        length = int.from_bytes(mm[pos:pos+4], 'big')
+        if pos + 12 + length > end:
+            return False
+        with memoryview(mm)[pos+4:pos+8+length] as chunk:
+            crc = zlib.crc32(chunk)
+        if crc != int.from_bytes(mm[pos+8+length:pos+12+length], 'big'):
+            return False
+        if mm[pos+4:pos+8] == b'IEND':
+            return pos + 12 == end
+        pos += 12 + length
+    return False
+
+def _check_zip_structure(mm, start, end, name=None):
+    """Each central directory entry must point at a matching local header.
+
+    OOXML documents must also list [Content_Types].xml and their main part.
+    """
+    eocd = mm.rfind(b'PK\x05\x06', max(start, end - 22 - 65535), end - 18)
+    if eocd == -1:
+        return False
+    total = int.from_bytes(mm[eocd+10:eocd+12], 'little')
+    cd_size = int.from_bytes(mm[eocd+12:eocd+16], 'little')
+    cd_offset = int.from_bytes(mm[eocd+16:eocd+20], 'little')
+    if cd_offset == 0xFFFFFFFF or total == 0xFFFF:
+        return True  # ZIP64: the 32-bit directory fields cannot be walked
+    pos, cd_end = start + cd_offset, start + cd_offset + cd_size
+    if cd_end != eocd:
+        return False
+    names = set()
+    while pos + 46 <= cd_end:
+        if mm[pos:pos+4] != b'PK\x01\x02':
+            return False
+        name_len = int.from_bytes(mm[pos+28:pos+30], 'little')
+        extra_len = int.from_bytes(mm[pos+30:pos+32], 'little')
+        comment_len = int.from_bytes(mm[pos+32:pos+34], 'little')
+        local = start + int.from_bytes(mm[pos+42:pos+46], 'little')
+        entry_name = bytes(mm[pos+46:pos+46+name_len])
+        if (local + 30 + name_len > cd_end or mm[local:local+4] != b'PK\x03\x04'
+                or mm[local+30:local+30+name_len] != entry_name):
+            return False
+        names.add(entry_name)
+        pos += 46 + name_len + extra_len + comment_len
+    if pos != cd_end or len(names) != total:
+        return False
+    main_part = OOXML_MAIN_PARTS.get(name)
+    return main_part is None or (b'[Content_Types].xml' in names and main_part in names)
+
+def _check_pdf_structure(mm, start, end, name=None):
+    """The last startxref must point at an xref table or an xref stream object."""
+    xref_pos = mm.rfind(b'startxref', max(start, end - 1024), end)
+    if xref_pos == -1:
+        return False
+    try:
+        xref_offset = int(bytes(mm[xref_pos+9:min(end, xref_pos+40)]).split()[0])
+    except (ValueError, IndexError):
+        return False
+    target = start + xref_offset
+    if not start < target < xref_pos:
+        return False
+    return mm[target:target+4] == b'xref' or re.match(rb'\d+\s+\d+\s+obj', mm[target:target+32]) is not None
+
+# Signature name -> check(mm, start, end, name) walking the whole file; tier 2 of the
+# cascade for formats whose length resolver does not already validate the structure.
+STRUCTURE_CHECKS = {
+    'PNG': _check_png_structure,
+    'ZIP': _check_zip_structure,
+    'DOCX': _check_zip_structure,
+    'XLSX': _check_zip_structure,
+    'PPTX': _check_zip_structure,
+    'PDF': _check_pdf_structure,
+}
+
+def decode_carved_content(content, extension):
+    """Tier 3: fully decodes `content` (bytes or a memoryview); returns False when it does not decode."""
+    try:
+        if extension in ['.jpeg', '.jpg', '.png', '.gif']:
+            with Image.open(io.BytesIO(content)) as img:
+                img.load()
+        elif extension in ['.docx', '.xlsx', '.pptx', '.zip']:
+            with zipfile.ZipFile(io.BytesIO(content)) as zf:
+                if zf.testzip() is not None:
+                    return False
+        elif extension == '.pdf':
+            if not bytes(content[-1024:]).strip().endswith(b'%%EOF'):
+                return False
+    except Exception:
+        return False
+    return True
+
+def verify_carved_file(filename):
+    """Fully decodes a carved file on demand and records the outcome in carved_files_db.
+
+    Returns the updated carved_files_db entry; its confidence becomes
+    CONFIDENCE_DECODED, or 0 when the file does not decode.
+    """
+    filepath, offset, size = find_carved_member(filename) or (os.path.join(app.config['CARVED_FOLDER'], filename), 0, None)
+    extension = os.path.splitext(filename)[1].lower()
+    with open(filepath, 'rb') as f:
+        if size is None:
+            size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            decoded = False
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm)[offset:offset + size] as content:
+                decoded = decode_carved_content(content, extension)
+    entry = carved_files_db.setdefault(filename, {"name": filename})
+    entry.update({"confidence": CONFIDENCE_DECODED if decoded else 0, "validation": "decoded" if decoded else "decode failed"})
+    return entry
+
+# --- Carving & Recovery Engines ---
+def _validate_and_extract_file(mm, file_start_pos, sig_options, seen_hashes, file_size_limit, memory_ceiling=None, index=None):
+    """Validates a data chunk with strict deduplication and empty file checking.
+
+    Combines resolve_candidate_extent and validate_carved_extent. Returns (length,
+    sig, content_hash), or (None, None, None) when the candidate is invalid or
+    already in `seen_hashes`; recording accepted hashes is up to the caller.
+    """
+    sig = sig_options[0]
+    end_pos, method = resolve_candidate_extent(mm, file_start_pos, sig, file_size_limit, index)
+    if end_pos is None:
+        return None, None, None
+    valid, content_hash, _ = validate_carved_extent(mm, file_start_pos, end_pos, sig, seen_hashes, memory_ceiling, method)
+    if not valid:
+        return None, None, None
+    return end_pos - file_start_pos, sig, content_hash
+
+def resolve_candidate_extent(mm, file_start_pos, sig, file_size_limit, index=None):
+    """Returns (end offset, method) of the file `sig` starting at file_start_pos, or (None, None).
+
+    The extent comes from resolve_carve_extent (MP3 frame streams are walked here)
+    and must reach the format's minimum size. This is the cheap half of candidate
+    processing that the scanner does itself.
+    """
+    name = sig['name']
+
+    # --- MP3: Parse Frame Stream with Tolerance and ID3 Skipping ---
+    if name == 'MP3':
+        audio_start_offset = file_start_pos
+        if mm[file_start_pos:file_start_pos+3] == b'ID3':
+            try:
+                id3_size_bytes = mm[file_start_pos+6:file_start_pos+10]
+                id3_size = (id3_size_bytes[0] << 21) | (id3_size_bytes[1] << 14) | (id3_size_bytes[2] << 7) | id3_size_bytes[3]
+                audio_start_offset = file_start_pos + id3_size + 10
+            except IndexError: 
+                return None, None
+
+        total_size, _ = walk_mp3_frames(mm, audio_start_offset, file_size_limit)
+
+        if total_size <= 4096:
+            return None, None
+        end_pos = audio_start_offset + total_size
+        method = 'structure'
+    else:
+        length, method = resolve_carve_extent(mm, file_start_pos, sig, file_size_limit, index)
+        if not length:
+            return None, None
+        end_pos = file_start_pos + length
+
+    end_pos = min(end_pos, file_size_limit)
+    length = end_pos - file_start_pos
+    MIN_SIZES = {'.jpeg': 2048, '.jpg': 2048, '.png': 256, '.zip': 128, '.pdf': 1024, '.docx': 4096}
+    # Add validation with file format-specific minimum sizes
+    if length < MIN_SIZES.get(sig['extension'], CARVE_MIN_FILE_SIZE):
+        return None, None
+    return end_pos, method
+
+def validate_carved_extent(mm, start, end, sig, seen_hashes=(), memory_ceiling=None, method='structure', full_decode=None):
+    """Runs the validation cascade on mm[start:end]; returns (valid, content_hash, confidence).
+
+    Tiers run cheapest first and a candidate stops at the first one it fails:
+    1. HEADER_CHECKS: constant-time sanity checks of fixed header fields;
+    2. STRUCTURE_CHECKS: a walk of the whole structure (CRCs, directory entries),
+       for formats whose length resolver (`method` 'structure') did not walk it;
+    3. a full decode, only with `full_decode` (defaults to
+       app.config['CARVE_FULL_DECODE']); otherwise see verify_carved_file.
+    `confidence` is the score of the deepest tier passed (CONFIDENCE_*).
+
+    Hashing runs over a memoryview of the mapping, so nothing is copied out of the
+    evidence. Candidates larger than the full-validation budget of `memory_ceiling`
+    skip the structure walk and decode; they are checked on a bounded prefix/suffix
+    and come back with a None hash: they are hashed while being streamed out (see
+    save_carved_file). Content already in `seen_hashes` is reported invalid.
+    """
+    name = sig['name']
+    header_check = HEADER_CHECKS.get(name)
+    try:
+        if header_check is not None and not header_check(mm, start, end):
+            return False, None, 0
+    except (IndexError, ValueError):
+        return False, None, 0
+    confidence = {'structure': CONFIDENCE_STRUCTURE, 'footer': CONFIDENCE_FOOTER}.get(method, CONFIDENCE_HEADER)
+
+    budget = carve_memory_budget(memory_ceiling)
+    if end - start > budget['full_validation']:
+        try:
+            return bool(_validate_carved_window(mm, start, end, sig, budget['window'])), None, confidence
+        except Exception:
+            return False, None, 0
+
+    structure_check = STRUCTURE_CHECKS.get(name)
+    if structure_check is not None:
+        try:
+            if not structure_check(mm, start, end, name):
+                return False, None, 0
+        except (IndexError, ValueError):
+            return False, None, 0
+        confidence = CONFIDENCE_STRUCTURE
+
+    content_hash = hash_mapped_range(mm, start, end)
+    if content_hash in seen_hashes:
+        return False, content_hash, confidence
+    if full_decode is None:
+        full_decode = app.config.get('CARVE_FULL_DECODE', CARVE_FULL_DECODE)
+    if full_decode:
+        with memoryview(mm)[start:end] as content:
+            if not decode_carved_content(content, sig['extension']):
+                return False, content_hash, 0
+        confidence = CONFIDENCE_DECODED
+    return True, content_hash, confidence
+
+def validate_classified_extent(mm, start, end, sig, *args, **kwargs):
+    """validate_carved_extent for a classified hit; returns (sig, valid, content_hash, confidence).
+
+    A concrete type picked by classify_signature_hit (e.g. DOCX) that fails
+    validation is validated again as its 'fallback' (ZIP), so that the hit is still
+    carved as the generic type instead of being dropped (_iter_carve_extents does
+    the same for extents that do not resolve).
+    """
+    while True:
+        valid, content_hash, confidence = validate_carved_extent(mm, start, end, sig, *args, **kwargs)
+        if valid or not sig.get('fallback'):
+            return sig, valid, content_hash, confidence
+        sig = sig['fallback']
+
+# --- Parallel Carving ---
+CARVE_MIN_FILE_SIZE = 128  # Minimum file size to consider valid
+CARVING_WORKERS = os.cpu_count() or 1
+CARVING_SHARD_SIZE = 256 * 1024 * 1024
+CARVING_MIN_SHARD_SIZE = 4 * 1024 * 1024
+
+def _iter_carve_extents(mm, matcher, start, end, file_size, index=None, alignment=None):
+    """Yields (file_start, sig, end_pos, method) for every header hit in mm[start:end] with a plausible extent.
+
+    Hits come from the signature hit `index` when given, which must cover the range;
+    with `alignment` only sector/cluster boundaries are examined.
+    """
+    if index is not None:
+        hits = iter_indexed_signature_hits(index, matcher, start, end)
+    elif alignment:
+        hits = iter_aligned_signature_hits(matcher, mm, alignment, start, end)
+    else:
+        hits = iter_signature_hits(matcher, mm, start, end)
+    for found_pos, header in hits:
+        for sig in classify_signature_hit(mm, found_pos, matcher['by_header'][header], file_size):
+            # Some headers (MP4's 'ftyp') sit at a fixed offset into the file
+            file_start = found_pos - sig.get('offset', 0)
+            if file_start < 0:
+                continue
+            end_pos, method = resolve_candidate_extent(mm, file_start, sig, file_size, index)
+            # a concrete type that cannot be resolved is still carved as its generic one
+            while end_pos is None and sig.get('fallback'):
+                sig = sig['fallback']
+                end_pos, method = resolve_candidate_extent(mm, file_start, sig, file_size, index)
+            if end_pos is not None:
+                yield file_start, sig, end_pos, method
+
+def _iter_carve_candidates(mm, matcher, start, end, file_size, seen_hashes, memory_ceiling=None, index=None, alignment=None, full_decode=None):
+    """Yields (file_start, sig, length, content_hash, confidence) for every header hit in mm[start:end] that validates.
+
+    content_hash is None for oversized candidates that must be hashed while streamed.
+    """
+    for file_start, sig, end_pos, method in _iter_carve_extents(mm, matcher, start, end, file_size, index, alignment):
+        sig, valid, content_hash, confidence = validate_classified_extent(mm, file_start, end_pos, sig, seen_hashes, memory_ceiling, method, full_decode)
+        if valid:
+            yield file_start, sig, end_pos - file_start, content_hash, confidence
+
+# --- Pipelined Candidate Validation ---
+# Processes decoding candidates while the scanner keeps producing extents.
+# Each worker maps the evidence and holds candidates of its own, so a few are enough.
+CARVE_VALIDATION_WORKERS = min(os.cpu_count() or 1, 4)
+# The pool is only started once the scan produced this many candidates; fewer are
+# validated inline, which is cheaper than starting the worker processes.
+CARVE_VALIDATION_MIN_CANDIDATES = 64
+# Extents in flight between the scanner and the validation pool before the scanner waits.
+CARVE_VALIDATION_QUEUE_DEPTH = 64
+_validation_worker_state = {}
+
+def _init_validation_worker(filepath):
+    """Validation-pool initializer: maps the evidence once per process."""
+    f = open(filepath, 'rb')
+    _validation_worker_state.update({'file': f, 'mm': mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), 'seen': set()})
+
+def _validate_extent_worker(args):
+    """Validation-pool task: returns validate_classified_extent's (sig, valid, content_hash, confidence) for one extent.
+
+    Each worker takes its tasks in scan order, so content it already validated is a
+    later duplicate that the parent would drop; it is rejected before being decoded.
+    """
+    start, end, sig, memory_ceiling, method, full_decode = args
+    seen = _validation_worker_state['seen']
+    result = validate_classified_extent(_validation_worker_state['mm'], start, end, sig, seen, memory_ceiling, method, full_decode)
+    if result[1] and result[2] is not None:
+        seen.add(result[2])
+    return result
+
+def iter_pipelined_candidates(executor, extents, queue_depth, memory_ceiling=None, workers=1):
+    """Validates `extents` in `executor`, yielding (file_start, sig, length, content_hash, confidence) in scan order.
+
+    At most `queue_depth` extents are in flight: the scanner producing `extents` only
+    waits once the queue is full, so scanning and validation overlap and the slower
+    stage sets the pace. Results are consumed in submission order, which keeps
+    deduplication and file numbering identical to an inline run.
+
+    The job's memory ceiling is divided evenly between the `workers` processes, and
+    the scanner also waits while the extents in flight could need more than the
+    ceiling to validate.
+    """
+    ceiling = memory_ceiling or app.config.get('CARVE_MEMORY_CEILING', CARVE_MEMORY_CEILING)
+    worker_ceiling = ceiling // max(1, workers)
+    full_validation = carve_memory_budget(worker_ceiling)['full_validation']
+    pending = deque()
+    in_flight = [0]
+
+    def completed(drain):
+        while pending and (drain or len(pending) >= queue_depth or in_flight[0] > ceiling):
+            file_start, sig, end_pos, cost, future = pending.popleft()
+            in_flight[0] -= cost
+            sig, valid, content_hash, confidence = future.result()
+            if valid:
+                yield file_start, sig, end_pos - file_start, content_hash, confidence
+
+    # The workers do not share the app config, so the decode setting travels with each task
+    full_decode = app.config.get('CARVE_FULL_DECODE', CARVE_FULL_DECODE)
+    for file_start, sig, end_pos, method in extents:
+        # oversized extents are only checked on a bounded window
+        cost = min(end_pos - file_start, full_validation)
+        in_flight[0] += cost
+        pending.append((file_start, sig, end_pos, cost, executor.submit(_validate_extent_worker, (file_start, end_pos, sig, worker_ceiling, method, full_decode))))
+        yield from completed(False)
+    yield from completed(True)
+
+# --- Recursive Container Carving ---
+# Carved archives are decompressed and carved again, so files inside ZIP/Office/GZIP
+# containers are recovered with the container's evidence offset as provenance.
+CARVE_RECURSION_DEPTH = 0  # nesting levels carved inside containers; 0 disables recursion
+CARVE_RECURSION_DEPTHS = (1, 2, 3)
+CARVE_RECURSION_TYPES = ('ZIP', 'DOCX', 'XLSX', 'PPTX', 'GZIP')
+# Limit on a container's compressed size and on the bytes decompressed from it (all levels)
+CARVE_RECURSION_MAX_BYTES = 256 * 1024 * 1024
+CARVE_RECURSION_CHUNK_SIZE = 1024 * 1024
+
+def _gunzip_chunks(data, chunk_size):
+    """Yields the decompressed gzip stream `data` in pieces of at most `chunk_size` bytes."""
+    decompressor = zlib.decompressobj(wbits=31)
+    view = memoryview(data)
+    for i in range(0, len(view), chunk_size):
+        pending = view[i:i + chunk_size]
+        # the output cap keeps a small, highly compressed input from expanding at once
+        while pending and not decompressor.eof:
+            out = decompressor.decompress(pending, chunk_size)
+            pending = decompressor.unconsumed_tail
+            if out:
+                yield out
+        if decompressor.eof:
+            return
+
+def _zip_member_chunks(zf, info, chunk_size):
+    with zf.open(info) as member:
+        while True:
+            chunk = member.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def iter_container_streams(data, sig_name, chunk_size=CARVE_RECURSION_CHUNK_SIZE):
+    """Yields (member name, decompressed chunk iterator) for each stream in the container `data`."""
+    if sig_name == 'GZIP':
+        yield '', _gunzip_chunks(data, chunk_size)
+        return
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        for info in zf.infolist():
+            if not info.is_dir():
+                yield info.filename, _zip_member_chunks(zf, info, chunk_size)
+
+def carve_nested_candidates(data, sig_name, matcher, depth, max_depth, budget, full_decode=None, prefix=''):
+    """Carves the decompressed streams of container `data`; yields the nested files found.
+
+    Yields (path, sig name, content, md5, confidence, depth) where `path` names the
+    member and the offset inside its decompressed stream, prefixed by the path of
+    the enclosing container for deeper levels. Each stream is spooled to a temporary
+    file and mapped, so it goes through the carver's own extent resolution and
+    validation cascade. `budget` is a one-element list holding the bytes that may
+    still be decompressed; nested containers are carved down to `max_depth`.
+    """
+    for member, chunks in iter_container_streams(data, sig_name):
+        if budget[0] <= 0:
+            return
+        with tempfile.TemporaryFile() as spool:
+            try:
+                for chunk in chunks:
+                    spool.write(chunk[:budget[0]])
+                    budget[0] -= len(chunk)
+                    if budget[0] <= 0:
+                        break
+            except (zlib.error, zipfile.BadZipFile, RuntimeError, EOFError, NotImplementedError) as e:
+                # damaged or encrypted members: carve whatever was decompressed
+                print(f"Nested stream {prefix}{member} ends early: {e}")
+            size = spool.tell()
+            if not size:
+                continue
+            spool.flush()
+            seen = set()
+            with mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for start, sig, end, method in _iter_carve_extents(mm, matcher, 0, size, size):
+                    sig, valid, content_hash, confidence = validate_classified_extent(mm, start, end, sig, seen, method=method, full_decode=full_decode)
+                    if not valid:
+                        continue
+                    content = mm[start:end]
+                    content_hash = content_hash or hashlib.md5(content).hexdigest()
+                    seen.add(content_hash)
+                    path = f"{prefix}{member}@0x{start:X}"
+                    yield path, sig['name'], content, content_hash, confidence, depth
+                    if depth < max_depth and sig['name'] in CARVE_RECURSION_TYPES:
+                        try:
+                            yield from carve_nested_candidates(content, sig['name'], matcher, depth + 1, max_depth, budget, full_decode, path + '/')
+                        except (zipfile.BadZipFile, zlib.error, OSError) as e:
+                            print(f"Nested container {path} unreadable: {e}")
+
+def _carve_nested_worker(args):
+    """Validation-pool task: spools the nested files of the container at `start` (see carve_nested_candidates).
+
+    Each nested file is written to a file of its own in `spool_dir` as soon as it is
+    found; returns a list of (path, sig name, spool file, size, md5, confidence, depth),
+    so neither the pool nor the parent holds nested content until it is saved.
+    """
+    filepath, start, length, sig_name, selected_types, max_depth, max_bytes, full_decode, spool_dir = args
+    matcher = build_signature_matcher(selected_types)
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        data = f.read(length)
+    nested = []
+    try:
+        for path, name, content, content_hash, confidence, depth in carve_nested_candidates(data, sig_name, matcher, 1, max_depth, [max_bytes], full_decode):
+            fd, spool_path = tempfile.mkstemp(dir=spool_dir, suffix='.nested')
+            with os.fdopen(fd, 'wb') as spool:
+                spool.write(content)
+            nested.append((path, name, spool_path, len(content), content_hash, confidence, depth))
+    except Exception as e:
+        print(f"Recursive carving of the {sig_name} at 0x{start:08X} failed: {e}")
+    return nested
+
+def _carve_shard_worker(args):
+    """Process-pool worker that carves a single shard of the evidence.
+
+    The worker maps the whole image (carved files may run past the shard end) but
+    only reports headers starting inside its shard; iter_signature_hits already lets
+    the scan overlap into the next shard by the longest header. With `index_path` the
+    hits are read from the finished signature hit index instead. Returns a list of
+    (found_pos, signature name, length, md5, confidence) in offset order, the parent process
+    deduplicates and writes the files.
+    """
+    filepath, selected_types, shard_start, shard_end, memory_ceiling, index_path, alignment, extents, full_decode = args
+    matcher = build_signature_matcher(selected_types)
+    candidates = []
+    shard_seen = set()
+    index = None
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        file_size = len(mm)
+        if index_path:
+            index = _load_signature_index(sqlite3.connect(index_path), index_path, file_size, file_size)
+            spans = [(shard_start, shard_end)]
+        else:
+            # Each worker classifies only its own shard's constant blocks
+            spans = iter_scan_spans(build_constant_block_map(mm, shard_start, shard_end), shard_start, shard_end,
+                                    matcher['max_header_len'] - 1, constant_skip_values(matcher['by_header']))
+        if extents is not None:
+            spans = clip_spans_to_extents(spans, extents)
+        try:
+            for span_start, span_end in spans:
+                for file_start, sig, length, content_hash, confidence in _iter_carve_candidates(mm, matcher, span_start, span_end, file_size, shard_seen, memory_ceiling, index, alignment, full_decode):
+                    shard_seen.add(content_hash)
+                    candidates.append((file_start, sig['name'], length, content_hash, confidence))
+        finally:
+            close_signature_index(index)
+    return candidates
 
-    # --- Strategy 3: Parse MP3 Frame Stream with Tolerance and ID3 Skipping ---
-    elif name == 'MP3':
-        audio_start_offset = file_start_pos
-        if mm[file_start_pos:file_start_pos+3] == b'ID3':
-            try:
-                id3_size_bytes = mm[file_start_pos+6:file_start_pos+10]
-                id3_size = (id3_size_bytes[0] << 21) | (id3_size_bytes[1] << 14) | (id3_size_bytes[2] << 7) | id3_size_bytes[3]
-                audio_start_offset = file_start_pos + id3_size + 10
-            except IndexError: 
-                return None, None, None
+def _carve_shards_in_parallel(filepath, selected_types, mm, matcher, file_size, store_candidate, workers=None, memory_ceiling=None, index_path=None, alignment=None, extents=None):
+    """Splits the image into shards, scans them in a process pool and stores results in offset order.
 
-        BITRATE_MAP = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0]
-        SAMPLERATE_MAP = [44100, 48000, 32000, 0]
-        current_offset = audio_start_offset
-        total_size = 0
-        invalid_frames_in_a_row = 0
-        MAX_INVALID_FRAMES = 10
-
-        while current_offset + 4 < file_size_limit:
-            header_bytes = mm[current_offset : current_offset + 4]
-            is_mpeg_frame = (header_bytes[0] == 0xFF and (header_bytes[1] & 0xE0) == 0xE0)
-            if not is_mpeg_frame:
-                invalid_frames_in_a_row += 1
-                if invalid_frames_in_a_row >= MAX_INVALID_FRAMES: 
-                    break
-                current_offset += 1
-                continue
-            invalid_frames_in_a_row = 0
-            try:
-                samplerate_bits = (header_bytes[2] >> 2) & 3
-                sample_rate = SAMPLERATE_MAP[samplerate_bits]
-                bitrate_bits = (header_bytes[2] >> 4) & 15
-                bitrate = BITRATE_MAP[bitrate_bits] * 1000
-                padding_bit = (header_bytes[2] >> 1) & 1
-                if bitrate == 0 or sample_rate == 0: 
-                    raise ValueError("Invalid frame")
-                frame_size = int((144 * bitrate / sample_rate) + padding_bit)
-                if frame_size <= 1: 
-                    raise ValueError("Invalid frame")
-                total_size += frame_size
-                current_offset += frame_size
-            except (ValueError, IndexError):
-                invalid_frames_in_a_row += 1
-                if invalid_frames_in_a_row >= MAX_INVALID_FRAMES: 
-                    break
-                current_offset += 1
-
-        if total_size > 4096:
-            end_pos = audio_start_offset + total_size
-            content = mm[file_start_pos:end_pos]
-            # Add validation
-            if content and len(content) >= MIN_FILE_SIZE:
-                content_hash = hashlib.md5(content[:8192]).hexdigest()
-                if content_hash not in seen_hashes:
-                    seen_hashes.add(content_hash)
-                    return content, sig, content_hash
+    The job's memory ceiling is divided evenly between the worker processes; each
+    worker only receives the scope `extents` overlapping its shard.
+    """
+    workers = max(1, workers or CARVING_WORKERS)
+    shard_size = max(CARVING_MIN_SHARD_SIZE, min(CARVING_SHARD_SIZE, -(-file_size // workers)))
+    worker_ceiling = (memory_ceiling or app.config.get('CARVE_MEMORY_CEILING', CARVE_MEMORY_CEILING)) // workers
+    shards = []
+    for start in range(0, file_size, shard_size):
+        end = min(start + shard_size, file_size)
+        shard_extents = clip_spans_to_extents([(start, end)], extents) if extents is not None else None
+        if shard_extents == []:
+            continue  # nothing in scope here
+        shards.append((filepath, list(selected_types), start, end, worker_ceiling, index_path, alignment, shard_extents,
+                       app.config.get('CARVE_FULL_DECODE', CARVE_FULL_DECODE)))
+    if not shards:
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+        # map() yields shard results in submission order, which is offset order,
+        # so candidates can be deduplicated and written as soon as each shard lands.
+        for shard, candidates in zip(shards, executor.map(_carve_shard_worker, shards)):
+            for found_pos, name, length, content_hash, confidence in candidates:
+                sig = matcher['signatures'][name]
+                store_candidate(found_pos, sig, length, content_hash, confidence)
+            _update_carving_scan_progress(shard[3], file_size)
+
+def _update_carving_scan_progress(scanned_to, file_size):
+    """Advances the carving progress once everything before `scanned_to` has been scanned."""
+    carving_status.update({
+        "current_offset": f"0x{scanned_to:08X}",
+        "progress": int((scanned_to / file_size) * 100) if file_size > 0 else 0,
+        "bytes_processed": max(carving_status.get('bytes_processed', 0), scanned_to)
+    })
 
-    # --- Strategy 4: Basic Header/Footer Matching (JPEG, PNG, PDF, etc.) ---
-    elif sig.get('footer'):
-        search_limit = min(file_start_pos + sig.get('max_size', 50*1024*1024), file_size_limit)
-        header_len = len(sig.get('header', sig.get('headers', [b''])[0]))
-        footer_pos = mm.find(sig['footer'], file_start_pos + header_len, search_limit)
-        if footer_pos != -1:
-            end_pos = footer_pos + len(sig['footer'])
-            content = mm[file_start_pos:end_pos]
-            MIN_SIZES = {'.jpeg': 2048, '.png': 256, '.zip': 128, '.pdf': 1024, '.docx': 4096}
-            
-            # Add validation with file format-specific minimum sizes
-            min_size = MIN_SIZES.get(sig['extension'], MIN_FILE_SIZE)
-            if content and len(content) >= min_size:
-                content_hash = hashlib.md5(content[:4096]).hexdigest()
-                if content_hash in seen_hashes: 
-                    return None, None, None
-                try:
-                    if sig['extension'] in ['.jpeg', '.png', '.gif']: 
-                        Image.open(io.BytesIO(content)).verify()
-                    elif sig['extension'] in ['.docx', '.xlsx', '.pptx', '.zip']:
-                        with zipfile.ZipFile(io.BytesIO(content)) as zf:
-                            if zf.testzip() is not None: 
-                                return None, None, None
-                    elif sig['extension'] == '.pdf':
-                        if not content.strip().endswith(b'%%EOF'): 
-                            return None, None, None
-                    
-                    # Final validation check before returning
-                    if content_hash not in seen_hashes:
-                        seen_hashes.add(content_hash)
-                        return content, sig, content_hash
-                except Exception:
-                    return None, None, None
+# --- Sampling Estimate ---
+# Triage before a full carve: a random sample of blocks goes through the same matcher
+# and validators, and the hits found are scaled up to the whole image.
+CARVE_SAMPLE_FRACTION = 0.01
+CARVE_SAMPLE_FRACTIONS = (0.001, 0.01, 0.05)
+CARVE_SAMPLE_BLOCK_SIZE = 1024 * 1024
+CARVE_SAMPLE_MAX_BLOCKS = 4096
+CARVE_SAMPLE_TIME_LIMIT = 10  # seconds
+
+def estimate_carving(filepath, selected_types, fraction=None, block_size=None, alignment=None, seed=None, time_limit=None):
+    """Carves a random `fraction` of the image in `block_size` blocks and projects the full run.
+
+    Returns a dict with the sampled hits and projected hits per signature and the
+    estimated duration of a full carve. Sampling stops early after `time_limit`
+    seconds; the projection then covers the blocks sampled so far.
+    """
+    fraction = fraction or app.config.get('CARVE_SAMPLE_FRACTION', CARVE_SAMPLE_FRACTION)
+    block_size = block_size or app.config.get('CARVE_SAMPLE_BLOCK_SIZE', CARVE_SAMPLE_BLOCK_SIZE)
+    time_limit = time_limit or app.config.get('CARVE_SAMPLE_TIME_LIMIT', CARVE_SAMPLE_TIME_LIMIT)
+    matcher = build_signature_matcher(selected_types)
+    file_size = os.path.getsize(filepath)
+    block_count = max(1, -(-file_size // block_size))
+    wanted = min(block_count, max(1, math.ceil(block_count * fraction)), app.config.get('CARVE_SAMPLE_MAX_BLOCKS', CARVE_SAMPLE_MAX_BLOCKS))
+    # sorted so the sample is read front to back
+    blocks = sorted(random.Random(seed).sample(range(block_count), wanted))
+    hits = {name: 0 for name in (matcher['signatures'] if matcher else ())}
+    sampled_bytes = 0
+    sampled_blocks = 0
+    seen_hashes = set()
+    start_time = time.time()
+    if matcher and file_size:
+        with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for block in blocks:
+                start = block * block_size
+                end = min(start + block_size, file_size)
+                for file_start, sig, end_pos, method in _iter_carve_extents(mm, matcher, start, end, file_size, alignment=alignment):
+                    sig, valid, _, _ = validate_classified_extent(mm, file_start, end_pos, sig, seen_hashes, method=method)
+                    if valid:
+                        hits[sig['name']] += 1
+                sampled_bytes += end - start
+                sampled_blocks += 1
+                if time.time() - start_time >= time_limit:
+                    break
+    elapsed = time.time() - start_time
+    scale = file_size / sampled_bytes if sampled_bytes else 0
+    eta_seconds = elapsed * scale
+    return {
+        "file_size": file_size,
+        "block_size": block_size,
+        "sampled_blocks": sampled_blocks,
+        "planned_blocks": wanted,
+        "sampled_bytes": sampled_bytes,
+        "sampled_fraction": sampled_bytes / file_size if file_size else 0,
+        "partial": sampled_blocks < wanted,
+        "hits": {name: {"sampled": count, "projected": round(count * scale)} for name, count in hits.items()},
+        "projected_total": round(sum(hits.values()) * scale),
+        "elapsed_time": format_time(elapsed),
+        "estimated_total_seconds": eta_seconds,
+        "estimated_total_time": format_time(eta_seconds),
+    }
 
-    return None, None, None
 # --- NEW, CORRECTED CARVER ---
-def simple_file_carver(filepath, selected_types):
-    """High-speed carver that eliminates empty files and duplicates."""
+def simple_file_carver(filepath, selected_types, parallel=False, workers=None, memory_ceiling=None, alignment=None, scope=None,
+                       validation_workers=None, queue_depth=None, output_mode=None, recursion_depth=None, known_files=None):
+    """High-speed carver that eliminates empty files and duplicates.
+
+    With `parallel` the image is split into shards that are scanned by a process
+    pool of `workers` processes (defaults to CARVING_WORKERS). `memory_ceiling`
+    bounds the job's validation and copy buffers (see carve_memory_budget).
+
+    Once the evidence is hashed, a sequential pass records every known header and
+    footer in the evidence's signature hit index; later carves of the same evidence,
+    whatever types they select, read their hits from it instead of rescanning.
+    Constant (zero-filled, wiped) blocks are never scanned.
+
+    `alignment` (one of CARVING_ALIGNMENTS) selects the fast triage mode that only
+    examines headers at sector/cluster boundaries, except for embedded-object types;
+    such partial scans neither build nor use the hit index. With scope='unallocated'
+    only headers in space no allocated file occupies are examined (see
+    compute_unallocated_extents); the hit index is used but not built then.
+
+    Single-process scans hand candidate extents to a pool of `validation_workers`
+    processes (see iter_pipelined_candidates) with at most `queue_depth` in flight;
+    scans yielding fewer than CARVE_VALIDATION_MIN_CANDIDATES are validated inline.
+    Every carved file is listed in carved_files_db with the confidence score of the
+    validation cascade (see validate_carved_extent). Content extracted by an earlier
+    run or from another image and still on disk is skipped (see open_dedupe_store).
+
+    With output_mode='container' (default app.config['CARVE_OUTPUT_MODE']) carved
+    files are appended to tar segments with an offset index instead of being written
+    one file each (see open_carve_container).
+
+    With a `recursion_depth` (default app.config['CARVE_RECURSION_DEPTH']) carved
+    containers of CARVE_RECURSION_TYPES are decompressed and carved again, in the
+    validation pool when there is one (see carve_nested_candidates); nested files
+    are spooled to temporary files and saved once the scan is done.
+
+    Content found in the imported known-file hash set is not written out unless
+    `known_files` (default app.config['KNOWN_FILES_FILTER']) is False; skipped
+    files are counted in carving_status['known_skipped'].
+    """
     # global carving_status
     
     # Initialize status
     carving_status.update({
         "progress": 0, "current_offset": "0x00000000", "files_found": 0,
-        "complete": False, "found_files_list": [], "error": None,
+        "complete": False, "error": None,
          "start_time": time.time(), 
         "estimated_total_time": None, 
         "elapsed_time": "0s",
         "last_update_time": time.time(),
         "bytes_processed": 0,
-        "total_bytes": os.path.getsize(filepath)
+        "total_bytes": os.path.getsize(filepath),
+        "unallocated_bytes": None,
+        "known_skipped": 0,
+        "evidence_path": filepath
     })
+    carving_hits["recent"].clear()
     
     output_dir = app.config['CARVED_FOLDER']
     file_counter = 0
     seen_hashes = set()
-    MIN_FILE_SIZE = 128  # Minimum file size to consider valid
+    carved_files_db.clear()
 
     # Enhanced directory clearing with better error handling
     try:
@@ -3631,65 +6456,208 @@ def simple_file_carver(filepath, selected_types):
                     shutil.rmtree(item_path)
             except Exception as e:
                 print(f"Warning: Could not remove {item_path}: {e}")
+        # a leftover container index must not outlive the clear step
+        discard_carve_container_index(output_dir)
     except Exception as e:
         error_msg = f"Permission Error: Could not clear old results in {output_dir}. Details: {e}"
         carving_status.update({"error": error_msg, "complete": True})
         return
 
-    # Filter signatures based on selection
-    signatures_to_find = {}
-    for category, types in FILE_SIGNATURES.items():
-        for name, sig in types.items():
-            if name in selected_types:
-                signatures_to_find[name] = sig
+    # Compile every selected header into one matcher so the image is read only once
+    matcher = build_signature_matcher(selected_types)
+    extents = None
+    if matcher and scope == 'unallocated':
+        deleted_scan_status.setdefault('scan_methods', {})['unallocated_space'] = 0
+        try:
+            extents = get_unallocated_extents(filepath)
+        except Exception as e:
+            print(f"Unallocated scope unavailable: {e}")
+        if extents is None:
+            print("No filesystem found for the unallocated scope, carving the whole image.")
+        else:
+            carving_status['unallocated_bytes'] = sum(end - start for start, end in extents)
+
+    index = open_signature_index(filepath, matcher, create=extents is None) if matcher and not alignment else None
+    if index is not None and not signature_index_covers(index, matcher):
+        close_signature_index(index)
+        index = None
+    dedupe = open_dedupe_store() if matcher else None
+    known = open_known_file_set() if matcher and known_files_enabled(known_files) else None
+    nested_spool = None
+    records = open_record_writer('carved') if matcher else None
+    container = None
+    if matcher and (output_mode or app.config.get('CARVE_OUTPUT_MODE', CARVE_OUTPUT_MODE)) == 'container':
+        try:
+            container = open_carve_container(output_dir)
+        except Exception as e:
+            print(f"Container output unavailable, writing one file per artifact: {e}")
 
     try:
         file_size = os.path.getsize(filepath)
         with open(filepath, 'rb') as f:
             with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-                for name, sig in signatures_to_find.items():
-                    headers = sig.get('headers', [])
-                    if sig.get('header') and sig['header'] not in headers:
-                        headers.append(sig['header'])
-                    
-                    for header in headers:
-                        if not header:
-                            continue
-                            
-                        current_pos = 0
-                        while current_pos < file_size:
-                            found_pos = mm.find(header, current_pos)
-                            if found_pos == -1:
-                                break
-                            
-                            # Extract file data
-                            file_data = extract_file_data(mm, found_pos, sig, file_size)
-                            
-                            # STRICT VALIDATION: Skip empty files and files below minimum size
-                            if not file_data or len(file_data) < MIN_FILE_SIZE:
-                                current_pos = found_pos + 1
-                                continue
-                            
-                            # STRICT DEDUPLICATION: Calculate content hash
-                            content_hash = hashlib.md5(file_data).hexdigest()
-                            if content_hash in seen_hashes:
-                                current_pos = found_pos + 1
-                                continue
-                            seen_hashes.add(content_hash)
-                            
-                            file_counter += 1
-                            
-                            # Save file with metadata
-                            if save_carved_file(file_data, found_pos, name, sig, file_counter, output_dir):
-                                # Update status
-                                update_carving_status(file_counter, found_pos, file_data, file_size, name)
-                            
-                            current_pos = found_pos + 1
-                            
+
+                budget = carve_memory_budget(memory_ceiling)
+                stream_chunk = budget['stream_chunk']
+
+                if recursion_depth is None:
+                    recursion_depth = app.config.get('CARVE_RECURSION_DEPTH', CARVE_RECURSION_DEPTH)
+                recursion_bytes = app.config.get('CARVE_RECURSION_MAX_BYTES', CARVE_RECURSION_MAX_BYTES)
+                # a container is read into memory whole, so it has to fit the job's validation budget
+                container_bytes = min(recursion_bytes, budget['full_validation'])
+                nested_jobs = []
+                nested_pool = None
+
+                def queue_nested(found_pos, sig, length):
+                    nonlocal nested_spool
+                    if nested_spool is None:
+                        nested_spool = tempfile.mkdtemp(prefix='nested_carve_')
+                    args = (filepath, found_pos, length, sig['name'], list(selected_types), recursion_depth, recursion_bytes,
+                            app.config.get('CARVE_FULL_DECODE', CARVE_FULL_DECODE), nested_spool)
+                    nested_jobs.append((found_pos, args, nested_pool.submit(_carve_nested_worker, args) if nested_pool else None))
+
+                def store_nested():
+                    """Saves the files carved inside queued containers, numbered after the scan's."""
+                    nonlocal file_counter
+                    while nested_jobs:
+                        found_pos, args, future = nested_jobs.pop(0)
+                        try:
+                            nested = future.result() if future is not None else _carve_nested_worker(args)
+                        except Exception as e:
+                            print(f"Validation pool lost a nested carve, carving inline: {e}")
+                            nested = _carve_nested_worker(args)
+                        for path, name, spool_path, size, content_hash, confidence, depth in nested:
+                            try:
+                                if content_hash in seen_hashes or dedupe_store_seen(dedupe, content_hash):
+                                    continue
+                                seen_hashes.add(content_hash)
+                                with open(spool_path, 'rb') as spool, mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                                    if known_file_set_contains(known, known_file_set_digests(known, content, content_hash)):
+                                        carving_status['known_skipped'] += 1
+                                        continue
+                                    saved = save_carved_file(None, found_pos, size, name, matcher['signatures'][name], file_counter + 1, output_dir,
+                                                             confidence=confidence, dedupe=dedupe, content_hash=content_hash, container=container,
+                                                             records=records, content=content,
+                                                             provenance={'parent_offset': found_pos, 'nested_path': path, 'depth': depth})
+                                if saved:
+                                    file_counter += 1
+                                    carving_status['files_found'] = file_counter
+                                    record_carving_hit(f"{file_counter}-{found_pos:08X}-{size}-{name}-nested", found_pos)
+                            finally:
+                                try:
+                                    os.remove(spool_path)
+                                except OSError:
+                                    pass
+
+                def store_candidate(found_pos, sig, length, content_hash, confidence=None):
+                    nonlocal file_counter
+                    # STRICT DEDUPLICATION: skip content already carved from another offset, shard or run
+                    if content_hash is not None:
+                        if content_hash in seen_hashes or dedupe_store_seen(dedupe, content_hash):
+                            return
+                        seen_hashes.add(content_hash)
+                        # known-good OS and application files are not evidence worth extracting
+                        if known is not None:
+                            with memoryview(mm)[found_pos:found_pos + length] as content:
+                                hashes = known_file_set_digests(known, content, content_hash)
+                            if known_file_set_contains(known, hashes):
+                                carving_status['known_skipped'] += 1
+                                return
+                    # Save file with metadata; oversized candidates are hashed while streamed out
+                    if save_carved_file(f.fileno(), found_pos, length, sig['name'], sig, file_counter + 1, output_dir,
+                                        mm=mm if content_hash is None else None, seen_hashes=seen_hashes, chunk_size=stream_chunk,
+                                        confidence=confidence, dedupe=dedupe, content_hash=content_hash, container=container,
+                                        records=records, known=known):
+                        file_counter += 1
+                        # Update status
+                        update_carving_status(file_counter, found_pos, length, file_size, sig['name'])
+                        if extents is not None:
+                            deleted_scan_status['scan_methods']['unallocated_space'] += 1
+                        if recursion_depth and sig['name'] in CARVE_RECURSION_TYPES and length <= container_bytes:
+                            queue_nested(found_pos, sig, length)
+
+                scan_from = 0
+                if matcher and parallel:
+                    try:
+                        index_path = index['path'] if index is not None and index['indexed_to'] >= file_size else None
+                        _carve_shards_in_parallel(filepath, selected_types, mm, matcher, file_size, store_candidate, workers, memory_ceiling, index_path, alignment, extents)
+                        scan_from = file_size
+                    except Exception as e:
+                        # e.g. no fork/spawn support under the WSGI host; already stored hashes keep the rescan duplicate-free
+                        print(f"Parallel carving unavailable, falling back to a single process: {e}")
+
+                # The index records more patterns than the selection, so skip only what none of them can be in
+                patterns = index['pattern_ids'] if index is not None else (matcher['by_header'] if matcher else [])
+                overlap = max((len(p) for p in patterns), default=1) - 1
+                skip_values = constant_skip_values(patterns)
+
+                def scan_extents(scan_from):
+                    """Yields candidate extents window by window, advancing the scan progress."""
+                    block_map = None
+                    for window_start in range(scan_from, file_size if matcher else 0, SCAN_WINDOW_SIZE):
+                        window_end = min(window_start + SCAN_WINDOW_SIZE, file_size)
+                        if index is not None and index['indexed_to'] >= window_end:
+                            # The index answers for the whole window in a single query
+                            spans = [(window_start, window_end)]
+                        else:
+                            if block_map is None:
+                                block_map = get_constant_block_map(filepath, mm)
+                            spans = list(iter_scan_spans(block_map, window_start, window_end, overlap, skip_values))
+                            if index is not None:
+                                record_signature_index_window(index, mm, window_start, window_end, spans)
+                                spans = [(window_start, window_end)]
+                        if extents is not None:
+                            spans = clip_spans_to_extents(spans, extents)
+                        for span_start, span_end in spans:
+                            yield from _iter_carve_extents(mm, matcher, span_start, span_end, file_size, index, alignment)
+                        _update_carving_scan_progress(window_end, file_size)
+
+                validation_workers = validation_workers or app.config.get('CARVE_VALIDATION_WORKERS', CARVE_VALIDATION_WORKERS)
+                inline_extents = None
+                if validation_workers > 1 and matcher and scan_from < file_size:
+                    min_candidates = app.config.get('CARVE_VALIDATION_MIN_CANDIDATES', CARVE_VALIDATION_MIN_CANDIDATES)
+                    pending_extents = scan_extents(scan_from)
+                    first_extents = list(itertools.islice(pending_extents, min_candidates))
+                    if len(first_extents) < min_candidates:
+                        # the whole scan yielded too few candidates to be worth a pool
+                        inline_extents = first_extents
+                    else:
+                        try:
+                            depth = queue_depth or app.config.get('CARVE_VALIDATION_QUEUE_DEPTH', CARVE_VALIDATION_QUEUE_DEPTH)
+                            with ProcessPoolExecutor(max_workers=validation_workers, initializer=_init_validation_worker, initargs=(filepath,)) as executor:
+                                # containers are carved again by the same pool while the scan goes on
+                                nested_pool = executor
+                                for candidate in iter_pipelined_candidates(executor, itertools.chain(first_extents, pending_extents), depth,
+                                                                           memory_ceiling, validation_workers):
+                                    store_candidate(*candidate)
+                                store_nested()
+                            nested_pool = None
+                            scan_from = file_size
+                        except Exception as e:
+                            # Already stored hashes keep the inline rescan duplicate-free
+                            print(f"Validation pool unavailable, validating inline: {e}")
+                            nested_pool = None
+
+                for file_start, sig, end_pos, method in inline_extents if inline_extents is not None else scan_extents(scan_from):
+                    sig, valid, content_hash, confidence = validate_classified_extent(mm, file_start, end_pos, sig, seen_hashes, memory_ceiling, method)
+                    if valid:
+                        store_candidate(file_start, sig, end_pos - file_start, content_hash, confidence)
+                store_nested()
+
     except Exception as e:
         carving_status["error"] = f"Carving process error: {e}"
         print(f"Error during carving: {e}")
     finally:
+       close_signature_index(index)
+       close_dedupe_store(dedupe)
+       close_known_file_set(known)
+       close_record_writer(records)
+       if nested_spool is not None:
+           shutil.rmtree(nested_spool, ignore_errors=True)
+       try:
+           close_carve_container(container)
+       except Exception as e:
+           print(f"Error closing carve container: {e}")
        carving_status.update({
             "progress": 100, 
             "complete": True,
@@ -3699,66 +6667,273 @@ def simple_file_carver(filepath, selected_types):
         })
     print(f"Carving complete. Found {carving_status['files_found']} valid, non-duplicate files.")
        
-def extract_file_data(mm, found_pos, sig, file_size):
-    """Extract file data based on signature rules with strict validation."""
-    footer = sig.get('footer')
-    max_size = sig.get('max_size', 10 * 1024 * 1024)
-    
-    if footer:
-        search_limit = min(found_pos + sig.get('max_size', 50 * 1024 * 1024), file_size)
-        end_pos = mm.find(footer, found_pos + len(sig.get('header', b'')), search_limit)
-        if end_pos != -1:
-            file_data = mm[found_pos: end_pos + len(footer)]
-            # Validate file size and content
-            if len(file_data) >= 128:  # Minimum valid file size
-                return file_data
-    else:
-        file_data = mm[found_pos: min(found_pos + max_size, file_size)]
-        if len(file_data) >= 128:  # Minimum valid file size
-            return file_data
-    
-    return b''
-
 def extract_file_data(mm, found_pos, sig, file_size):
     """Extract file data based on signature rules."""
-    footer = sig.get('footer')
-    max_size = sig.get('max_size', 10 * 1024 * 1024)
-    
-    if footer:
-        search_limit = min(found_pos + sig.get('max_size', 50 * 1024 * 1024), file_size)
-        end_pos = mm.find(footer, found_pos + len(sig.get('header', b'')), search_limit)
-        if end_pos != -1:
-            return mm[found_pos: end_pos + len(footer)]
+    length = resolve_carve_length(mm, found_pos, sig, file_size)
+    return mm[found_pos: found_pos + length] if length else b''
+
+# --- Carve Output Containers ---
+# 'files' writes one file per carved artifact; 'container' appends them to tar segments.
+CARVE_OUTPUT_MODES = ('files', 'container')
+CARVE_OUTPUT_MODE = 'files'
+# A new tar segment is started once the current one would grow past this size.
+CARVE_CONTAINER_SEGMENT_SIZE = 4 * 1024 * 1024 * 1024
+# Offset index of the members of every segment, kept next to them in the output folder.
+CARVE_CONTAINER_INDEX = 'carved_index.sqlite'
+CARVE_CONTAINER_FLUSH_ROWS = 256
+
+def open_carve_container(output_dir, segment_size=None):
+    """Starts a container output in `output_dir`; returns the container state dict.
+
+    Members are appended to carved-NNNN.tar segments and their data offsets are
+    recorded in the CARVE_CONTAINER_INDEX SQLite table, so a member is read with a
+    single seek instead of a directory lookup.
+    """
+    conn = sqlite3.connect(os.path.join(output_dir, CARVE_CONTAINER_INDEX), check_same_thread=False)
+    conn.execute('''CREATE TABLE IF NOT EXISTS members (
+        name TEXT PRIMARY KEY, id INTEGER, segment TEXT, data_offset INTEGER, size INTEGER,
+        evidence_offset INTEGER, signature TEXT, confidence INTEGER)''')
+    conn.execute('CREATE INDEX IF NOT EXISTS members_by_id ON members(id)')
+    conn.commit()
+    return {
+        'dir': output_dir, 'conn': conn, 'pending': [], 'fd': None, 'segment': None, 'segment_count': 0,
+        'segment_size': segment_size or app.config.get('CARVE_CONTAINER_SEGMENT_SIZE', CARVE_CONTAINER_SEGMENT_SIZE),
+    }
+
+def discard_carve_container_index(output_dir):
+    """Removes the offset index of an earlier container carve from `output_dir`.
+
+    Its members would otherwise shadow the loose files of a later 'files' carve
+    (see find_carved_member). Raises OSError when the index cannot be removed.
+    """
+    try:
+        os.remove(os.path.join(output_dir, CARVE_CONTAINER_INDEX))
+    except FileNotFoundError:
+        pass
+
+def _finish_carve_segment(container):
+    """Terminates the open tar segment and records it like any other carved artifact."""
+    if container['fd'] is None:
+        return
+    os.write(container['fd'], b'\x00' * (2 * tarfile.BLOCKSIZE))  # end-of-archive marker
+    os.close(container['fd'])
+    container['fd'] = None
+    path = os.path.join(container['dir'], container['segment'])
+    try:
+        sess_id = session.get('analysis_session_id')
+    except Exception:
+        sess_id = None
+    try:
+        add_file_record(container['segment'], 'carved', path, os.path.getsize(path), session_id=sess_id, extra={'container': True})
+    except Exception:
+        pass
+
+def append_carved_member(container, filename, size_bytes, write_data):
+    """Appends a tar member of `size_bytes` whose data `write_data(fd)` writes at the current position.
+
+    `write_data` returns the number of bytes written. Returns (member_start,
+    data_offset) within the current segment; a short write is rolled back.
+    """
+    if container['fd'] is not None:
+        used = os.lseek(container['fd'], 0, os.SEEK_CUR)
+        if used and used + size_bytes > container['segment_size']:
+            _finish_carve_segment(container)
+    if container['fd'] is None:
+        container['segment_count'] += 1
+        container['segment'] = f"carved-{container['segment_count']:04d}.tar"
+        container['fd'] = os.open(os.path.join(container['dir'], container['segment']), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    fd = container['fd']
+    info = tarfile.TarInfo(filename)
+    info.size, info.mtime, info.mode = size_bytes, int(time.time()), 0o644
+    header = info.tobuf(format=tarfile.PAX_FORMAT)  # PAX records sizes beyond 8 GiB
+    member_start = os.lseek(fd, 0, os.SEEK_CUR)
+    written = 0
+    while written < len(header):
+        written += os.write(fd, header[written:])
+    if write_data(fd) != size_bytes:
+        discard_carved_member(container, member_start)
+        raise IOError(f"short write of {filename}")
+    os.write(fd, b'\x00' * (-size_bytes % tarfile.BLOCKSIZE))
+    return member_start, member_start + len(header)
+
+def discard_carved_member(container, member_start):
+    """Cuts the current segment back to `member_start`, dropping the last member."""
+    os.ftruncate(container['fd'], member_start)
+    os.lseek(container['fd'], member_start, os.SEEK_SET)
+
+def record_carved_member(container, filename, file_id, data_offset, size_bytes, evidence_offset, signature, confidence):
+    """Adds a member to the offset index; rows are written in batches."""
+    container['pending'].append((filename, file_id, container['segment'], data_offset, size_bytes, evidence_offset, signature, confidence))
+    if len(container['pending']) >= CARVE_CONTAINER_FLUSH_ROWS:
+        _flush_carve_container(container)
+
+def _flush_carve_container(container):
+    if container['pending']:
+        with container['conn']:
+            container['conn'].executemany('INSERT OR REPLACE INTO members VALUES (?,?,?,?,?,?,?,?)', container['pending'])
+        container['pending'].clear()
+
+def close_carve_container(container):
+    """Flushes the offset index and terminates the last segment."""
+    if container is None:
+        return
+    try:
+        _flush_carve_container(container)
+        _finish_carve_segment(container)
+    finally:
+        container['conn'].close()
+
+def find_carved_member(filename):
+    """Returns (segment path, data offset, size) of a carved file held in a container, or None."""
+    carved_dir = app.config['CARVED_FOLDER']
+    index_path = os.path.join(carved_dir, CARVE_CONTAINER_INDEX)
+    if not os.path.exists(index_path):
+        return None
+    conn = sqlite3.connect(index_path)
+    try:
+        row = conn.execute('SELECT segment, data_offset, size FROM members WHERE name=?', (filename,)).fetchone()
+    except sqlite3.Error:
+        row = None
+    finally:
+        conn.close()
+    return (os.path.join(carved_dir, row[0]), row[1], row[2]) if row else None
+
+def carved_file_exists(filename):
+    return find_carved_member(filename) is not None or os.path.isfile(os.path.join(app.config['CARVED_FOLDER'], filename))
+
+def iter_carved_file(filename, limit=None, chunk_size=CARVE_COPY_CHUNK_SIZE):
+    """Yields the content of a carved file, from its container member or its own file."""
+    member = find_carved_member(filename)
+    if member is not None:
+        path, offset, size = member
     else:
-        return mm[found_pos: min(found_pos + max_size, file_size)]
-    
-    return b''
+        path, offset = os.path.join(app.config['CARVED_FOLDER'], filename), 0
+        size = os.path.getsize(path)
+    remaining = size if limit is None else min(size, limit)
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
 
-def save_carved_file(file_data, found_pos, name, sig, file_counter, output_dir):
-    """Save carved file with proper naming convention."""
+def read_carved_file(filename, limit=None):
+    """Returns the content (or its first `limit` bytes) of a carved file."""
+    return b''.join(iter_carved_file(filename, limit))
+
+def list_carved_members(limit, offset):
+    """Returns (total, [file_info]) of container members in id order, or None without a container."""
+    index_path = os.path.join(app.config['CARVED_FOLDER'], CARVE_CONTAINER_INDEX)
+    if not os.path.exists(index_path):
+        return None
+    conn = sqlite3.connect(index_path)
+    try:
+        total = conn.execute('SELECT COUNT(*) FROM members').fetchone()[0]
+        rows = conn.execute('SELECT id, name, evidence_offset, size, confidence FROM members ORDER BY id LIMIT ? OFFSET ?',
+                            (limit, offset)).fetchall()
+    finally:
+        conn.close()
+    return total, [{"id": file_id, "name": name, "offset": f"0x{evidence_offset:08X}", "size_bytes": size,
+                    "confidence": confidence} for file_id, name, evidence_offset, size, confidence in rows]
+
+def save_carved_file(src_fd, found_pos, size_bytes, name, sig, file_counter, output_dir, mm=None, seen_hashes=None, chunk_size=CARVE_COPY_CHUNK_SIZE,
+                     confidence=None, dedupe=None, content_hash=None, container=None, records=None, content=None, provenance=None,
+                     known=None):
+    """Save carved file with proper naming convention.
+
+    The bytes are copied straight from the evidence descriptor `src_fd` (see
+    copy_evidence_range), so the carved region is never held in memory. When the
+    mapping `mm` is given the file is instead streamed out of it in `chunk_size`
+    pieces while its hash is computed; if that hash is already in `seen_hashes`
+    the file is removed again and False is returned, as it is when the persistent
+    `dedupe` store or the `known` file set (see open_known_file_set) holds it. The saved file is listed in carved_files_db
+    with its validation `confidence` and its `content_hash` recorded in `dedupe`.
+    With a `container` (see open_carve_container) the file becomes a member of its
+    current tar segment instead of a file of its own. Its files row is buffered in
+    `records` (see open_record_writer) when given.
+
+    Files carved out of a container's decompressed stream pass their bytes as
+    `content`; `found_pos` is then the container's evidence offset and
+    `provenance` (path inside the container, depth) is kept with the record.
+    """
     try:
         offset_hex = f"{found_pos:08X}"
-        size_bytes = len(file_data)
         safe_name = name.lower().replace(' ', '_').replace('/', '_')
         extension = sig.get('extension', '.bin')
-        filename = f"{file_counter}-{offset_hex}-{size_bytes}-{safe_name}{extension}"
-        
-        # Prefer the configured Carved Files folder unless an explicit output_dir within Carved Files is provided
-        carved_root = app.config.get('CARVED_FOLDER', CARVED_FOLDER)
-        os.makedirs(carved_root, exist_ok=True)
-        if output_dir and os.path.commonpath([os.path.abspath(output_dir), os.path.abspath(carved_root)]) == os.path.abspath(carved_root):
-            save_path = os.path.join(output_dir, filename)
+        nested = '_nested' if provenance else ''
+        filename = f"{file_counter}-{offset_hex}-{size_bytes}-{safe_name}{nested}{extension}"
+        hasher = hashlib.md5() if mm is not None else None
+        # the other digests the known-file set holds are computed in the same pass
+        known_hashers = {algorithm: hashlib.new(algorithm) for algorithm in (known or ()) if algorithm != 'md5'} if hasher else {}
+
+        def write_data(fd):
+            if content is not None:
+                with memoryview(content) as view:
+                    written = 0
+                    while written < len(view):
+                        written += os.write(fd, view[written:])
+                return written
+            if hasher is not None:
+                return stream_evidence_range(mm, fd, found_pos, size_bytes, [hasher, *known_hashers.values()], chunk_size)
+            return copy_evidence_range(src_fd, fd, found_pos, size_bytes)
+
+        if container is not None:
+            member_start, data_offset = append_carved_member(container, filename, size_bytes, write_data)
+            save_path = os.path.join(container['dir'], container['segment'])
         else:
-            save_path = os.path.join(carved_root, filename)
-        with open(save_path, 'wb') as out_file:
-            out_file.write(file_data)
+            # Prefer the configured Carved Files folder unless an explicit output_dir within Carved Files is provided
+            carved_root = app.config.get('CARVED_FOLDER', CARVED_FOLDER)
+            os.makedirs(carved_root, exist_ok=True)
+            if output_dir and os.path.commonpath([os.path.abspath(output_dir), os.path.abspath(carved_root)]) == os.path.abspath(carved_root):
+                save_path = os.path.join(output_dir, filename)
+            else:
+                save_path = os.path.join(carved_root, filename)
+            unshare_artifact(save_path)
+            with open(save_path, 'wb') as out_file:
+                if write_data(out_file.fileno()) != size_bytes:
+                    raise IOError(f"short copy from evidence at offset 0x{offset_hex}")
+        if hasher is not None and seen_hashes is not None:
+            content_hash = hasher.hexdigest()
+            hashes = dict({algorithm: h.hexdigest() for algorithm, h in known_hashers.items()}, md5=content_hash)
+            known_file = content_hash not in seen_hashes and known_file_set_contains(known, hashes)
+            if content_hash in seen_hashes or dedupe_store_seen(dedupe, content_hash) or known_file:
+                if container is not None:
+                    discard_carved_member(container, member_start)
+                else:
+                    os.unlink(save_path)
+                if known_file:
+                    seen_hashes.add(content_hash)
+                    carving_status['known_skipped'] = carving_status.get('known_skipped', 0) + 1
+                return False
+            seen_hashes.add(content_hash)
+        if content_hash is not None:
+            dedupe_store_record(dedupe, content_hash, save_path)
+        carved_files_db[filename] = {
+            "id": file_counter, "name": filename, "offset": f"0x{offset_hex}",
+            "size_kb": f"{size_bytes/1024:.2f} KB", "confidence": confidence,
+            "validation": "decoded" if confidence == CONFIDENCE_DECODED else "cascade"
+        }
+        if provenance:
+            carved_files_db[filename].update(provenance)
+        if container is not None:
+            # the segment is recorded as a whole once it is complete
+            record_carved_member(container, filename, file_counter, data_offset, size_bytes, found_pos, name, confidence)
+            return True
         # record carved file in DB under current session
+        extra = {'offset': found_pos, 'signature': name, 'confidence': confidence}
+        if provenance:
+            extra.update(provenance)
+        if records is not None:
+            queue_file_record(records, filename, save_path, size_bytes, extra=extra)
+            return True
         try:
             sess_id = session.get('analysis_session_id')
         except Exception:
             sess_id = None
         try:
-            add_file_record(filename, 'carved', save_path, len(file_data), session_id=sess_id, extra={'offset': found_pos, 'signature': name})
+            add_file_record(filename, 'carved', save_path, size_bytes, session_id=sess_id, extra=extra)
         except Exception:
             pass
         return True
@@ -3766,28 +6941,22 @@ def save_carved_file(file_data, found_pos, name, sig, file_counter, output_dir):
         print(f"Error saving file {filename}: {e}")
         return False
 
-def update_carving_status(file_counter, found_pos, file_data, file_size, name):
-    """Update the global carving status."""
+def update_carving_status(file_counter, found_pos, size_bytes, file_size, name):
+    """Update the global carving status; hex previews are rendered on request (see carving_preview)."""
     # global carving_status
     offset_hex = f"{found_pos:08X}"
     
-    file_info = {
-        "name": f"{file_counter}-{offset_hex}-{len(file_data)}-{name}",
-        "offset": f"0x{offset_hex}",
-        "hex_preview": format_hex_view(file_data[:256])
-    }
-    
     # Update basic counters
     carving_status.update({
         "files_found": file_counter,
         "current_offset": f"0x{offset_hex}",
         "progress": int((found_pos / file_size) * 100) if file_size > 0 else 0
     })
-    carving_status["found_files_list"].append(file_info)
+    record_carving_hit(f"{file_counter}-{offset_hex}-{size_bytes}-{name}", found_pos)
 
     # Update bytes processed (use found_pos + file size as an approximation)
     try:
-        processed = found_pos + len(file_data)
+        processed = found_pos + size_bytes
         # keep the maximum processed value to avoid regressions
         carving_status['bytes_processed'] = max(carving_status.get('bytes_processed', 0), processed)
     except Exception:
@@ -3906,6 +7075,7 @@ def recover_deleted_files_engine(filepath):
     - Two-step deduplication (quick head/tail signature + full SHA256) to avoid duplicates.
     - Skips empty/small files and provides periodic status updates via deleted_scan_status.
     - Writes to a temporary file and atomically moves to final filename when complete.
+    - Drops files whose digests are in the imported known-file hash set (see open_known_file_set).
     """
     global deleted_scan_status, deleted_files_db
 
@@ -3940,6 +7110,7 @@ def recover_deleted_files_engine(filepath):
             "empty_rejected": 0,
             "duplicate_rejected": 0,
             "invalid_rejected": 0,
+            "known_rejected": 0,
             "valid_recovered": 0
         }
     })
@@ -3969,6 +7140,12 @@ def recover_deleted_files_engine(filepath):
         deleted_scan_status.update({"message": f"Error clearing old files: {e}", "in_progress": False})
         return {}
 
+    # Content recovered by earlier runs or from other images; opened only once nothing
+    # returns early any more, as they are closed at the end of the run
+    dedupe = open_dedupe_store()
+    known = open_known_file_set() if known_files_enabled() else None
+    records = open_record_writer('deleted_recovered')
+
     total_recovered = 0
 
     def update_status(method, count=1):
@@ -4011,10 +7188,11 @@ def recover_deleted_files_engine(filepath):
             return None, b'', b''
 
     def _compute_full_hash_and_write(fs_file, size, tmp_path):
-        """Stream file out to tmp_path while computing SHA256.
-        Returns sha256 hex digest and final size written.
+        """Stream file out to tmp_path while computing SHA256, MD5 (the dedupe store key) and the known-file set's digests.
+        Returns {algorithm: hex digest} and final size written.
         """
-        sha = hashlib.sha256()
+        hashers = {'sha256': hashlib.sha256(), 'md5': hashlib.md5()}
+        hashers.update((algorithm, hashlib.new(algorithm)) for algorithm in (known or {}) if algorithm not in hashers)
         written = 0
         try:
             offset = 0
@@ -4024,13 +7202,14 @@ def recover_deleted_files_engine(filepath):
                 if not chunk:
                     break
                 tmp_path.write(chunk)
-                sha.update(chunk)
+                for hasher in hashers.values():
+                    hasher.update(chunk)
                 written += len(chunk)
                 offset += len(chunk)
             tmp_path.flush()
-            return sha.hexdigest(), written
+            return {algorithm: hasher.hexdigest() for algorithm, hasher in hashers.items()}, written
         except Exception:
-            return None, written
+            return {}, written
 
     def process_deleted_file(fs_object, recovery_method, fs_offset=0):
         # nonlocal total_recovered
@@ -4079,7 +7258,8 @@ def recover_deleted_files_engine(filepath):
             try:
                 tmp_fd = tempfile.NamedTemporaryFile(delete=False, dir=recovery_dir)
                 tmp_file = tmp_fd
-                sha_hex, written = _compute_full_hash_and_write(fs_object, size, tmp_file)
+                digests, written = _compute_full_hash_and_write(fs_object, size, tmp_file)
+                sha_hex = digests.get('sha256')
                 tmp_file.close()
 
                 if not sha_hex or written == 0:
@@ -4098,8 +7278,8 @@ def recover_deleted_files_engine(filepath):
                         pass
                     return
 
-                # Full dedupe
-                if sha_hex in seen_full:
+                # Full dedupe, against this run and everything recovered before
+                if sha_hex in seen_full or dedupe_store_seen(dedupe, digests.get('md5')):
                     # duplicate content, drop tmp
                     try:
                         os.unlink(tmp_fd.name)
@@ -4113,6 +7293,21 @@ def recover_deleted_files_engine(filepath):
                         pass
                     return
 
+                # Known-good OS and application files are dropped before they are recovered
+                if known_file_set_contains(known, digests):
+                    try:
+                        os.unlink(tmp_fd.name)
+                    except Exception:
+                        pass
+                    seen_full.add(sha_hex)
+                    seen_quick.add(quick_key)
+                    try:
+                        deleted_scan_status.setdefault('validation_stats', {})
+                        deleted_scan_status['validation_stats']['known_rejected'] = deleted_scan_status['validation_stats'].get('known_rejected', 0) + 1
+                    except Exception:
+                        pass
+                    return
+
                 # Unique, move to final path atomically
                 seen_full.add(sha_hex)
                 seen_quick.add(quick_key)
@@ -4224,13 +7419,10 @@ def recover_deleted_files_engine(filepath):
                     'fs_offset': fs_offset
                 }
                 deleted_files_db[os.path.basename(final_path)] = file_info
+                dedupe_store_record(dedupe, digests['md5'], final_path)
                 # add DB record for recovered deleted file
                 try:
-                    sess_id = session.get('analysis_session_id')
-                except Exception:
-                    sess_id = None
-                try:
-                    add_file_record(os.path.basename(final_path), 'deleted_recovered', final_path, os.path.getsize(final_path), session_id=sess_id, extra={'inode': inode_str})
+                    queue_file_record(records, os.path.basename(final_path), final_path, os.path.getsize(final_path), extra={'inode': inode_str, 'sha256': sha_hex})
                 except Exception:
                     pass
                 # Update aggregated status (update_status will increment valid_recovered)
@@ -4320,15 +7512,17 @@ def recover_deleted_files_engine(filepath):
                                 
                                 if slack_content and len(slack_content) >= MIN_FILE_SIZE:
                                     content_hash = hashlib.md5(slack_content).hexdigest()
-                                    if content_hash not in seen_hashes:
+                                    if content_hash not in seen_hashes and not dedupe_store_seen(dedupe, content_hash):
                                         seen_hashes.add(content_hash)
                                         
                                         original_name = f.info.name.name.decode('utf-8', 'ignore') if hasattr(f.info, 'name') else f"file_{f.info.meta.addr}"
                                         safe_filename = secure_filename(f"slack_{f.info.meta.addr}_{original_name}")
                                         save_path = os.path.join(recovery_dir, safe_filename)
                                         
+                                        unshare_artifact(save_path)
                                         with open(save_path, 'wb') as out_file:
                                             out_file.write(slack_content)
+                                        dedupe_store_record(dedupe, content_hash, save_path)
                                         
                                         update_status("file_slack")
                         except Exception:
@@ -4411,6 +7605,9 @@ def recover_deleted_files_engine(filepath):
         deleted_scan_status["message"] = f"A critical error occurred: {e}"
         deleted_scan_status["complete"] = True
         
+    close_dedupe_store(dedupe)
+    close_known_file_set(known)
+    close_record_writer(records)
     deleted_scan_status["in_progress"] = False
     return deleted_files_db  # Return the database of recovered files
     # --- Reporting Helper Functions ---
@@ -6770,12 +9967,17 @@ def api_fs_bulk_delete():
         return jsonify(resp)
 
     # If trash not requested, perform permanent deletion as before
+    store_objects = set()
     for rel in paths:
         try:
             abs_path = os.path.abspath(os.path.join(root_path, rel))
             if not is_path_under_allowed_roots(abs_path) or not os.path.exists(abs_path):
                 results['failed'].append({'path': rel, 'reason': 'not_found_or_access_denied'})
                 continue
+            try:
+                store_objects |= artifact_store_objects([abs_path])
+            except Exception:
+                pass
             if os.path.isdir(abs_path):
                 shutil.rmtree(abs_path)
             else:
@@ -6783,6 +9985,10 @@ def api_fs_bulk_delete():
             results['deleted'].append(rel)
         except Exception as e:
             results['failed'].append({'path': rel, 'reason': str(e)})
+    try:
+        prune_artifact_store(store_objects)
+    except Exception:
+        pass
     # Single audit entry
     try:
         audit_event('bulk_delete', root_path, {'requested': paths, 'results': results})
@@ -7316,7 +10522,8 @@ def api_fs_load_to_upload():
         counter += 1
 
     try:
-        shutil.copy2(candidate, dest_path)
+        # a link to the artifact, copied only when the upload folder is on another filesystem
+        link_artifact(candidate, dest_path)
     except Exception as e:
         print('ERROR load_to_upload copy failed:', repr(e))
         return jsonify({'error': f'Copy failed: {e}'}), 500
@@ -8954,7 +12161,69 @@ AUTO_CARVING_SETUP_CONTENT = """
         <div class="card p-6 rounded-lg sticky top-8">
             <h3 class="text-lg font-semibold text-white mb-4">Begin Carving</h3>
             <p class="text-gray-400 text-sm mb-4">Once you have selected the desired file types, start the carving process.</p>
+            <div class="flex items-center mb-4">
+                <input type="checkbox" name="parallel_carving" id="parallel_carving" class="h-4 w-4 rounded bg-gray-700 border-gray-600 text-blue-600 focus:ring-blue-500">
+                <label for="parallel_carving" class="ml-3 text-white text-sm cursor-pointer">Parallel carving (use all CPU cores)</label>
+            </div>
+            <div class="mb-4">
+                <label for="carving_alignment" class="block text-white text-sm mb-1">Header positions</label>
+                <select name="carving_alignment" id="carving_alignment" class="w-full bg-gray-800 border-gray-600 rounded-md p-2 text-white text-sm">
+                    <option value="">Every byte offset (thorough)</option>
+                    <option value="512">512-byte sector boundaries (fast triage)</option>
+                    <option value="4096">4096-byte cluster boundaries (fastest triage)</option>
+                </select>
+            </div>
+            <div class="mb-4">
+                <label for="carving_scope" class="block text-white text-sm mb-1">Carving scope</label>
+                <select name="carving_scope" id="carving_scope" class="w-full bg-gray-800 border-gray-600 rounded-md p-2 text-white text-sm">
+                    <option value="">Entire image</option>
+                    <option value="unallocated">Unallocated space only</option>
+                </select>
+            </div>
+            <div class="mb-4">
+                <label for="carving_output" class="block text-white text-sm mb-1">Output</label>
+                <select name="carving_output" id="carving_output" class="w-full bg-gray-800 border-gray-600 rounded-md p-2 text-white text-sm">
+                    <option value="">One file per artifact</option>
+                    <option value="container">Tar containers with offset index</option>
+                </select>
+            </div>
+            <div class="mb-4">
+                <label for="carving_recursion" class="block text-white text-sm mb-1">Inside carved ZIP / Office / GZIP files</label>
+                <select name="carving_recursion" id="carving_recursion" class="w-full bg-gray-800 border-gray-600 rounded-md p-2 text-white text-sm">
+                    <option value="">Do not look inside</option>
+                    <option value="1">Carve their contents</option>
+                    <option value="2">Carve contents, 2 levels deep</option>
+                    <option value="3">Carve contents, 3 levels deep</option>
+                </select>
+            </div>
+            <div class="flex items-center mb-4">
+                <input type="checkbox" name="skip_known_files" id="skip_known_files" {% if known_filter %}checked{% endif %} class="h-4 w-4 rounded bg-gray-700 border-gray-600 text-blue-600 focus:ring-blue-500">
+                <label for="skip_known_files" class="ml-3 text-white text-sm cursor-pointer">Skip known files (<span id="known-count">{{ known_count }}</span> hashes)</label>
+            </div>
             <button type="submit" class="btn-green w-full py-3 rounded-lg font-semibold">Start Auto Carving</button>
+            <div class="mt-6 pt-4 border-t border-gray-700">
+                <h3 class="text-lg font-semibold text-white mb-2">Quick Estimate</h3>
+                <p class="text-gray-400 text-sm mb-4">Carve a random sample of the image to project the hits and duration of a full run.</p>
+                <div class="flex space-x-2 mb-4">
+                    <select name="sample_fraction" id="sample_fraction" class="flex-1 bg-gray-800 border-gray-600 rounded-md p-2 text-white text-sm">
+                        <option value="0.001">Sample 0.1%</option>
+                        <option value="0.01" selected>Sample 1%</option>
+                        <option value="0.05">Sample 5%</option>
+                    </select>
+                    <button type="button" id="estimate-btn" class="btn-secondary px-4 py-2 rounded-lg text-sm">Estimate</button>
+                </div>
+                <div id="estimate-result" class="text-sm text-gray-300"></div>
+            </div>
+            <div class="mt-6 pt-4 border-t border-gray-700">
+                <h3 class="text-lg font-semibold text-white mb-2">Known-File Hash Set</h3>
+                <p class="text-gray-400 text-sm mb-4">Import an NSRL RDS text/CSV file or a hash list; matching OS and application files are not extracted.</p>
+                <input type="file" id="hash_set" class="w-full text-sm text-gray-300 mb-2">
+                <div class="flex space-x-2 mb-4">
+                    <input type="text" id="hash_set_path" placeholder="or a path on the server" class="flex-1 bg-gray-800 border-gray-600 rounded-md p-2 text-white text-sm">
+                    <button type="button" id="known-import-btn" class="btn-secondary px-4 py-2 rounded-lg text-sm">Import</button>
+                </div>
+                <div id="known-result" class="text-sm text-gray-300"></div>
+            </div>
         </div>
     </div>
 </div>
@@ -8982,6 +12251,66 @@ document.addEventListener('DOMContentLoaded', function() {
         updateCounter();
     });
 
+    document.getElementById('estimate-btn').addEventListener('click', (event) => {
+        const result = document.getElementById('estimate-result');
+        result.textContent = 'Sampling...';
+        fetch('{{ url_for("estimate_auto_carving") }}', { method: 'POST', body: new FormData(event.target.form) })
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) {
+                    result.innerHTML = `<p class="text-red-400">${data.error}</p>`;
+                    return;
+                }
+                const sampled = (data.sampled_fraction * 100).toFixed(2);
+                let rows = '';
+                Object.entries(data.hits).forEach(([name, hit]) => {
+                    rows += `<tr><td class="pr-4">${name}</td><td class="pr-4">${hit.sampled}</td><td>~${hit.projected}</td></tr>`;
+                });
+                result.innerHTML = `<p class="mb-2">Sampled ${sampled}% (${data.sampled_blocks} blocks) in ${data.elapsed_time}${data.partial ? ' (time limit reached)' : ''}.</p>`
+                    + `<table class="w-full mb-2"><tr class="text-gray-400"><th class="text-left">Type</th><th class="text-left">Sample</th><th class="text-left">Projected</th></tr>${rows}</table>`
+                    + `<p>Projected hits: ~${data.projected_total} | Estimated full run: ${data.estimated_total_time}</p>`;
+            })
+            .catch(err => {
+                result.innerHTML = `<p class="text-red-400">Estimate failed: ${err}</p>`;
+            });
+    });
+
+    document.getElementById('known-import-btn').addEventListener('click', () => {
+        const result = document.getElementById('known-result');
+        const data = new FormData();
+        const upload = document.getElementById('hash_set').files[0];
+        if (upload) {
+            data.append('hash_set', upload);
+        }
+        data.append('hash_set_path', document.getElementById('hash_set_path').value);
+        result.textContent = 'Importing...';
+        fetch('{{ url_for("import_known_files") }}', { method: 'POST', body: data })
+            .then(response => response.json())
+            .then(started => {
+                if (started.error) {
+                    result.innerHTML = `<p class="text-red-400">${started.error}</p>`;
+                    return;
+                }
+                const poll = () => fetch('{{ url_for("known_files_import_status") }}')
+                    .then(response => response.json())
+                    .then(status => {
+                        if (status.in_progress) {
+                            result.textContent = `Importing... ${status.rows} rows read`;
+                            setTimeout(poll, 1000);
+                            return;
+                        }
+                        const total = Object.values(status.counts || {}).reduce((a, b) => a + b, 0);
+                        document.getElementById('known-count').textContent = total;
+                        result.innerHTML = status.error ? `<p class="text-red-400">Import failed: ${status.error}</p>`
+                            : `<p>Known-file set: ${Object.entries(status.counts).map(([name, count]) => `${count} ${name.toUpperCase()}`).join(', ')}</p>`;
+                    });
+                poll();
+            })
+            .catch(err => {
+                result.innerHTML = `<p class="text-red-400">Import failed: ${err}</p>`;
+            });
+    });
+
     updateCounter();
 });
 </script>
@@ -9025,8 +12354,33 @@ AUTO_CARVING_PROCESS_CONTENT = """
 </div>
 
 <script>
+let hitsCursor = 0;
+let recentHits = [];
+const hexPreviews = {};
+
+function renderLiveHex() {
+    const liveHexView = document.getElementById('live-hex-view');
+    let fullHexContent = '';
+    recentHits.slice().reverse().forEach(file => {
+        const preview = hexPreviews[file.offset] || 'Loading preview...';
+        fullHexContent += `<p class="text-xs text-green-400">${file.name} @ ${file.offset}</p><pre>${preview}</pre><hr class="border-gray-600 my-2">`;
+    });
+    liveHexView.innerHTML = fullHexContent;
+}
+
+function loadHexPreview(offset) {
+    hexPreviews[offset] = null;
+    fetch('/carving_status/preview?offset=' + encodeURIComponent(offset))
+        .then(response => response.json())
+        .then(data => {
+            hexPreviews[offset] = data.hex_preview || data.error;
+            renderLiveHex();
+        })
+        .catch(err => console.error('Error fetching hex preview:', err));
+}
+
 function updateProgress() {
-    fetch('/carving_status')
+    fetch('/carving_status?since=' + hitsCursor)
         .then(response => response.json())
         .then(data => {
             document.getElementById('progress-bar').style.width = data.progress + '%';
@@ -9037,14 +12391,14 @@ function updateProgress() {
             document.getElementById('total-found-count').innerText = data.files_found;
             // timing placeholders will be handled below with better fallbacks
             
-            const liveHexView = document.getElementById('live-hex-view');
-            const recentFiles = data.found_files_list.slice(-5).reverse();
-            if (recentFiles.length > 0) {
-                let fullHexContent = '';
-                recentFiles.forEach(file => {
-                    fullHexContent += `<p class="text-xs text-green-400">${file.name} @ ${file.offset}</p><pre>${file.hex_preview}</pre><hr class="border-gray-600 my-2">`;
-                });
-                liveHexView.innerHTML = fullHexContent;
+            // Only hits after our cursor are sent; previews are fetched for the ones on screen
+            hitsCursor = data.cursor;
+            if (data.hits.length > 0) {
+                recentHits = recentHits.concat(data.hits).slice(-5);
+                const shown = new Set(recentHits.map(file => file.offset));
+                Object.keys(hexPreviews).forEach(offset => { if (!shown.has(offset)) delete hexPreviews[offset]; });
+                renderLiveHex();
+                recentHits.forEach(file => { if (!(file.offset in hexPreviews)) loadHexPreview(file.offset); });
             }
 
             const errorContainer = document.getElementById('error-container');
@@ -9107,6 +12461,7 @@ RECOVERED_FILES_CONTENT = """
                         <th class="p-2">Filename</th>
                         <th class="p-2">Offset</th>
                         <th class="p-2">Size</th>
+                        <th class="p-2">Confidence</th>
                         <th class="p-2">Actions</th>
                     </tr>
                 </thead>
@@ -9118,10 +12473,12 @@ RECOVERED_FILES_CONTENT = """
                         <td class="p-2 font-mono break-all">{{ file.name }}</td>
                         <td class="p-2 font-mono">{{ file.offset }}</td>
                         <td class="p-2 font-mono">{{ "%.2f KB"|format(file.size_bytes / 1024) if file.size_bytes else 'N/A' }}</td>
+                        <td class="p-2 font-mono" id="confidence-{{ file.id }}">{{ "%d%%"|format(file.confidence) if file.confidence is not none else 'N/A' }}</td>
                         <td class="p-2 flex space-x-2">
                             <a href="{{ url_for('view_carved_file', filename=file.name) }}" target="_blank" class="btn-secondary px-3 py-1 text-xs rounded-lg">View</a>
                             <a href="{{ url_for('hex_view_carved', filename=file.name) }}" target="_blank" class="btn-green px-3 py-1 text-xs rounded-lg">Hex View</a>
                             <a href="{{ url_for('download_carved_file', filename=file.name) }}" class="btn-primary px-3 py-1 text-xs rounded-lg">Download</a>
+                            <button type="button" class="btn-secondary px-3 py-1 text-xs rounded-lg verify-carved-btn" data-url="{{ url_for('verify_carved', filename=file.name) }}" data-target="confidence-{{ file.id }}">Verify</button>
                         </td>
                     </tr>
                 {% endfor %}
@@ -9175,6 +12532,21 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         });
     }
+    // Full decode runs on demand only; the carve itself stops at the cheaper tiers
+    document.querySelectorAll('.verify-carved-btn').forEach(function(button) {
+        button.addEventListener('click', function() {
+            const cell = document.getElementById(button.dataset.target);
+            button.disabled = true;
+            cell.textContent = 'Decoding...';
+            fetch(button.dataset.url, { method: 'POST' })
+                .then(response => response.json())
+                .then(data => {
+                    cell.textContent = data.error ? 'Error' : (data.verified ? data.confidence + '%' : 'Failed (0%)');
+                })
+                .catch(() => { cell.textContent = 'Error'; })
+                .finally(() => { button.disabled = false; });
+        });
+    });
 });
 </script>
 """
@@ -9753,6 +13125,10 @@ ENHANCED_DELETED_STATUS_TEMPLATE = """
                         <span class="text-gray-400">Recycle Bin:</span>
                         <span id="method-recycle" class="text-white font-mono bg-purple-600 px-2 py-1 rounded text-xs">{{ deleted_scan_status.scan_methods.recycle_bin }}</span>
                     </div>
+                    <div class="flex justify-between">
+                        <span class="text-gray-400">Unallocated Space:</span>
+                        <span id="method-unalloc" class="text-white font-mono bg-gray-600 px-2 py-1 rounded text-xs">{{ deleted_scan_status.scan_methods.unallocated_space }}</span>
+                    </div>
                 </div>
             </div>
 
@@ -10056,11 +13432,13 @@ function updateRecoveryProgress() {
                 const methodInodeEl = document.getElementById('method-inode');
                 const methodSlackEl = document.getElementById('method-slack');
                 const methodRecycleEl = document.getElementById('method-recycle');
+                const methodUnallocEl = document.getElementById('method-unalloc');
 
                 if (methodDirEl) methodDirEl.textContent = data.scan_methods.directory_walk || 0;
                 if (methodInodeEl) methodInodeEl.textContent = data.scan_methods.inode_scan || 0;
                 if (methodSlackEl) methodSlackEl.textContent = data.scan_methods.file_slack || 0;
                 if (methodRecycleEl) methodRecycleEl.textContent = data.scan_methods.recycle_bin || 0;
+                if (methodUnallocEl) methodUnallocEl.textContent = data.scan_methods.unallocated_space || 0;
             }
             
             // Update status message
@@ -10737,7 +14115,7 @@ def _clear_all_session_data():
     if not carving_status.get("complete"):
         carving_status = {
             "progress": 0, "current_offset": "0x00000000", "files_found": 0,
-            "complete": False, "found_files_list": [], "time_remaining_str": "N/A"
+            "complete": False, "time_remaining_str": "N/A"
         }
     
     deleted_scan_status = {
@@ -10903,8 +14281,8 @@ def _load_file_into_session(filename, filepath):
             pass
         return None
 
-    encryption_info = detect_encryption(filepath)
-    forensic_results, partition_info = perform_forensic_analysis(filepath)
+    # A known image is answered from the evidence cache, hashes included
+    encryption_info, forensic_results, partition_info, hashes = analyze_evidence(filepath)
 
     try:
         size_mb = f"{os.path.getsize(filepath) / (1024*1024):.2f}"
@@ -10923,10 +14301,13 @@ def _load_file_into_session(filename, filepath):
         },
         "forensic_results": forensic_results,
         "partition_info": partition_info,
-        "hash_info": {},
-        "hashing_complete": False
+        "hash_info": hashes or {},
+        "hashing_complete": bool(hashes)
     }
-    threading.Thread(target=calculate_hashes_threaded, args=(filepath,)).start()
+    if hashes:
+        record_evidence_hashes(filename, hashes)
+    else:
+        threading.Thread(target=calculate_hashes_threaded, args=(filepath,)).start()
     return encryption_info.get('encrypted')
 
 def determine_recovery_method(filename):
@@ -10994,6 +14375,9 @@ def strict_deleted_files_recovery_engine(filepath):
         return
 
     total_recovered = 0
+    # Content recovered by earlier runs or from other images
+    dedupe = open_dedupe_store()
+    records = open_record_writer('deleted_recovered')
     
     def validate_and_save_file(content, original_name, recovery_method, fs_object=None):
         """STRICT validation: Check file size, content, and duplicates before saving."""
@@ -11014,7 +14398,8 @@ def strict_deleted_files_recovery_engine(filepath):
         
         # 3. Calculate content hash for deduplication
         content_hash = hashlib.sha256(content).hexdigest()
-        if content_hash in seen_hashes:
+        dedupe_hash = hashlib.md5(content).hexdigest()  # the dedupe store is keyed by MD5
+        if content_hash in seen_hashes or dedupe_store_seen(dedupe, dedupe_hash):
             deleted_scan_status["validation_stats"]["duplicate_rejected"] += 1
             return False
         
@@ -11085,6 +14470,7 @@ def strict_deleted_files_recovery_engine(filepath):
             
             # Add to seen hashes to prevent duplicates
             seen_hashes.add(content_hash)
+            dedupe_store_record(dedupe, dedupe_hash, save_path)
             # Note: do not increment total_recovered here; update_recovery_status
             # is responsible for incrementing the overall recovered counter to
             # avoid double-counting when that function is called after
@@ -11136,12 +14522,7 @@ def strict_deleted_files_recovery_engine(filepath):
                 }
                 # Persist recovered deleted file in DB/session
                 try:
-                    sess_id = None
-                    try:
-                        sess_id = session.get('analysis_session_id')
-                    except Exception:
-                        sess_id = None
-                    add_file_record(os.path.basename(save_path), 'deleted_recovered', save_path, os.path.getsize(save_path), session_id=sess_id, extra={'recovery_method': recovery_method})
+                    queue_file_record(records, os.path.basename(save_path), save_path, os.path.getsize(save_path), extra={'recovery_method': recovery_method, 'sha256': content_hash})
                 except Exception:
                     pass
             except Exception:
@@ -11349,6 +14730,8 @@ def strict_deleted_files_recovery_engine(filepath):
         deleted_scan_status["message"] = f"A critical error occurred: {e}"
         deleted_scan_status["complete"] = True
         
+    close_dedupe_store(dedupe)
+    close_record_writer(records)
     deleted_scan_status["in_progress"] = False
 
 # --- UPDATE THE ROUTE TO USE STRICT RECOVERY ---
@@ -11432,8 +14815,32 @@ def upload_status_api():
 
 @app.route('/carving_status')
 def carving_status_endpoint():
-    """Get current carving status with timing information."""
-    return jsonify(carving_status)
+    """Get current carving status with timing information.
+
+    Returns the counters plus the recent hits after the `since` cursor; poll again
+    with the returned `cursor` to receive only newer hits.
+    """
+    since = request.args.get('since', 0, type=int)
+    hits, truncated = carving_hits_since(since)
+    status = dict(carving_status)
+    status.pop('evidence_path', None)
+    status.update({"hits": hits, "cursor": carving_hits["seq"], "hits_truncated": truncated})
+    return jsonify(status)
+
+@app.route('/carving_status/preview')
+def carving_preview():
+    """Hex preview of the evidence bytes at a carving hit's `offset`."""
+    try:
+        offset = int(request.args.get('offset', ''), 0)
+    except ValueError:
+        return jsonify({"error": "Invalid offset"}), 400
+    evidence_path = carving_status.get('evidence_path')
+    if not evidence_path or not os.path.isfile(evidence_path) or offset < 0:
+        return jsonify({"error": "No carving evidence available"}), 404
+    with open(evidence_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(256)
+    return jsonify({"offset": f"0x{offset:08X}", "hex_preview": format_hex_view(data, offset)})
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
@@ -11467,6 +14874,7 @@ def upload_file():
         chunk_size = 16 * 1024 * 1024  # 16MB chunks
         total_size = 0
         
+        unshare_artifact(filepath)
         with open(filepath, 'wb') as f:
             while True:
                 chunk = file.stream.read(chunk_size)
@@ -11639,6 +15047,8 @@ def ajax_upload():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
+    digests = None
+    block_map = None
     try:
         filename = secure_filename(file.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
@@ -11673,10 +15083,15 @@ def ajax_upload():
         upload_status["total_bytes"] = total_size
 
         # Save file in chunks and update progress so polling clients see accurate values
-        chunk_size = 4 * 1024 * 1024  # 4MB
+        chunk_size = UPLOAD_CHUNK_SIZE
         bytes_written = 0
+        # The digests are fed as chunks arrive, so the image is never read back for hashing
+        hashing_status.update({"in_progress": True, "progress": 0, "complete": False, "hashes": {}, "block_hash_map": None, "error": None})
+        block_map = open_block_hash_map(block_hash_map_path(filepath)) if block_hash_map_enabled() else None
+        digests = open_digest_pipeline(consumers=block_hash_map_consumers(block_map))
 
         # Save file in chunks and optionally persist bytes in DB chunks
+        unshare_artifact(filepath)
         with open(filepath, 'wb') as out_f:
             chunk_index = 0
             while True:
@@ -11684,7 +15099,10 @@ def ajax_upload():
                 if not chunk:
                     break
                 out_f.write(chunk)
+                feed_digest_pipeline(digests, chunk_index, chunk, HASH_BUFFER_COUNT)
+                chunk_index += 1
                 bytes_written += len(chunk)
+                hashing_status["progress"] = int((bytes_written / total_size) * 100) if total_size else 0
 
 
 
@@ -11704,6 +15122,14 @@ def ajax_upload():
             "complete": True,
             "elapsed_time": format_time(time.time() - upload_status["start_time"]) 
         })
+        hashes = close_digest_pipeline(digests)
+        digests = None
+        block_map_path = None
+        if block_map is not None:
+            block_map_path = close_block_hash_map(block_map)
+            block_map = None
+            record_block_hash_map(filename, block_map_path)
+        record_evidence_hashes(filename, hashes)
 
 
 
@@ -11711,10 +15137,10 @@ def ajax_upload():
         target_db = request.form.get('target_db', 'local')
         # Start processing in background so response returns quickly
         try:
-            threading.Thread(target=_process_uploaded_file, args=(filename, filepath, target_db), daemon=True).start()
+            threading.Thread(target=_process_uploaded_file, args=(filename, filepath, target_db, hashes, block_map_path), daemon=True).start()
         except Exception:
             # If background thread cannot be started, process inline (best-effort)
-            _process_uploaded_file(filename, filepath, target_db)
+            _process_uploaded_file(filename, filepath, target_db, hashes, block_map_path)
 
         return jsonify({
             'success': True,
@@ -11727,14 +15153,26 @@ def ajax_upload():
             "in_progress": False,
             "error": str(e)
         })
+        hashing_status.update({"in_progress": False, "complete": True, "error": str(e)})
         return jsonify({'error': f'Error uploading file: {str(e)}'}), 500
-def _process_uploaded_file(filename, filepath, target_db='local'):
-    """Process uploaded file and add to database."""
+    finally:
+        if digests is not None:
+            close_digest_pipeline(digests)
+        if block_map is not None:
+            discard_block_hash_map(block_map)
+
+def _process_uploaded_file(filename, filepath, target_db='local', hashes=None, block_map_path=None):
+    """Process uploaded file and add to database.
+
+    `hashes` are the digests computed while the file was uploaded; without them,
+    and unless the evidence cache knows the file, it is hashed in the background.
+    `block_map_path` is the block hash map written during the upload, if any.
+    """
     # global uploaded_files_db
 
     file_size = os.path.getsize(filepath)
-    encryption_info = detect_encryption(filepath)
-    forensic_results, partition_info = perform_forensic_analysis(filepath)
+    # a re-upload of a known image is matched in the evidence cache by its content hash
+    encryption_info, forensic_results, partition_info, hashes = analyze_evidence(filepath, hashes)
 
     uploaded_files_db[filename] = {
         "path": filepath,
@@ -11748,9 +15186,11 @@ def _process_uploaded_file(filename, filepath, target_db='local'):
         },
         "forensic_results": forensic_results,
         "partition_info": partition_info,
-        "hash_info": {},
-        "hashing_complete": False
+        "hash_info": hashes or {},
+        "hashing_complete": bool(hashes)
     }
+    if block_map_path:
+        uploaded_files_db[filename]['block_hash_map'] = block_map_path
     # keep target db selection
     try:
         uploaded_files_db[filename]['target_db'] = target_db
@@ -11758,10 +15198,13 @@ def _process_uploaded_file(filename, filepath, target_db='local'):
     except Exception:
         pass
 
-    # Start background hashing
-    hashing_thread = threading.Thread(target=calculate_hashes_threaded, args=(filepath,))
-    hashing_thread.daemon = True
-    hashing_thread.start()
+    # Start background hashing unless the upload or the evidence cache produced the hashes
+    if hashes:
+        record_evidence_hashes(filename, hashes)
+    else:
+        hashing_thread = threading.Thread(target=calculate_hashes_threaded, args=(filepath,))
+        hashing_thread.daemon = True
+        hashing_thread.start()
     # Add DB record for uploaded file
     try:
         add_file_record(filename, 'uploaded', filepath, os.path.getsize(filepath), session_id=None, extra={'target_db': target_db})
@@ -12140,7 +15583,9 @@ def auto_carving_setup():
         AUTO_CARVING_SETUP_CONTENT, 
         signatures=FILE_SIGNATURES, 
         colors=colors,
-        form_action_url=url_for('run_auto_carving')
+        form_action_url=url_for('run_auto_carving'),
+        known_count=sum(known_file_set_counts().values()),
+        known_filter=app.config.get('KNOWN_FILES_FILTER', KNOWN_FILES_FILTER)
     )
     return render_template_string(BASE_TEMPLATE, content=content, uploaded_files_db=uploaded_files_db)
 
@@ -12158,6 +15603,23 @@ def recovered_files():
         flash("No evidence file is currently loaded. Please start a new session.", "warning")
         return redirect(url_for('evidence_upload'))
 
+    page = request.args.get('page', 1, type=int)
+    PER_PAGE = 20
+    # Container output: the offset index pages through the members without a directory scan
+    try:
+        indexed = list_carved_members(PER_PAGE, (page - 1) * PER_PAGE)
+    except Exception as e:
+        flash(f"Error reading carve container index: {e}", "error")
+        indexed = None
+    if indexed is not None:
+        total_files, files_on_page = indexed
+        content = render_template_string(RECOVERED_FILES_CONTENT,
+                                         carved_files=files_on_page,
+                                         total_files=total_files,
+                                         page=page,
+                                         total_pages=max(1, (total_files + PER_PAGE - 1) // PER_PAGE))
+        return render_template_string(BASE_TEMPLATE, content=content, uploaded_files_db=uploaded_files_db)
+
     recovered_files_map = {}
     carved_dir = app.config['CARVED_FOLDER']
     
@@ -12174,7 +15636,8 @@ def recovered_files():
                     "id": file_id,
                     "name": filename,
                     "offset": f"0x{offset_hex}",
-                    "size_bytes": size_bytes
+                    "size_bytes": size_bytes,
+                    "confidence": carved_files_db.get(filename, {}).get("confidence")
                 }
                 recovered_files_map[file_id] = file_info
     except FileNotFoundError:
@@ -12184,8 +15647,6 @@ def recovered_files():
 
     sorted_file_ids = sorted(recovered_files_map.keys())
     
-    page = request.args.get('page', 1, type=int)
-    PER_PAGE = 20
     total_files = len(sorted_file_ids)
     start_index = (page - 1) * PER_PAGE
     end_index = start_index + PER_PAGE
@@ -12450,6 +15911,8 @@ def reporting():
         if report_format == 'html':
             for filename, info in carved_filtered.items():
                 filepath = os.path.join(app.config['CARVED_FOLDER'], filename)
+                if find_carved_member(filename) is not None:
+                    filepath = io.BytesIO(read_carved_file(filename))
                 info['thumbnail_uri'] = create_thumbnail_data_uri(filepath)
 
             report_html = render_template_string(
@@ -12470,6 +15933,8 @@ def reporting():
 
             for filename, info in carved_filtered.items():
                 filepath = os.path.join(app.config['CARVED_FOLDER'], filename)
+                if find_carved_member(filename) is not None:
+                    filepath = io.BytesIO(read_carved_file(filename))
                 info['thumbnail_uri'] = create_thumbnail_data_uri(filepath)
 
             report_html = render_template_string(
@@ -12702,15 +16167,13 @@ def hex_view_carved(filename):
         return redirect(url_for('evidence_upload'))
 
     s_filename = secure_filename(filename)
-    filepath = os.path.join(app.config['CARVED_FOLDER'], s_filename)
 
-    if not os.path.exists(filepath):
+    if not carved_file_exists(s_filename):
         flash(f"Carved file '{s_filename}' not found.", "error")
         return redirect(url_for('recovered_files'))
 
     try:
-        with open(filepath, 'rb') as f:
-            content = f.read()
+        content = read_carved_file(s_filename)
         hex_content = format_hex_view(content)
         content_html = render_template_string(HEX_VIEW_CARVED_FILE_CONTENT, filename=s_filename, hex_content=hex_content)
         return render_template_string(BASE_TEMPLATE, content=content_html, uploaded_files_db=uploaded_files_db)
@@ -12720,12 +16183,23 @@ def hex_view_carved(filename):
 
 @app.route('/download_carved_file/<filename>')
 def download_carved_file(filename):
-    return send_from_directory(app.config['CARVED_FOLDER'], secure_filename(filename), as_attachment=True)
+    s_filename = secure_filename(filename)
+    member = find_carved_member(s_filename)
+    if member is None:
+        return send_from_directory(app.config['CARVED_FOLDER'], s_filename, as_attachment=True)
+    # stream the member straight out of its container segment
+    mime_type = mimetypes.guess_type(s_filename)[0] or 'application/octet-stream'
+    return Response(iter_carved_file(s_filename), mimetype=mime_type,
+                    headers={'Content-Disposition': f'attachment; filename={s_filename}', 'Content-Length': str(member[2])})
 
 @app.route('/serve_file_data/<type>/<path:filename>')
 def serve_file_data(type, filename):
     s_filename = secure_filename(filename)
     if type == 'carved':
+        member = find_carved_member(s_filename)
+        if member is not None:
+            mime_type = mimetypes.guess_type(s_filename)[0] or 'application/octet-stream'
+            return Response(iter_carved_file(s_filename), mimetype=mime_type, headers={'Content-Length': str(member[2])})
         return send_from_directory(app.config['CARVED_FOLDER'], s_filename)
     elif type == 'deleted_recovered':
         return send_from_directory(app.config['DELETED_RECOVERY_FOLDER'], s_filename)
@@ -12751,19 +16225,30 @@ def serve_file_data(type, filename):
 @app.route('/view_carved_file/<filename>')
 def view_carved_file(filename):
     s_filename = secure_filename(filename)
-    filepath = os.path.join(app.config['CARVED_FOLDER'], s_filename)
-    if not os.path.exists(filepath):
+    if not carved_file_exists(s_filename):
         return "File not found", 404
     
     try:
-        with open(filepath, 'rb') as f:
-            content = f.read()
+        content = read_carved_file(s_filename)
     except Exception as e:
         return f"Error reading file: {e}", 500
     
     data_url = url_for('serve_file_data', type='carved', filename=s_filename)
     return _generate_preview_response(content, s_filename, data_url, file_info={"name": s_filename})
 
+@app.route('/verify_carved/<filename>', methods=['POST'])
+def verify_carved(filename):
+    """Fully decodes one carved file (tier 3 of the validation cascade) and returns its new confidence."""
+    s_filename = secure_filename(filename)
+    if not carved_file_exists(s_filename):
+        return jsonify({"error": "File not found"}), 404
+    try:
+        entry = verify_carved_file(s_filename)
+    except Exception as e:
+        return jsonify({"error": f"Error decoding file: {e}"}), 500
+    return jsonify({"filename": s_filename, "confidence": entry["confidence"],
+                    "verified": entry["confidence"] == CONFIDENCE_DECODED})
+
 @app.route('/view_deleted_file/<filename>')
 def view_deleted_file(filename):
     """View deleted file with preview similar to carved files."""
@@ -12826,14 +16311,12 @@ def view_deleted_file(filename):
 def hex_view_fallback(filename):
     """Fallback hex view for files that can't be previewed normally"""
     s_filename = secure_filename(filename)
-    filepath = os.path.join(app.config['CARVED_FOLDER'], s_filename)
     
-    if not os.path.exists(filepath):
+    if not carved_file_exists(s_filename):
         return "File not found", 404
     
     try:
-        with open(filepath, 'rb') as f:
-            content = f.read(5000)  # Read first 5000 bytes for preview
+        content = read_carved_file(s_filename, 5000)  # Read first 5000 bytes for preview
         hex_content = format_hex_view(content)
         
         return f"""
@@ -12907,9 +16390,15 @@ def download_zip():
         with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
             if file_type == 'carved':
                 for filename in selected_files:
-                    filepath = os.path.join(app.config['CARVED_FOLDER'], secure_filename(filename))
+                    s_filename = secure_filename(filename)
+                    if find_carved_member(s_filename) is not None:
+                        with zf.open(s_filename, 'w', force_zip64=True) as member:
+                            for chunk in iter_carved_file(s_filename):
+                                member.write(chunk)
+                        continue
+                    filepath = os.path.join(app.config['CARVED_FOLDER'], s_filename)
                     if os.path.exists(filepath):
-                        zf.write(filepath, arcname=secure_filename(filename))
+                        zf.write(filepath, arcname=s_filename)
             
             elif file_type == 'deleted_recovered':
                 for filename in selected_files:
@@ -12963,9 +16452,84 @@ def run_auto_carving():
         flash('Error: Please select at least one file type to carve.', 'error')
         return redirect(url_for('auto_carving_setup'))
 
-    threading.Thread(target=simple_file_carver, args=(image_path, selected_types)).start()
+    parallel = request.form.get('parallel_carving') == 'on'
+    try:
+        alignment = int(request.form.get('carving_alignment') or 0)
+    except ValueError:
+        alignment = 0
+    if alignment not in CARVING_ALIGNMENTS:
+        alignment = None
+    scope = 'unallocated' if request.form.get('carving_scope') == 'unallocated' else None
+    output_mode = 'container' if request.form.get('carving_output') == 'container' else None
+    try:
+        recursion_depth = int(request.form.get('carving_recursion') or 0)
+    except ValueError:
+        recursion_depth = 0
+    if recursion_depth not in CARVE_RECURSION_DEPTHS:
+        recursion_depth = None
+    known_files = request.form.get('skip_known_files') == 'on'
+    threading.Thread(target=simple_file_carver, args=(image_path, selected_types),
+                     kwargs={'parallel': parallel, 'alignment': alignment, 'scope': scope, 'output_mode': output_mode,
+                             'recursion_depth': recursion_depth, 'known_files': known_files}).start()
     return redirect(url_for('auto_carving_process'))
 
+@app.route('/estimate_auto_carving', methods=['POST'])
+def estimate_auto_carving():
+    """Samples the evidence and projects the hits and duration of a full auto carve."""
+    image_path = get_active_evidence_path()
+    if not image_path:
+        return jsonify({"error": "Evidence file path is missing or invalid."}), 400
+    selected_types = request.form.getlist('file_types')
+    if not selected_types:
+        return jsonify({"error": "Please select at least one file type to carve."}), 400
+    try:
+        fraction = float(request.form.get('sample_fraction') or 0)
+    except ValueError:
+        fraction = 0
+    if fraction not in CARVE_SAMPLE_FRACTIONS:
+        fraction = None
+    try:
+        alignment = int(request.form.get('carving_alignment') or 0)
+    except ValueError:
+        alignment = 0
+    if alignment not in CARVING_ALIGNMENTS:
+        alignment = None
+    try:
+        return jsonify(estimate_carving(image_path, selected_types, fraction, alignment=alignment))
+    except Exception as e:
+        return jsonify({"error": f"Estimate failed: {e}"}), 500
+
+@app.route('/known_files/import', methods=['POST'])
+def import_known_files():
+    """Starts importing an NSRL RDS text/CSV file or hash list into the known-file set.
+
+    The hash set is either uploaded as `hash_set` or named by `hash_set_path`, a
+    file under the allowed roots.
+    """
+    if known_files_status.get("in_progress"):
+        return jsonify({"error": "A hash set import is already running."}), 409
+    upload = request.files.get('hash_set')
+    if upload and upload.filename:
+        folder = app.config.get('KNOWN_FILES_FOLDER', KNOWN_FILES_FOLDER)
+        os.makedirs(folder, exist_ok=True)
+        source_path = os.path.join(folder, 'import_' + secure_filename(upload.filename))
+        upload.save(source_path)
+        remove_source = True
+    else:
+        source_path = os.path.abspath(request.form.get('hash_set_path') or '')
+        if not request.form.get('hash_set_path') or not is_path_under_allowed_roots(source_path) or not os.path.isfile(source_path):
+            return jsonify({"error": "Hash set file not found under the allowed roots."}), 400
+        remove_source = False
+    threading.Thread(target=import_known_files_threaded, args=(source_path, remove_source), daemon=True).start()
+    return jsonify({"status": "started"})
+
+@app.route('/known_files/status')
+def known_files_import_status():
+    status = dict(known_files_status)
+    if not status.get("in_progress"):
+        status["counts"] = known_file_set_counts()
+    return jsonify(status)
+
 @app.route('/find_block', methods=['POST'])
 def find_block():
     filepath = get_active_evidence_path()
@@ -12982,17 +16546,21 @@ def find_block():
     except ValueError:
         return jsonify({"status": "error", "message": "Invalid Hex sequence."})
     
+    # Known signature headers/footers are looked up in the evidence's hit index
+    index = open_signature_index(filepath)
     try:
         with open(filepath, 'rb') as f:
             with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-                header_pos = mm.find(header_bytes, 0)
+                header_pos = find_indexed_pattern(index, mm, header_bytes, 0, len(mm))
                 if header_pos != -1:
-                    footer_pos = mm.find(footer_bytes, header_pos + len(header_bytes))
+                    footer_pos = find_indexed_pattern(index, mm, footer_bytes, header_pos + len(header_bytes), len(mm))
                     if footer_pos != -1:
                         block_len = (footer_pos + len(footer_bytes)) - header_pos
                         return jsonify({"status": "success", "start_offset": header_pos, "length": block_len})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
+    finally:
+        close_signature_index(index)
 
     return jsonify({"status": "not_found"})
 
@@ -13034,6 +16602,7 @@ def perform_manual_carve():
 
     carved_filename = f"manual_carve_{start_offset}_{length}.dat"
     save_path = os.path.join(app.config['CARVED_FOLDER'], carved_filename)
+    unshare_artifact(save_path)
     with open(save_path, 'wb') as out_f:
         out_f.write(data_to_carve)
     
@@ -18,6 +18,9 @@ from functools import partial
 # Import your original app (this executes your app.py but we will override heavy functions)
 import app as orig_app
 
+# Keep a handle on the original carver: its sharded process-pool mode is used as-is
+_orig_simple_file_carver = orig_app.simple_file_carver
+
 # --- Quick helpers to update status dicts (used by your UI) ---
 def _safe_update_status(status_dict, updates):
     try:
@@ -29,47 +32,48 @@ def _safe_update_status(status_dict, updates):
 # -------------------------
 # Optimized hashing function
 # -------------------------
-def fast_calculate_hashes_threaded(file_path, chunk_size=8*1024*1024, max_workers=4):
+def fast_calculate_hashes_threaded(file_path, chunk_size=8*1024*1024, max_workers=4, block_map=None):
     """
-    Faster, chunked hashing using a small threadpool to read large files concurrently.
-    Keeps same side-effects: updates orig_app.hashing_status and uploaded_files_db entries.
+    Faster, chunked hashing: a reader fills a ring of `max_workers` buffers while
+    one digest thread per algorithm consumes them (see orig_app.hash_file_parallel).
+    Keeps same side-effects: updates orig_app.hashing_status and uploaded_files_db entries,
+    including the optional block hash map sidecar.
     """
     hashing_status = orig_app.hashing_status
     uploaded_db = orig_app.uploaded_files_db
 
-    hashing_status.update({"in_progress": True, "progress": 0, "complete": False, "hashes": {}})
-    md5 = hashlib.md5()
-    sha1 = hashlib.sha1()
-    sha256 = hashlib.sha256()
+    hashing_status.update({"in_progress": True, "progress": 0, "complete": False, "hashes": {}, "block_hash_map": None})
 
     file_size = os.path.getsize(file_path)
     if file_size == 0:
-        final_hashes = {'MD5': md5.hexdigest(), 'SHA-1': sha1.hexdigest(), 'SHA-256': sha256.hexdigest()}
+        final_hashes = {label: hashlib.new(name).hexdigest() for label, name in orig_app.HASH_ALGORITHMS}
         hashing_status.update({"in_progress": False, "complete": True, "hashes": final_hashes})
         return
 
-    # Read sequentially but in larger chunks; reading is still I/O-bound so threads help when disk has latency
-    bytes_read = 0
+    def progress(bytes_read):
+        _safe_update_status(hashing_status, {"progress": int((bytes_read / file_size) * 100)})
+
+    writer = None
     try:
-        with open(file_path, 'rb', buffering=16*1024*1024) as f:
-            while True:
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                md5.update(chunk); sha1.update(chunk); sha256.update(chunk)
-                bytes_read += len(chunk)
-                progress = int((bytes_read / file_size) * 100)
-                _safe_update_status(hashing_status, {"progress": progress})
-        final_hashes = {'MD5': md5.hexdigest(), 'SHA-1': sha1.hexdigest(), 'SHA-256': sha256.hexdigest()}
+        if orig_app.block_hash_map_enabled(block_map):
+            writer = orig_app.open_block_hash_map(orig_app.block_hash_map_path(file_path))
+        final_hashes = orig_app.hash_file_parallel(file_path, chunk_size=chunk_size, buffers=max_workers, progress=progress, block_map=writer)
+        if writer is not None:
+            orig_app.record_block_hash_map(os.path.basename(file_path), orig_app.close_block_hash_map(writer))
+            writer = None
         hashing_status.update({"in_progress": False, "complete": True, "hashes": final_hashes, "progress": 100})
         # update uploaded_files_db if entry exists
         filename = os.path.basename(file_path)
         if filename in uploaded_db:
             uploaded_db[filename]['hash_info'] = final_hashes
             uploaded_db[filename]['hashing_complete'] = True
+        orig_app.cache_evidence_hashes(file_path, final_hashes)
     except Exception as e:
         hashing_status.update({"in_progress": False, "complete": True, "error": str(e)})
         print("fast_calculate_hashes_threaded error:", e)
+    finally:
+        if writer is not None:
+            orig_app.discard_block_hash_map(writer)
 
 # -------------------------
 # Optimized strings extraction
@@ -92,21 +96,33 @@ def fast_extract_strings_threaded(filepath, min_len=4):
             file_len = len(mm)
             update_every = max(1, file_len // 200)  # ~0.5% updates
             last_update = 0
-            for i in range(file_len):
-                b = mm[i]
-                if b in printable_range:
-                    current.append(b)
-                else:
+            # skip constant runs of non-printable bytes (zeroed/wiped space) entirely
+            skip_values = set(range(256)) - set(printable_range)
+            spans = orig_app.iter_scan_spans(orig_app.get_constant_block_map(filepath, mm), 0, file_len, 0, skip_values)
+            for span_start, span_end in spans:
+                for i in range(span_start, span_end):
+                    b = mm[i]
+                    if b in printable_range:
+                        current.append(b)
+                    else:
+                        if len(current) >= min_len:
+                            results.append(bytes(current).decode('ascii', 'ignore'))
+                            strings_status['strings_found'] += 1
+                            if len(strings_status['preview']) < 200:
+                                strings_status['preview'].append(results[-1])
+                        current.clear()
+                    if i - last_update >= update_every:
+                        progress = int((i / file_len) * 100)
+                        _safe_update_status(strings_status, {"progress": progress})
+                        last_update = i
+                # a skipped run is non-printable, so it terminates the current string
+                if span_end < file_len:
                     if len(current) >= min_len:
                         results.append(bytes(current).decode('ascii', 'ignore'))
                         strings_status['strings_found'] += 1
                         if len(strings_status['preview']) < 200:
                             strings_status['preview'].append(results[-1])
                     current.clear()
-                if i - last_update >= update_every:
-                    progress = int((i / file_len) * 100)
-                    _safe_update_status(strings_status, {"progress": progress})
-                    last_update = i
             # final tail
             if len(current) >= min_len:
                 results.append(bytes(current).decode('ascii', 'ignore'))
@@ -121,21 +137,39 @@ def fast_extract_strings_threaded(filepath, min_len=4):
 # -------------------------
 # Faster file carver
 # -------------------------
-def fast_simple_file_carver(filepath, selected_types, db_session=None):
+def fast_simple_file_carver(filepath, selected_types, db_session=None, parallel=False, workers=None, alignment=None, scope=None, output_mode=None,
+                            recursion_depth=None, known_files=None):
     """
     Optimized version of simple_file_carver:
       - pre-build a dict of headers to signature
       - iterate mmap with re.finditer (as in original) but minimize Python per-match work
       - when extracting, use buffered writes
     Keeps same side-effects: updates orig_app.carving_status, carved_files_db, etc.
+    Parallel, sector-aligned, unallocated-scope, container-output and recursive runs, and runs that skip
+    known files (whole-content digests are needed), are delegated to the original carver.
     """
+    if output_mode is None and orig_app.app.config.get('CARVE_OUTPUT_MODE', orig_app.CARVE_OUTPUT_MODE) == 'container':
+        output_mode = 'container'
+    if recursion_depth is None:
+        recursion_depth = orig_app.app.config.get('CARVE_RECURSION_DEPTH', orig_app.CARVE_RECURSION_DEPTH)
+    if parallel or alignment or scope or output_mode == 'container' or recursion_depth or orig_app.known_files_enabled(known_files):
+        return _orig_simple_file_carver(filepath, selected_types, parallel=parallel, workers=workers, alignment=alignment, scope=scope,
+                                        output_mode=output_mode, recursion_depth=recursion_depth, known_files=known_files)
+
     carving_status = orig_app.carving_status
     carved_files_db = orig_app.carved_files_db
     carved_files_db.clear()
+    try:
+        # members of an earlier container carve would shadow the files written below
+        orig_app.discard_carve_container_index(orig_app.app.config['CARVED_FOLDER'])
+    except OSError as e:
+        carving_status.update({"error": f"Could not clear old container index: {e}", "complete": True})
+        return
     carving_status.update({
         "progress": 0, "current_offset": "0x00000000", "files_found": 0,
-        "complete": False, "found_files_list": [], "time_remaining_str": "Starting..."
+        "complete": False, "time_remaining_str": "Starting...", "evidence_path": filepath
     })
+    orig_app.carving_hits["recent"].clear()
 
     # Flatten signatures like original
     all_signatures = {name: sig for cat in orig_app.FILE_SIGNATURES.values() for name, sig in cat.items()}
@@ -170,11 +204,13 @@ def fast_simple_file_carver(filepath, selected_types, db_session=None):
             found_file_counter = 0
             start_time = time.time()
             last_etr_update_pos = 0
+            # zero-filled / constant blocks are classified once and never searched
+            block_map = orig_app.get_constant_block_map(filepath, mm)
             # iterate over headers by simple find to reduce regex overhead:
             for header in set(headers_to_search):
                 start = 0
                 while True:
-                    pos = mm.find(header, start)
+                    pos = orig_app.find_skipping_constant_runs(mm, header, start, block_map)
                     if pos == -1:
                         break
                     possible_sigs = signatures_by_header.get(header, [])
@@ -198,9 +234,9 @@ def fast_simple_file_carver(filepath, selected_types, db_session=None):
                         length_guess = min(sig.get('max_size', 1*1024*1024), file_size - pos)
                         end_pos = pos + length_guess
 
-                    content = mm[pos:end_pos]
-                    # quick dedupe by md5 of head
-                    content_hash = hashlib.md5(content[:4096]).hexdigest()
+                    content_len = end_pos - pos
+                    # quick dedupe by md5 of head (hashed in place, no copy of the region)
+                    content_hash = orig_app.hash_mapped_range(mm, pos, min(pos + 4096, end_pos))
                     if content_hash in seen_hashes:
                         start = pos + 1
                         continue
@@ -208,24 +244,19 @@ def fast_simple_file_carver(filepath, selected_types, db_session=None):
                     found_file_counter += 1
                     filename = f"carved_{found_file_counter}{ext}"
                     save_path = os.path.join(orig_app.app.config['CARVED_FOLDER'], filename)
-                    # write out buffered
+                    # copy kernel-side from the evidence instead of materializing the region
+                    orig_app.unshare_artifact(save_path)
                     with open(save_path, 'wb') as outf:
-                        outf.write(content)
+                        orig_app.copy_evidence_range(f.fileno(), outf.fileno(), pos, content_len)
                     file_info = {
                         "id": found_file_counter,
                         "name": filename,
                         "offset": f"0x{pos:08X}",
-                        "size_kb": f"{len(content)/1024:.2f} KB",
-                        "hex_preview": orig_app.format_hex_view(content[:256])
+                        "size_kb": f"{content_len/1024:.2f} KB"
                     }
                     carved_files_db[filename] = file_info
-                    carving_status["found_files_list"].append(file_info)
+                    orig_app.record_carving_hit(filename, pos)
                     carving_status["files_found"] = found_file_counter
-                    # Store carved file into session if available
-                    try:
-                        orig_app.data_manager.store_session_data('carved_file', filename, content, {'offset': f'0x{pos:08X}', 'size': len(content), 'type': sig.get('name')}, session=(db_session or orig_app.data_manager.get_thread_session()))
-                    except Exception:
-                        pass
                     # update progress/etr
                     if pos > last_etr_update_pos + (file_size // 200):
                         time_elapsed = time.time() - start_time
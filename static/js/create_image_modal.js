@@ -61,6 +61,7 @@ document.addEventListener('DOMContentLoaded', function(){
     const examinerLabel = document.createElement('label'); examinerLabel.textContent='Examiner:'; const examinerInput = document.createElement('input'); examinerInput.type='text'; examinerInput.id='ci_examiner'; examinerInput.style.width='100%'; form.appendChild(examinerLabel); form.appendChild(examinerInput);
     const notesLabel = document.createElement('label'); notesLabel.textContent='Notes:'; const notesInput = document.createElement('textarea'); notesInput.id='ci_notes'; notesInput.style.width='100%'; notesInput.style.height='60px'; form.appendChild(notesLabel); form.appendChild(notesInput);
     const compressLabel = document.createElement('label'); const compressInput = document.createElement('input'); compressInput.type='checkbox'; compressInput.id='ci_compress'; compressLabel.appendChild(compressInput); compressLabel.appendChild(document.createTextNode(' Enable EWF compression (when using .e01)')); form.appendChild(compressLabel);
+    const blockMapLabel = document.createElement('label'); const blockMapInput = document.createElement('input'); blockMapInput.type='checkbox'; blockMapInput.id='ci_block_hash_map'; blockMapLabel.appendChild(blockMapInput); blockMapLabel.appendChild(document.createTextNode(' Write block hash map (SHA-256 per 1 MiB, MD5 per 4 KiB)')); form.appendChild(blockMapLabel);
 
     modal.appendChild(form);
   const ctrl = document.createElement('div'); ctrl.style.marginTop='10px'; ctrl.style.display='flex'; ctrl.style.gap='8px'; ctrl.style.alignItems='center';
@@ -88,6 +89,7 @@ document.addEventListener('DOMContentLoaded', function(){
         fd.append('examiner', document.getElementById('ci_examiner').value || '');
         fd.append('notes', document.getElementById('ci_notes').value || '');
         fd.append('compress', document.getElementById('ci_compress').checked ? '1' : '');
+        fd.append('block_hash_map', document.getElementById('ci_block_hash_map').checked ? '1' : '');
         const r = await fetch('/api/create_image', { method: 'POST', body: fd, headers: cfg.csrf ? {'X-CSRF-Token': cfg.csrf} : {} });
         const j = await r.json();
         if(j.error){ status.textContent = 'Error: ' + (j.message || j.error); return; }
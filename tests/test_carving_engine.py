@@ -0,0 +1,858 @@
+import gzip
+import io
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import tarfile
+import zipfile
+import importlib.util
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+# Load app module as fac_app (same pattern as other tests)
+spec = importlib.util.spec_from_file_location('fac_app', os.path.join(os.path.dirname(__file__), '..', 'app.py'))
+fac_app = importlib.util.module_from_spec(spec)
+sys.modules['fac_app'] = fac_app
+spec.loader.exec_module(fac_app)
+app = fac_app.app
+
+
+@pytest.fixture
+def carve_env(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'fac_test.db')
+
+    def _get_tmp_db_conn():
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, filename TEXT, file_type TEXT, path TEXT, size_bytes INTEGER, created_at TEXT, session_id TEXT, extra TEXT, status TEXT DEFAULT "saved")')
+        conn.execute('CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY, started_at TEXT, ended_at TEXT, active INTEGER, session_path TEXT)')
+        conn.commit()
+        return conn
+
+    monkeypatch.setattr(fac_app, '_get_db_conn', _get_tmp_db_conn)
+    carved_dir = tmp_path / 'carved'
+    carved_dir.mkdir()
+    monkeypatch.setitem(app.config, 'CARVED_FOLDER', str(carved_dir))
+    monkeypatch.setitem(app.config, 'DEDUPE_STORE_FILE', str(tmp_path / 'content_hashes.db'))
+    monkeypatch.setitem(app.config, 'DEDUPE_BLOOM_CAPACITY', 10000)
+    monkeypatch.setitem(app.config, 'KNOWN_FILES_FOLDER', str(tmp_path / 'known_files'))
+    return tmp_path
+
+
+def _image_blob(fmt='PNG', seed=0, size=(24, 24)):
+    pixels = random.Random(seed).randbytes(size[0] * size[1] * 3)
+    buf = io.BytesIO()
+    Image.frombytes('RGB', size, pixels).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def _png_blob(seed=0):
+    return _image_blob('PNG', seed)
+
+
+def test_matcher_reports_overlapping_hits_in_offset_order():
+    matcher = fac_app.build_signature_matcher(['PNG', 'GIF', 'GZIP'])
+    data = b'\x00' * 10 + b'GIF8' + b'\x1f\x8b' + b'\x00' * 5 + _png_blob() + b'\x1f\x8b'
+    hits = list(fac_app.iter_signature_hits(matcher, data))
+    offsets = [pos for pos, _ in hits]
+    assert offsets == sorted(offsets)
+    assert [h for _, h in hits] == [b'GIF8', b'\x1f\x8b', b'\x89PNG\r\n\x1a\n', b'\x1f\x8b']
+
+
+def test_matcher_window_boundary_does_not_split_headers():
+    matcher = fac_app.build_signature_matcher(['PNG'])
+    data = b'\x00' * 100 + _png_blob()
+    first = list(fac_app.iter_signature_hits(matcher, data, 0, 103))
+    second = list(fac_app.iter_signature_hits(matcher, data, 103, len(data)))
+    assert [pos for pos, _ in first] == [100]
+    assert second == []
+
+
+def test_matcher_shared_header_maps_to_all_selected_signatures():
+    matcher = fac_app.build_signature_matcher(['WAV', 'AVI'])
+    names = [sig['name'] for sig in matcher['by_header'][b'RIFF']]
+    assert sorted(names) == ['AVI', 'WAV']
+    assert fac_app.build_signature_matcher([]) is None
+
+
+def test_simple_file_carver_single_pass(carve_env):
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b'\x00' * 512 + _png_blob() + b'\x00' * 512 + _png_blob(seed=1) + b'\x00' * 64)
+
+    fac_app.simple_file_carver(str(image), ['PNG', 'GIF'])
+
+    assert fac_app.carving_status['complete'] is True
+    assert fac_app.carving_status['files_found'] == 2
+    carved = sorted(os.listdir(app.config['CARVED_FOLDER']))
+    assert len(carved) == 2
+    assert all(name.endswith('.png') for name in carved)
+
+
+def _zip_blob(names):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        for name in names:
+            zf.writestr(name, 'content ' * 50)
+    return buf.getvalue()
+
+
+def test_classify_zip_family_by_ooxml_parts():
+    matcher = fac_app.build_signature_matcher(['ZIP', 'DOCX', 'XLSX', 'PPTX'])
+    candidates = matcher['by_header'][b'PK\x03\x04']
+    docx = _zip_blob(['[Content_Types].xml', '_rels/.rels', 'word/document.xml'])
+    plain = _zip_blob(['notes.txt', 'data/readme.md'])
+    assert [s['name'] for s in fac_app.classify_signature_hit(docx, 0, candidates, len(docx))] == ['DOCX']
+    assert [s['name'] for s in fac_app.classify_signature_hit(plain, 0, candidates, len(plain))] == ['ZIP']
+
+    # An OOXML document is carved as ZIP when only ZIP is selected
+    only_zip = fac_app.build_signature_matcher(['ZIP'])['by_header'][b'PK\x03\x04']
+    assert [s['name'] for s in fac_app.classify_signature_hit(docx, 0, only_zip, len(docx))] == ['ZIP']
+
+
+def test_zip_followed_by_docx_keeps_both_types(carve_env):
+    plain = _zip_blob(['notes.txt', 'data/readme.md'])
+    # large enough for the minimum DOCX size
+    docx = _zip_blob(['[Content_Types].xml', '_rels/.rels', 'word/document.xml'] + [f'word/media/image{i}.bin' for i in range(10)])
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b'\x00' * 0x11000 + plain + b'\x00' * (0x14000 - 0x11000 - len(plain)) + docx + b'\x00' * 512)
+    candidates = fac_app.build_signature_matcher(['ZIP', 'DOCX'])['by_header'][b'PK\x03\x04']
+    data = image.read_bytes()
+    assert [s['name'] for s in fac_app.classify_signature_hit(data, 0x11000, candidates, len(data))] == ['ZIP']
+
+    fac_app.simple_file_carver(str(image), ['ZIP', 'DOCX'])
+
+    carved = {name.rsplit('.', 1)[1]: (carve_env / 'carved' / name).read_bytes() for name in os.listdir(app.config['CARVED_FOLDER'])}
+    assert carved == {'zip': plain, 'docx': docx}
+
+
+def test_ooxml_hit_failing_validation_falls_back_to_zip(carve_env):
+    # OOXML-looking parts, but no main document part: not a valid DOCX
+    partial = _zip_blob(['[Content_Types].xml', 'word/styles.xml'])
+    candidates = fac_app.build_signature_matcher(['ZIP', 'DOCX'])['by_header'][b'PK\x03\x04']
+    [sig] = fac_app.classify_signature_hit(partial, 0, candidates, len(partial))
+    assert (sig['name'], sig['fallback']['name']) == ('DOCX', 'ZIP')
+    sig, valid, _, _ = fac_app.validate_classified_extent(partial, 0, len(partial), sig)
+    assert (sig['name'], valid) == ('ZIP', True)
+
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b'\x00' * 512 + partial + b'\x00' * 512)
+    fac_app.simple_file_carver(str(image), ['ZIP', 'DOCX'])
+    assert [name.rsplit('.', 1)[1] for name in os.listdir(app.config['CARVED_FOLDER'])] == ['zip']
+
+
+def test_classify_riff_and_identical_formats():
+    matcher = fac_app.build_signature_matcher(['WAV', 'AVI', 'JPEG', 'JPG'])
+    wave = b'RIFF\x00\x01\x00\x00WAVEfmt '
+    junk = b'RIFF\x00\x01\x00\x00XXXXdata'
+    riff = matcher['by_header'][b'RIFF']
+    assert [s['name'] for s in fac_app.classify_signature_hit(wave, 0, riff, len(wave))] == ['WAV']
+    assert fac_app.classify_signature_hit(junk, 0, riff, len(junk)) == []
+    jpeg = matcher['by_header'][b'\xff\xd8\xff\xe0']
+    assert [s['name'] for s in fac_app.classify_signature_hit(b'', 0, jpeg, 0)] == ['JPEG']
+
+
+def test_parallel_carving_matches_sequential(carve_env, monkeypatch):
+    monkeypatch.setattr(fac_app, 'CARVING_MIN_SHARD_SIZE', 1024)
+    blob = _png_blob(seed=2)
+    # The second copy straddles the shard boundary and the third one duplicates it
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b'\x00' * 300 + _png_blob() + b'\x00' * 600 + blob + b'\x00' * 1500 + blob + b'\x00' * 100)
+
+    fac_app.simple_file_carver(str(image), ['PNG'], parallel=True, workers=3)
+
+    assert fac_app.carving_status['files_found'] == 2
+    names = sorted(os.listdir(app.config['CARVED_FOLDER']), key=lambda n: int(n.split('-')[0]))
+    offsets = [int(n.split('-')[1], 16) for n in names]
+    assert offsets == [300, 300 + len(_png_blob()) + 600]
+
+
+def _resolve(name, data):
+    matcher = fac_app.build_signature_matcher([name])
+    return fac_app.resolve_carve_length(data, 0, matcher['signatures'][name], len(data))
+
+
+def _sqlite_blob(tmp_path):
+    db_path = tmp_path / 'carve_me.sqlite'
+    conn = sqlite3.connect(str(db_path))
+    conn.execute('CREATE TABLE t (v TEXT)')
+    conn.executemany('INSERT INTO t VALUES (?)', [('row %d' % i,) for i in range(500)])
+    conn.commit()
+    conn.close()
+    return db_path.read_bytes()
+
+
+def test_length_resolvers_return_exact_sizes(tmp_path):
+    trailer = b'\x00' * 4096 + b'IEND\xaeB`\x82' + b'\xff\xd9' + b'\x00;' + b'%%EOF' + b'\x00' * 4096
+    blobs = {
+        'PNG': _png_blob(),
+        'JPEG': _image_blob('JPEG'),
+        'GIF': _image_blob('GIF'),
+        'BMP': _image_blob('BMP'),
+        'ZIP': _zip_blob(['a.txt', 'b.txt']),
+        'SQLite': _sqlite_blob(tmp_path),
+        'GZIP': gzip.compress(random.Random(3).randbytes(5000)),
+    }
+    for name, blob in blobs.items():
+        assert _resolve(name, blob + trailer) == len(blob), name
+
+
+def test_gzip_resolver_walks_members_and_checks_trailers():
+    members = gzip.compress(b'first member ' * 100) + gzip.compress(b'second member ' * 100)
+    assert _resolve('GZIP', members + b'\x00' * 4096) == len(members)
+    # a damaged trailer is not carved as a blind max_size slice
+    damaged = bytearray(gzip.compress(b'payload ' * 100))
+    damaged[-5] ^= 0xFF
+    assert _resolve('GZIP', bytes(damaged) + b'\x00' * 4096) is None
+    assert _resolve('GZIP', b'\x1f\x8b\x08' + b'\x00' * 4096) is None
+
+
+def test_pdf_resolver_follows_incremental_updates():
+    body = b'%PDF-1.4\n1 0 obj<<>>endobj\nxref\n0 1\ntrailer<<>>\nstartxref\n9\n%%EOF\n'
+    update = b'2 0 obj<<>>endobj\nxref\n0 1\ntrailer<</Prev 9>>\nstartxref\n%d\n%%%%EOF\n' % (len(body) + 18)
+    pdf = body + update
+    other = b'%PDF-1.4\nstartxref\n9\n%%EOF\n'
+    assert _resolve('PDF', pdf + other) == len(pdf)
+
+
+def test_footerless_signature_without_structure_is_rejected():
+    # A bare 'BM' hit used to be carved as a blind 30 MB slice
+    assert _resolve('BMP', b'BM' + b'\x00' * 1024) is None
+    # Types without a resolver keep the fixed-size slice
+    assert _resolve('ICO', b'\x00\x00\x01\x00' + b'\x00' * 1020) == 1024
+
+
+@pytest.mark.parametrize('disabled', [(), ('copy_file_range',), ('copy_file_range', 'sendfile')])
+def test_copy_evidence_range_strategies(tmp_path, monkeypatch, disabled):
+    for name in disabled:
+        monkeypatch.delattr(fac_app.os, name, raising=False)
+    monkeypatch.setattr(fac_app, 'CARVE_COPY_CHUNK_SIZE', 1000)
+    src = tmp_path / 'src.bin'
+    payload = random.Random(7).randbytes(10000)
+    src.write_bytes(payload)
+    dst = tmp_path / 'dst.bin'
+    with open(src, 'rb') as sf, open(dst, 'wb') as df:
+        df.write(b'head')
+        df.flush()
+        assert fac_app.copy_evidence_range(sf.fileno(), df.fileno(), 1234, 5000) == 5000
+    assert dst.read_bytes() == b'head' + payload[1234:6234]
+
+
+def test_carved_files_match_evidence_bytes(carve_env):
+    blob = _png_blob(seed=3)
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b'\x00' * 777 + blob + b'\x00' * 100)
+    fac_app.simple_file_carver(str(image), ['PNG'])
+    (name,) = os.listdir(app.config['CARVED_FOLDER'])
+    assert (carve_env / 'carved' / name).read_bytes() == blob
+
+
+def test_oversized_candidates_stream_under_memory_ceiling(carve_env):
+    blob = _image_blob('PNG', seed=4, size=(200, 200))
+    budget = fac_app.carve_memory_budget(256 * 1024)
+    assert len(blob) > budget['full_validation']
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b'\x00' * 4096 + blob + b'\x00' * 512 + blob + b'\x00' * 64)
+
+    fac_app.simple_file_carver(str(image), ['PNG'], memory_ceiling=256 * 1024)
+
+    # The duplicate is only detectable from the hash computed while streaming
+    assert fac_app.carving_status['files_found'] == 1
+    (name,) = os.listdir(app.config['CARVED_FOLDER'])
+    assert name.startswith('1-00001000-')
+    assert (carve_env / 'carved' / name).read_bytes() == blob
+
+
+def test_stream_evidence_range_hashes_in_chunks(tmp_path):
+    import hashlib
+    import mmap
+    payload = random.Random(8).randbytes(300000)
+    src = tmp_path / 'src.bin'
+    src.write_bytes(payload)
+    dst = tmp_path / 'dst.bin'
+    hasher = hashlib.md5()
+    with open(src, 'rb') as sf, open(dst, 'wb') as df:
+        with mmap.mmap(sf.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            assert fac_app.stream_evidence_range(mm, df.fileno(), 1000, 250000, hasher, chunk_size=65536) == 250000
+    assert dst.read_bytes() == payload[1000:251000]
+    assert hasher.hexdigest() == hashlib.md5(payload[1000:251000]).hexdigest()
+
+
+@pytest.fixture
+def indexed_evidence(carve_env, monkeypatch):
+    import hashlib
+    image = carve_env / 'indexed.dd'
+    image.write_bytes(b'\x00' * 300 + _png_blob(seed=5) + b'\x00' * 200 + _image_blob('GIF', seed=6) + b'\x00' * 50)
+    monkeypatch.setitem(app.config, 'SIGNATURE_INDEX_FOLDER', str(carve_env / 'index'))
+    monkeypatch.setitem(fac_app.uploaded_files_db, image.name,
+                        {'hash_info': {'SHA-256': hashlib.sha256(image.read_bytes()).hexdigest()}})
+    return image
+
+
+def test_signature_index_serves_reruns_without_rescanning(indexed_evidence, monkeypatch):
+    fac_app.simple_file_carver(str(indexed_evidence), ['PNG'])
+    assert fac_app.carving_status['files_found'] == 1
+    index = fac_app.open_signature_index(str(indexed_evidence))
+    assert index is not None and index['indexed_to'] == indexed_evidence.stat().st_size
+    # only the patterns of the carve are indexed
+    assert set(index['pattern_ids']) == {b'\x89PNG\r\n\x1a\n', b'IEND\xaeB`\x82'}
+    fac_app.close_signature_index(index)
+
+    # a carve that needs more patterns records just those, keeping the hits found before
+    searched = []
+    iter_hits = fac_app.iter_signature_hits
+    monkeypatch.setattr(fac_app, 'iter_signature_hits', lambda matcher, *args: searched.append(matcher) or iter_hits(matcher, *args))
+    fac_app.simple_file_carver(str(indexed_evidence), ['GIF'])
+    assert fac_app.carving_status['files_found'] == 1
+    recorded = [matcher for matcher in searched if 'prefixes' in matcher]
+    assert recorded and set(recorded[0]['prefixes']) == {b'\x00;', b'GIF8'}
+    index = fac_app.open_signature_index(str(indexed_evidence))
+    assert len(index['pattern_ids']) == 4 and not index['recording']
+    fac_app.close_signature_index(index)
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError('evidence was rescanned')
+    monkeypatch.setattr(fac_app, 'iter_signature_hits', no_scan)
+    fac_app.simple_file_carver(str(indexed_evidence), ['GIF', 'PNG'])
+    assert fac_app.carving_status['files_found'] == 2
+    assert sorted(n.rsplit('.', 1)[1] for n in os.listdir(app.config['CARVED_FOLDER'])) == ['gif', 'png']
+    assert os.listdir(app.config['SIGNATURE_INDEX_FOLDER']) == [os.path.basename(index['path'])]
+
+
+def test_find_indexed_pattern_matches_mmap_find(indexed_evidence):
+    fac_app.simple_file_carver(str(indexed_evidence), ['PNG'])
+    data = indexed_evidence.read_bytes()
+    index = fac_app.open_signature_index(str(indexed_evidence))
+    try:
+        for pattern in (b'\x89PNG\r\n\x1a\n', b'IEND\xaeB`\x82', b'GIF8', b'\x00;'):
+            for start, end in ((0, len(data)), (301, len(data)), (0, 310)):
+                assert fac_app.find_indexed_pattern(index, data, pattern, start, end) == data.find(pattern, start, end)
+    finally:
+        fac_app.close_signature_index(index)
+
+
+def test_signature_index_ignores_another_files_hashes(carve_env, monkeypatch):
+    image = carve_env / 'unhashed.dd'
+    image.write_bytes(b'\x00' * 100 + _png_blob(seed=7))
+    monkeypatch.setitem(app.config, 'SIGNATURE_INDEX_FOLDER', str(carve_env / 'index'))
+    monkeypatch.setitem(fac_app.hashing_status, 'complete', True)
+    monkeypatch.setitem(fac_app.hashing_status, 'hashes', {'SHA-256': 'ab' * 32})
+    assert fac_app._evidence_sha256(str(image)) is None
+    assert fac_app.open_signature_index(str(image), create=True) is None
+
+
+def test_constant_block_map_and_scan_spans():
+    bs = fac_app.CONSTANT_BLOCK_SIZE
+    data = b'\x00' * (3 * bs) + b'\xff' * bs + b'x' + b'\x00' * (2 * bs - 1) + b'\x00' * (bs + 10)
+    runs = fac_app.build_constant_block_map(data)
+    assert runs == [(0, 3 * bs, 0), (3 * bs, 4 * bs, 255), (5 * bs, 7 * bs, 0)]
+    assert list(fac_app.iter_scan_spans(runs, 0, len(data), 3)) == [(4 * bs - 3, 5 * bs), (7 * bs - 3, len(data))]
+    # Runs of values outside skip_values are scanned like content
+    assert list(fac_app.iter_scan_spans(runs, 0, len(data), 0, {0})) == [(3 * bs, 5 * bs), (7 * bs, len(data))]
+
+
+def test_find_skipping_constant_runs_sees_patterns_straddling_runs():
+    bs = fac_app.CONSTANT_BLOCK_SIZE
+    ico = b'\x00\x00\x01\x00'
+    data = bytearray(4 * bs)
+    data[bs - 2:bs + 2] = ico
+    data[3 * bs + 5:3 * bs + 9] = b'GIF8'
+    block_map = fac_app.build_constant_block_map(bytes(data))
+    assert fac_app.find_skipping_constant_runs(data, ico, 0, block_map) == bs - 2
+    assert fac_app.find_skipping_constant_runs(data, b'GIF8', 0, block_map) == 3 * bs + 5
+    assert fac_app.find_skipping_constant_runs(data, b'GIF8', 3 * bs + 6, block_map) == -1
+
+
+def test_strings_extraction_skips_only_non_printable_runs(tmp_path):
+    bs = fac_app.CONSTANT_BLOCK_SIZE
+    data = b'\x00' * (2 * bs) + b'hello world\x00' + b'A' * (2 * bs) + b'\x00' * (2 * bs) + b'tail'
+    evidence = tmp_path / 'strings.bin'
+    evidence.write_bytes(data)
+    fac_app.extract_strings_threaded(str(evidence))
+    assert fac_app.strings_status['strings_found'] == 3
+    assert fac_app.strings_status['preview'][0] == 'hello world'
+
+
+def test_aligned_hits_only_examine_boundaries():
+    matcher = fac_app.build_signature_matcher(['PNG', 'GZIP', 'MP4 / MOV'])
+    png = b'\x89PNG\r\n\x1a\n'
+    data = bytearray(4 * 512)
+    data[512:520] = png          # aligned
+    data[700:708] = png          # unaligned: skipped
+    data[1024 + 4:1024 + 8] = b'ftyp'  # header offset 4 into an aligned file
+    data[1300:1302] = b'\x1f\x8b'  # embedded type: still found
+    hits = list(fac_app.iter_aligned_signature_hits(matcher, bytes(data), 512))
+    assert hits == [(512, png), (1028, b'ftyp'), (1300, b'\x1f\x8b')]
+    assert list(fac_app.iter_aligned_signature_hits(matcher, bytes(data), 512, 600, 1500)) == [(1028, b'ftyp'), (1300, b'\x1f\x8b')]
+
+
+def test_aligned_carving_mode(carve_env):
+    image = carve_env / 'evidence.dd'
+    blob = _png_blob(seed=7)
+    pad = 4096 - len(blob) % 4096
+    image.write_bytes(b'\x00' * 4096 + blob + b'\x00' * pad + b'\x00' * 300 + _png_blob(seed=8) + b'\x00' * 4096)
+
+    fac_app.simple_file_carver(str(image), ['PNG'], alignment=4096)
+    (name,) = os.listdir(app.config['CARVED_FOLDER'])
+    assert int(name.split('-')[1], 16) == 4096
+
+    fac_app.simple_file_carver(str(image), ['PNG'])
+    assert fac_app.carving_status['files_found'] == 2
+
+
+@pytest.mark.skipif(shutil.which('mkfs.ext2') is None, reason='needs e2fsprogs to build a filesystem image')
+def test_unallocated_scope_skips_allocated_files(carve_env):
+    tree = carve_env / 'tree'
+    tree.mkdir()
+    (tree / 'allocated.png').write_bytes(_png_blob(seed=9))
+    image = carve_env / 'ext2.img'
+    subprocess.run(['mkfs.ext2', '-q', '-b', '1024', '-d', str(tree), str(image), '2048'], check=True)
+    deleted = _png_blob(seed=10)
+    with open(image, 'r+b') as f:
+        f.seek(1900 * 1024)
+        f.write(deleted)
+
+    extents = fac_app.compute_unallocated_extents(str(image))
+    free = (1900 * 1024, 1900 * 1024 + len(deleted))
+    assert fac_app.clip_spans_to_extents([free], extents) == [free]
+
+    fac_app.simple_file_carver(str(image), ['PNG'], scope='unallocated')
+    (name,) = os.listdir(app.config['CARVED_FOLDER'])
+    assert int(name.split('-')[1], 16) == 1900 * 1024
+    assert fac_app.deleted_scan_status['scan_methods']['unallocated_space'] == 1
+
+    fac_app.simple_file_carver(str(image), ['PNG'])
+    assert fac_app.carving_status['files_found'] == 2
+
+
+def test_pipelined_validation_matches_inline(carve_env, monkeypatch):
+    monkeypatch.setitem(app.config, 'CARVE_VALIDATION_MIN_CANDIDATES', 2)
+    pools = []
+    real_pool = fac_app.ProcessPoolExecutor
+    monkeypatch.setattr(fac_app, 'ProcessPoolExecutor', lambda *args, **kwargs: pools.append(kwargs) or real_pool(*args, **kwargs))
+    broken = bytearray(_png_blob(seed=12))
+    broken[100:140] = b'\x00' * 40  # corrupt image data: fails the chunk CRC walk
+    parts = [_png_blob(seed=11), bytes(broken), _png_blob(seed=13), _png_blob(seed=11), _image_blob('GIF', seed=14)]
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b''.join(b'\x00' * 333 + part for part in parts) + b'\x00' * 64)
+
+    results = []
+    for workers in (1, 2):
+        fac_app.simple_file_carver(str(image), ['PNG', 'GIF'], validation_workers=workers, queue_depth=2)
+        results.append(sorted(os.listdir(app.config['CARVED_FOLDER'])))
+    assert results[0] == results[1]
+    assert len(results[0]) == 3
+    assert len(pools) == 1
+
+    # too few candidates for the pool: they are validated inline
+    monkeypatch.setitem(app.config, 'CARVE_VALIDATION_MIN_CANDIDATES', 6)
+    fac_app.simple_file_carver(str(image), ['PNG', 'GIF'], validation_workers=2, queue_depth=2)
+    assert sorted(os.listdir(app.config['CARVED_FOLDER'])) == results[0]
+    assert len(pools) == 1
+
+
+def test_pipelined_validation_splits_the_memory_ceiling(monkeypatch):
+    tasks, outstanding = [], []
+    monkeypatch.setattr(fac_app, '_validate_extent_worker', lambda args: tasks.append(args) or (args[2], True, None, 40))
+    sig = fac_app.build_signature_matcher(['PNG'])['signatures']['PNG']
+    mib = 1024 * 1024
+    pulled = [0]
+
+    def extents():
+        for i in range(40):
+            pulled[0] += 1
+            yield i * mib, sig, (i + 1) * mib, 'footer'
+
+    found = 0
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for _ in fac_app.iter_pipelined_candidates(executor, extents(), 64, memory_ceiling=4 * mib, workers=2):
+            found += 1
+            outstanding.append(pulled[0] - found)
+    assert found == 40
+    # each worker validates with half the ceiling, and the queue holds no more than the ceiling covers
+    assert {args[3] for args in tasks} == {2 * mib}
+    assert max(outstanding) <= 4 * mib // fac_app.carve_memory_budget(2 * mib)['full_validation'] + 1
+
+def test_validation_cascade_scores_by_deepest_tier(carve_env, monkeypatch):
+    png = _png_blob(seed=21)
+    zero_width = bytearray(png)
+    zero_width[16:20] = b'\x00' * 4  # IHDR width 0: rejected by the header tier
+    pdf = b'%PDF-1.4\n1 0 obj\n<<>>\nendobj\n' + b'%' * 1100 + b'\n%%EOF\n'  # no xref: fails the structure tier
+    sig = fac_app.build_signature_matcher(['PNG'])['signatures']['PNG']
+    pdf_sig = fac_app.build_signature_matcher(['PDF'])['signatures']['PDF']
+
+    assert fac_app.validate_carved_extent(bytes(zero_width), 0, len(png), sig)[0] is False
+    assert fac_app.validate_carved_extent(pdf, 0, len(pdf), pdf_sig, method='footer')[0] is False
+    valid, _, confidence = fac_app.validate_carved_extent(png, 0, len(png), sig)
+    assert valid and confidence == fac_app.CONFIDENCE_STRUCTURE
+    valid, _, confidence = fac_app.validate_carved_extent(png, 0, len(png), sig, full_decode=True)
+    assert valid and confidence == fac_app.CONFIDENCE_DECODED
+
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b'\x00' * 512 + png + b'\x00' * 512 + bytes(zero_width) + b'\x00' * 64)
+    fac_app.simple_file_carver(str(image), ['PNG'])
+    (name,) = os.listdir(app.config['CARVED_FOLDER'])
+    assert fac_app.carved_files_db[name]['confidence'] == fac_app.CONFIDENCE_STRUCTURE
+
+    # The recovered-files view decodes on demand
+    monkeypatch.setitem(app.config, 'TESTING', True)
+    response = app.test_client().post(f'/verify_carved/{name}')
+    assert response.get_json()['verified'] is True
+    assert fac_app.carved_files_db[name]['confidence'] == fac_app.CONFIDENCE_DECODED
+
+
+def _mp3_stream(rng, frames):
+    out = []
+    for _ in range(frames):
+        b2 = (rng.randrange(1, 15) << 4) | (rng.randrange(3) << 2) | (rng.randrange(2) << 1)
+        size = fac_app.mp3_frame_size(0xFF, 0xFB, b2)
+        out.append(bytes([0xFF, 0xFB, b2, 0x44]) + bytes(rng.randrange(0xFF) for _ in range(size - 4)))
+    return out
+
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_walk_mp3_frames_chains_across_short_gaps(monkeypatch, bulk):
+    if bulk and fac_app.np is None:
+        pytest.skip('needs numpy')
+    if not bulk:
+        monkeypatch.setattr(fac_app, 'np', None)
+    frames = _mp3_stream(random.Random(5), 40)
+    # a 6-byte gap is tolerated, a 12-byte one ends the stream
+    data = b''.join(frames[:30]) + b'\x00' * 6 + b''.join(frames[30:35]) + b'\x00' * 12 + b''.join(frames[35:])
+    total, count = fac_app.walk_mp3_frames(data, 0, len(data))
+    assert (total, count) == (sum(map(len, frames[:35])), 35)
+    assert fac_app.is_valid_mp3_stream(data) is True
+    assert fac_app.is_valid_mp3_stream(b'\x00' + data) is False
+
+
+def test_dedupe_store_skips_content_carved_by_earlier_runs(carve_env, monkeypatch):
+    shared, first_only, second_only = _png_blob(seed=31), _png_blob(seed=32), _png_blob(seed=33)
+    first, second = carve_env / 'first.dd', carve_env / 'second.dd'
+    first.write_bytes(b'\x00' * 512 + shared + b'\x00' * 512 + first_only + b'\x00' * 64)
+    second.write_bytes(b'\x00' * 256 + second_only + b'\x00' * 256 + shared + b'\x00' * 64)
+
+    fac_app.simple_file_carver(str(first), ['PNG'])
+    assert fac_app.carving_status['files_found'] == 2
+    # A second image carved into another folder only yields what is new
+    second_dir = carve_env / 'carved_second'
+    second_dir.mkdir()
+    monkeypatch.setitem(app.config, 'CARVED_FOLDER', str(second_dir))
+    fac_app.simple_file_carver(str(second), ['PNG'])
+    assert fac_app.carving_status['files_found'] == 1
+    # Re-running clears the folder, so its content is written again
+    fac_app.simple_file_carver(str(second), ['PNG'])
+    assert fac_app.carving_status['files_found'] == 1
+
+    store = fac_app.open_dedupe_store()
+    assert store['count'] == 3
+    digest = fac_app.hashlib.md5(shared).hexdigest()
+    assert fac_app._bloom_may_contain(store, bytes.fromhex(digest))
+    assert fac_app.dedupe_store_seen(store, digest)
+    assert not fac_app.dedupe_store_seen(store, fac_app.hashlib.md5(b'never carved').hexdigest())
+    fac_app.close_dedupe_store(store)
+
+
+def test_artifacts_are_stored_once_and_linked_into_sessions(carve_env, monkeypatch):
+    monkeypatch.setitem(app.config, 'ARTIFACT_STORE_FOLDER', str(carve_env / 'store'))
+    session_dir = carve_env / 'Session_1'
+    session_dir.mkdir()
+    conn = fac_app._get_db_conn()
+    conn.execute('INSERT INTO sessions(id, started_at, active, session_path) VALUES (1, ?, 1, ?)', ('now', str(session_dir)))
+    conn.commit()
+    first, second = carve_env / 'carved' / 'first.png', carve_env / 'other.png'
+    first.write_bytes(_png_blob(seed=41))
+    second.write_bytes(_png_blob(seed=41))
+
+    fac_app.add_file_record('first.png', 'carved', str(first), first.stat().st_size, session_id=1)
+    fac_app.add_file_record('other.png', 'carved', str(second), second.stat().st_size, session_id=1)
+
+    linked = session_dir / 'Carved' / 'first.png'
+    assert linked.read_bytes() == first.read_bytes()
+    # identical content shares one inode: the store object, both artifacts and both session views
+    assert os.path.samefile(linked, first) and os.path.samefile(first, second)
+    assert first.stat().st_nlink == 5
+
+    # only the objects of the deleted files are checked; an unrelated orphan is left alone
+    orphan = carve_env / 'store' / 'ff' / ('ff' * 32)
+    orphan.parent.mkdir()
+    orphan.write_bytes(b'orphan')
+    objects = fac_app.artifact_store_objects([str(first), str(session_dir)])
+    assert [os.path.samefile(obj, first) for obj in objects] == [True]
+    for path in (first, second, linked, session_dir / 'Carved' / 'other.png'):
+        path.unlink()
+    assert fac_app.prune_artifact_store(objects) == 1
+    assert orphan.exists()
+    assert fac_app.prune_artifact_store() == 1
+
+
+def test_container_output_packs_members_into_indexed_tar_segments(carve_env, monkeypatch):
+    blobs = [_png_blob(seed=51), _png_blob(seed=52), _png_blob(seed=53)]
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b''.join(b'\x00' * 300 + blob for blob in blobs) + b'\x00' * 64)
+    # small segments so the three members roll over into a second tar
+    monkeypatch.setitem(app.config, 'CARVE_CONTAINER_SEGMENT_SIZE', len(blobs[0]) * 2 + 2048)
+
+    fac_app.simple_file_carver(str(image), ['PNG'], output_mode='container')
+
+    assert fac_app.carving_status['files_found'] == 3
+    outputs = sorted(os.listdir(app.config['CARVED_FOLDER']))
+    assert outputs == ['carved-0001.tar', 'carved-0002.tar', fac_app.CARVE_CONTAINER_INDEX]
+    total, members = fac_app.list_carved_members(20, 0)
+    assert total == 3
+    assert [fac_app.read_carved_file(m['name']) for m in members] == blobs
+    with tarfile.open(carve_env / 'carved' / 'carved-0001.tar') as tf:
+        assert [tf.extractfile(info).read() for info in tf.getmembers()] == blobs[:2]
+
+    with app.test_client() as client:
+        response = client.get(f"/download_carved_file/{members[2]['name']}")
+        assert response.status_code == 200
+        assert response.data == blobs[2]
+
+
+def test_files_carve_discards_an_earlier_container_index(carve_env):
+    blob = _png_blob(seed=54)
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b'\x00' * 300 + blob + b'\x00' * 64)
+    fac_app.simple_file_carver(str(image), ['PNG'], output_mode='container')
+    name = fac_app.list_carved_members(20, 0)[1][0]['name']
+
+    fac_app.discard_carve_container_index(app.config['CARVED_FOLDER'])
+    fac_app.discard_carve_container_index(app.config['CARVED_FOLDER'])  # already gone
+    assert fac_app.find_carved_member(name) is None
+
+    fac_app.simple_file_carver(str(image), ['PNG'], output_mode='container')
+    fac_app.simple_file_carver(str(image), ['PNG'], output_mode='files')
+    assert fac_app.CARVE_CONTAINER_INDEX not in os.listdir(app.config['CARVED_FOLDER'])
+    assert fac_app.list_carved_members(20, 0) is None
+    assert fac_app.read_carved_file(name) == blob
+
+
+def test_record_writer_batches_carved_rows_into_the_session(carve_env, monkeypatch):
+    session_dir = carve_env / 'Session_1'
+    session_dir.mkdir()
+    conn = fac_app._get_db_conn()
+    conn.execute('INSERT INTO sessions(id, started_at, active, session_path) VALUES (1, ?, 1, ?)', ('now', str(session_dir)))
+    conn.commit()
+    monkeypatch.setitem(app.config, 'ARTIFACT_STORE_FOLDER', str(carve_env / 'store'))
+    monkeypatch.setitem(app.config, 'RECORD_WRITER_FLUSH_ROWS', 2)
+    monkeypatch.setitem(app.config, 'RECORD_WRITER_FLUSH_MS', 60000)
+    opened = []
+    get_conn = fac_app._get_db_conn
+    monkeypatch.setattr(fac_app, '_get_db_conn', lambda: opened.append(1) or get_conn())
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b''.join(b'\x00' * 200 + _png_blob(seed=s) for s in (61, 62, 63)) + b'\x00' * 64)
+
+    fac_app.simple_file_carver(str(image), ['PNG'])
+
+    # one evidence cache lookup for the hit index, one lookup of the session,
+    # then a flush after two rows and one on close
+    assert len(opened) == 4
+    rows = conn.execute("SELECT filename, session_id FROM files WHERE file_type='carved' ORDER BY id").fetchall()
+    assert [sid for _, sid in rows] == ['1', '1', '1']
+    assert sorted(os.listdir(session_dir / 'Carved')) == sorted(name for name, _ in rows)
+
+
+def test_carving_status_polls_only_hits_after_the_cursor(carve_env, monkeypatch):
+    monkeypatch.setitem(fac_app.carving_hits, 'recent', fac_app.deque(maxlen=2))
+    blobs = [_png_blob(seed=s) for s in (71, 72, 73)]
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b''.join(b'\x00' * 100 + blob for blob in blobs) + b'\x00' * 64)
+    cursor = fac_app.carving_hits['seq']
+
+    fac_app.simple_file_carver(str(image), ['PNG'])
+
+    with app.test_client() as client:
+        status = client.get(f'/carving_status?since={cursor}').get_json()
+        # the ring keeps the two latest hits, and reports that the first fell out
+        assert status['files_found'] == 3 and status['cursor'] == cursor + 3
+        assert [hit['seq'] for hit in status['hits']] == [cursor + 2, cursor + 3]
+        assert status['hits_truncated'] is True
+        assert client.get(f"/carving_status?since={status['cursor']}").get_json()['hits'] == []
+
+        preview = client.get(f"/carving_status/preview?offset={status['hits'][-1]['offset']}").get_json()
+        assert preview['hex_preview'] == fac_app.format_hex_view(blobs[2][:256], 100 * 3 + len(blobs[0]) + len(blobs[1]))
+
+
+def test_sampling_estimate_projects_hits_from_random_blocks(carve_env):
+    block = 4096
+    image = carve_env / 'evidence.dd'
+    # one PNG at the start of every other block
+    image.write_bytes(b''.join(_png_blob(seed=s).ljust(block, b'\x00') + b'\x00' * block for s in range(8)))
+
+    full = fac_app.estimate_carving(str(image), ['PNG', 'GIF'], fraction=1.0, block_size=block)
+    assert full['sampled_blocks'] == 16 and not full['partial']
+    assert full['hits']['PNG'] == {'sampled': 8, 'projected': 8} and full['hits']['GIF']['projected'] == 0
+
+    half = fac_app.estimate_carving(str(image), ['PNG'], fraction=0.5, block_size=block, seed=7)
+    assert half['sampled_blocks'] == 8 and half['sampled_fraction'] == 0.5
+    assert half['hits']['PNG']['projected'] == 2 * half['hits']['PNG']['sampled']
+
+
+def _stored_png_blob(seed=0):
+    """A PNG with uncompressed image data, so it only shows up in evidence inside a deflated container."""
+    row = random.Random(seed).randbytes(64 * 3)
+    buf = io.BytesIO()
+    Image.frombytes('RGB', (64, 64), row * 64).save(buf, format='PNG', compress_level=0)
+    return buf.getvalue()
+
+
+def test_recursive_carving_descends_into_containers(carve_env):
+    inner_png, outer_png, gz_png = _stored_png_blob(81), _stored_png_blob(82), _stored_png_blob(83)
+    inner_zip = io.BytesIO()
+    with zipfile.ZipFile(inner_zip, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('deep/inner.png', inner_png)
+    outer_zip = io.BytesIO()
+    with zipfile.ZipFile(outer_zip, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('photo.png', outer_png)
+        zf.writestr('nested.zip', inner_zip.getvalue())
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b'\x00' * 512 + outer_zip.getvalue() + b'\x00' * 512 + fac_app.gzip.compress(gz_png) + b'\x00' * 4096)
+    assert outer_png not in image.read_bytes()
+
+    fac_app.simple_file_carver(str(image), ['PNG', 'ZIP', 'GZIP'], recursion_depth=1)
+    nested = {info['nested_path']: info for info in fac_app.carved_files_db.values() if 'nested_path' in info}
+    assert set(nested) == {'photo.png@0x0', 'nested.zip@0x0', '@0x0'}
+    assert nested['photo.png@0x0']['parent_offset'] == 512
+
+    fac_app.simple_file_carver(str(image), ['PNG', 'ZIP', 'GZIP'], recursion_depth=2)
+    nested = {info['nested_path']: info['name'] for info in fac_app.carved_files_db.values() if 'nested_path' in info}
+    assert 'nested.zip@0x0/deep/inner.png@0x0' in nested
+    carved = {key: (carve_env / 'carved' / name).read_bytes() for key, name in nested.items()}
+    assert carved['nested.zip@0x0/deep/inner.png@0x0'] == inner_png and carved['@0x0'] == gz_png
+
+
+@pytest.mark.parametrize('buffers', [2, 5])
+def test_parallel_digests_match_sequential_hashing(tmp_path, buffers):
+    data = random.Random(buffers).randbytes(1024 * 1024 + 4321)
+    path = tmp_path / 'evidence.dd'
+    path.write_bytes(data)
+    seen = []
+    hashes = fac_app.hash_file_parallel(str(path), chunk_size=64 * 1024, buffers=buffers, progress=seen.append)
+    assert hashes == {'MD5': fac_app.hashlib.md5(data).hexdigest(), 'SHA-1': fac_app.hashlib.sha1(data).hexdigest(),
+                      'SHA-256': fac_app.hashlib.sha256(data).hexdigest()}
+    assert seen[-1] == len(data) and seen == sorted(seen)
+
+
+def test_failing_digest_consumer_raises_instead_of_hanging(tmp_path, monkeypatch):
+    path = tmp_path / 'evidence.dd'
+    path.write_bytes(random.Random(8).randbytes(256 * 1024))
+
+    def full_disk(block_map, data):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(fac_app, 'update_block_hash_map', full_disk)
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(fac_app.hash_file_parallel, str(path), chunk_size=4096, block_map={})
+        with pytest.raises(OSError, match='No space left'):
+            future.result(timeout=10)
+
+    # the same when only a bounded number of chunks may be in flight, as for uploads
+    pipeline = fac_app.open_digest_pipeline(consumers=[lambda data: full_disk(None, data)])
+    with ThreadPoolExecutor(1) as pool:
+        def feed():
+            for index in range(64):
+                fac_app.feed_digest_pipeline(pipeline, index, b'chunk', 2)
+        with pytest.raises(OSError):
+            pool.submit(feed).result(timeout=10)
+    fac_app.close_digest_pipeline(pipeline)  # already raised, so cleanup stays quiet
+
+
+def test_block_hash_map_locates_changed_blocks(tmp_path):
+    data = bytearray(random.Random(7).randbytes(5 * 16384 + 5000))
+    path = tmp_path / 'evidence.dd'
+    path.write_bytes(data)
+    writer = fac_app.open_block_hash_map(fac_app.block_hash_map_path(str(path)), coarse_size=16384, fine_size=4096)
+    # chunks that do not line up with the blocks are split across records
+    hashes = fac_app.hash_file_parallel(str(path), chunk_size=3000, block_map=writer)
+    header = fac_app.read_block_hash_map(fac_app.close_block_hash_map(writer))
+    assert hashes['SHA-256'] == fac_app.hashlib.sha256(data).hexdigest()
+    assert (header['size'], header['blocks']) == (len(data), 6)
+    for index in range(header['blocks']):
+        block = bytes(data[index * 16384:(index + 1) * 16384])
+        coarse, fine = fac_app.block_hash_record(header, index)
+        assert coarse == fac_app.hashlib.sha256(block).digest()
+        assert fine == [fac_app.hashlib.md5(block[i:i + 4096]).digest() for i in range(0, len(block), 4096)]
+
+    assert fac_app.verify_block_hash_range(str(path)) == []
+    data[2 * 16384 + 5000] ^= 0xFF
+    data[-1] ^= 0xFF
+    path.write_bytes(data)
+    assert fac_app.verify_block_hash_range(str(path)) == [(2 * 16384 + 4096, 4096), (5 * 16384 + 4096, 904)]
+    assert fac_app.verify_block_hash_range(str(path), 0, 2 * 16384) == []
+
+
+def test_evidence_cache_answers_known_images_until_they_change(carve_env, monkeypatch):
+    analyses = []
+    analyze = fac_app.perform_forensic_analysis
+    monkeypatch.setattr(fac_app, 'perform_forensic_analysis', lambda path: analyses.append(path) or analyze(path))
+    monkeypatch.setattr(fac_app, 'EVIDENCE_FINGERPRINT_SIZE', 4096)
+    data = bytearray(random.Random(5).randbytes(64 * 1024))
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(data)
+    hashes = {'MD5': fac_app.hashlib.md5(data).hexdigest(), 'SHA-256': fac_app.hashlib.sha256(data).hexdigest()}
+
+    first = fac_app.analyze_evidence(str(image))
+    assert first[3] is None and len(analyses) == 1
+    fac_app.cache_evidence_hashes(str(image), hashes)
+    assert fac_app.analyze_evidence(str(image)) == first[:3] + (hashes,)
+    assert len(analyses) == 1
+
+    # same content under a new identity is matched by its content hash
+    copy = carve_env / 'copy.dd'
+    shutil.copyfile(image, copy)
+    assert fac_app.analyze_evidence(str(copy), hashes) == first[:3] + (hashes,)
+    assert len(analyses) == 1
+
+    # a changed head with the old size and mtime fails the fingerprint
+    st = image.stat()
+    data[0] ^= 0xFF
+    image.write_bytes(data)
+    os.utime(image, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert fac_app.analyze_evidence(str(image))[3] is None and len(analyses) == 2
+
+
+def test_known_file_set_skips_known_content(carve_env):
+    pngs = [_png_blob(seed=s) for s in range(3)]
+    md5 = [fac_app.hashlib.md5(blob).hexdigest() for blob in pngs]
+    noise = [fac_app.hashlib.md5(bytes([n])).hexdigest() for n in range(5)]
+    rds = carve_env / 'NSRLFile.txt'
+    rows = ['"SHA-1","MD5","CRC32","FileName","FileSize"']
+    rows += [f'"{fac_app.hashlib.sha1(d.encode()).hexdigest().upper()}","{d.upper()}","00000000","f","1"' for d in noise + [md5[0]]]
+    rds.write_text('\n'.join(rows))
+    # tiny sort runs force the run merge; a second, plain-list import merges into the set on disk
+    assert fac_app.import_known_file_set(str(rds), sort_rows=2) == {'sha1': 6, 'md5': 6}
+    (carve_env / 'hashes.txt').write_text(f'{md5[2]}  setup.exe\n{md5[0]}  again.dll\n')
+    assert fac_app.import_known_file_set(str(carve_env / 'hashes.txt'), sort_rows=2) == {'md5': 7}
+
+    known = fac_app.open_known_file_set()
+    try:
+        assert fac_app.known_file_set_contains(known, {'md5': md5[2]})
+        assert not fac_app.known_file_set_contains(known, {'md5': md5[1], 'sha256': 'ab' * 32})
+    finally:
+        fac_app.close_known_file_set(known)
+
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b''.join(blob + b'\x00' * 512 for blob in pngs))
+    fac_app.simple_file_carver(str(image), ['PNG'])
+    assert fac_app.carving_status['known_skipped'] == 2
+    assert [(carve_env / 'carved' / name).read_bytes() for name in fac_app.carved_files_db] == [pngs[1]]
+    fac_app.simple_file_carver(str(image), ['PNG'], known_files=False)
+    assert len(fac_app.carved_files_db) == 3
+
+
+@pytest.mark.parametrize('memory_ceiling', [None, 2048])
+def test_sha256_only_known_file_set_filters_carves(carve_env, memory_ceiling):
+    pngs = [_png_blob(seed=s) for s in (70, 71)]
+    (carve_env / 'sha256.txt').write_text(f'{fac_app.hashlib.sha256(pngs[0]).hexdigest()}  known.png\n')
+    assert fac_app.import_known_file_set(str(carve_env / 'sha256.txt')) == {'sha256': 1}
+    image = carve_env / 'evidence.dd'
+    image.write_bytes(b''.join(blob + b'\x00' * 512 for blob in pngs))
+
+    # the small ceiling streams both PNGs out, hashing them on the way
+    fac_app.simple_file_carver(str(image), ['PNG'], memory_ceiling=memory_ceiling)
+
+    assert fac_app.carving_status['known_skipped'] == 1
+    assert [(carve_env / 'carved' / name).read_bytes() for name in fac_app.carved_files_db] == [pngs[1]]
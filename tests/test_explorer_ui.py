@@ -83,6 +83,10 @@ def test_full_flow(client, tmp_path):
     assert r.status_code == 200
     j = r.get_json()
     assert j.get('uploaded')
+    # the upload is hashed while it is written
+    import hashlib
+    assert app_mod.uploaded_files_db['test.txt']['hash_info']['SHA-256'] == hashlib.sha256(file_content).hexdigest()
+    assert app_mod.hashing_status['complete'] is True
 
     # info
     r = client.get('/api/fs/info?root=Upload Files&path=myfolder/test.txt')
@@ -113,3 +117,52 @@ def test_full_flow(client, tmp_path):
     assert r.status_code == 200
     jd = r.get_json()
     assert jd.get('deleted')
+
+
+def test_failed_upload_ends_the_hashing_job(client):
+    client.get('/fs_explorer')
+    with client.session_transaction() as sess:
+        csrf = sess.get('csrf_token')
+    from importlib import import_module
+    app_mod = import_module('app')
+    # a folder of the same name makes writing the upload fail
+    r = client.post('/api/fs/mkdir', data={'root': 'Upload Files', 'path': '', 'name': 'clash.bin', 'csrf_token': csrf}, headers={'X-CSRF-Token': csrf})
+    assert r.status_code == 200
+    data = {'root': 'Upload Files', 'path': '', 'file': (io.BytesIO(b'data'), 'clash.bin')}
+    r = client.post('/api/fs/upload', data=data, content_type='multipart/form-data', headers={'X-CSRF-Token': csrf})
+    assert r.status_code == 500
+    assert app_mod.hashing_status['in_progress'] is False
+    assert app_mod.hashing_status['error']
+
+
+def test_upload_over_a_linked_artifact_leaves_its_other_links_alone(client, tmp_path):
+    client.get('/fs_explorer')
+    with client.session_transaction() as sess:
+        csrf = sess.get('csrf_token')
+    from importlib import import_module
+    app_mod = import_module('app')
+    # the upload folder holds a hardlink of a stored artifact (see link_artifact)
+    stored = tmp_path / 'stored.bin'
+    stored.write_bytes(b'original evidence')
+    os.link(stored, os.path.join(app_mod.app.config['UPLOAD_FOLDER'], 'shared.bin'))
+    data = {'root': 'Upload Files', 'path': '', 'file': (io.BytesIO(b'new upload'), 'shared.bin')}
+    r = client.post('/api/fs/upload', data=data, content_type='multipart/form-data', headers={'X-CSRF-Token': csrf})
+    assert r.status_code == 200
+    assert stored.read_bytes() == b'original evidence'
+    with open(os.path.join(app_mod.app.config['UPLOAD_FOLDER'], 'shared.bin'), 'rb') as f:
+        assert f.read() == b'new upload'
+
+
+def test_upload_digests_are_cached_for_the_evidence(client):
+    client.get('/fs_explorer')
+    with client.session_transaction() as sess:
+        csrf = sess.get('csrf_token')
+    from importlib import import_module
+    import hashlib
+    app_mod = import_module('app')
+    data = {'root': 'Upload Files', 'path': '', 'file': (io.BytesIO(b'cached evidence'), 'cached.bin')}
+    r = client.post('/api/fs/upload', data=data, content_type='multipart/form-data', headers={'X-CSRF-Token': csrf})
+    assert r.status_code == 200
+    dest = os.path.join(app_mod.app.config['UPLOAD_FOLDER'], 'cached.bin')
+    cached = app_mod.load_evidence_cache(app_mod.evidence_identity(dest))
+    assert cached['hashes']['SHA-256'] == hashlib.sha256(b'cached evidence').hexdigest()